@@ -1,20 +1,139 @@
+import asyncio
+import functools
+import os
+import threading
 import reflex as rx
 import pandas as pd
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
 from datetime import datetime, date
 import json
-
-from .services.sheets_service import SheetsService
-from .services.metrics_service import MetricsService
+from urllib.parse import urlencode
+
+from .services.lazy_import import LazyImport
+from .services.source_registry import SourceRegistry
+from .services.persistence_service import PersistenceService, SqlMetricsBackend
+from .services.version_service import VersionService
+from .services.telemetry_service import TelemetryService
+from .services.log_service import LogService
+from .services.profiling_service import ProfilingService
+from .api import create_api
 from .components.sidebar import create_sidebar
+from .components.data_table import create_virtualized_data_table
+
+if TYPE_CHECKING:
+    from .services.shared_dataset import SharedDataset
+    from .services.validation_service import ValidationResult
+
+# Serviços usados só pelos event handlers: carregados no primeiro evento, não na importação do app.
+# Ficam acima os usados já na definição do State e a persistência, cujas tabelas (rx.Model)
+# precisam estar registradas quando o Reflex importa o app (reflex db)
+SheetsService = LazyImport(".services.sheets_service", "SheetsService", __package__)
+MetricsService = LazyImport(".services.metrics_service", "MetricsService", __package__)
+TableService = LazyImport(".services.table_service", "TableService", __package__)
+DatasetService = LazyImport(".services.dataset_service", "DatasetService", __package__)
+TimeSeriesService = LazyImport(".services.timeseries_service", "TimeSeriesService", __package__)
+PresetService = LazyImport(".services.preset_service", "PresetService", __package__)
+SharedDatasetService = LazyImport(".services.shared_dataset", "SharedDatasetService", __package__)
+ComparisonService = LazyImport(".services.comparison_service", "ComparisonService", __package__)
+ForecastService = LazyImport(".services.forecast_service", "ForecastService", __package__)
+DrillDownService = LazyImport(".services.drilldown_service", "DrillDownService", __package__)
+OutlierService = LazyImport(".services.outlier_service", "OutlierService", __package__)
+SamplingService = LazyImport(".services.sampling_service", "SamplingService", __package__)
+ExportService = LazyImport(".services.export_service", "ExportService", __package__)
+ValidationService = LazyImport(".services.validation_service", "ValidationService", __package__)
+
+logger = LogService.get_logger(__name__)
+
+# Número de linhas visíveis nas tabelas de dados
+TABLE_PAGE_SIZE = 25
+
+# Intervalo de espera após a última alteração de data antes do recálculo automático
+RECALC_DEBOUNCE_SECONDS = 0.6
+
+# Backend de execução das métricas: "pandas" (em memória) ou "sql" (agregação no SQLite de rxconfig.db_url)
+METRICS_BACKEND = os.environ.get("UI_BIA_METRICS_BACKEND", "pandas").lower()
+
+# Modo progressivo: a partir deste número de medições de biometria as métricas são estimadas
+# primeiro por uma amostra estratificada e refinadas para o valor exato em segundo plano
+PROGRESSIVE_MIN_ROWS = int(os.environ.get("UI_BIA_PROGRESSIVE_MIN_ROWS", "1000000"))
+
+class RecalcGenerations:
+    """Geração de recálculo mais recente por sessão, consultada pelas threads de cálculo
+    para abandonar resultados de períodos que já foram substituídos
+
+    Só as sessões com algum cálculo em segundo plano em andamento ficam registradas:
+    ``start`` registra o cálculo, ``finish`` o encerra e remove a sessão quando não
+    resta nenhum outro. Sem cálculo em andamento não há o que invalidar, e o próximo
+    cálculo parte da geração atual do State.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+
+    def start(self, token: str, generation: int) -> None:
+        with self._lock:
+            self._running[token] = self._running.get(token, 0) + 1
+            self._latest[token] = generation
+
+    def advance(self, token: str, generation: int) -> None:
+        with self._lock:
+            if token in self._running:
+                self._latest[token] = generation
+
+    def is_stale(self, token: str, generation: int) -> bool:
+        with self._lock:
+            return self._latest.get(token) != generation
+
+    def finish(self, token: str) -> None:
+        with self._lock:
+            running = self._running.get(token, 0) - 1
+            if running > 0:
+                self._running[token] = running
+            else:
+                self._running.pop(token, None)
+                self._latest.pop(token, None)
+
+
+_recalc_generations = RecalcGenerations()
+
+
+def compute_dashboard_payload(biometria_df: Optional[pd.DataFrame], racao_df: Optional[pd.DataFrame],
+                              start_date: str, end_date: str, farm: str = SourceRegistry.ALL_FARMS,
+                              is_cancelled=None, backend: str = "") -> Optional[Dict[str, Any]]:
+    """Calcula as métricas do dashboard (de uma fazenda ou de todas) no backend de execução configurado
+
+    ``backend`` substitui o configurado (versões anteriores do dataset só existem em memória).
+    """
+    if (backend or METRICS_BACKEND) == "sql":
+        return SqlMetricsBackend.build_dashboard_payload(start_date, end_date, farm, is_cancelled)
+    return MetricsService.build_dashboard_payload(
+        SourceRegistry.filter_farm(biometria_df, farm), SourceRegistry.filter_farm(racao_df, farm),
+        start_date, end_date, is_cancelled
+    )
 
 
 class State(rx.State):
     """Estado da aplicação"""
 
-    # Dados das planilhas (armazenados internamente)
-    biometria_df: Optional[pd.DataFrame] = None
-    racao_df: Optional[pd.DataFrame] = None
+    # Dados das planilhas (armazenados apenas no backend)
+    _biometria_df: Optional[pd.DataFrame] = None
+    _racao_df: Optional[pd.DataFrame] = None
+
+    # Conjunto tipado (datas convertidas e valores numéricos) e agregados diários
+    _biometria_typed: Optional[pd.DataFrame] = None
+    _racao_typed: Optional[pd.DataFrame] = None
+    _area_daily: Optional[pd.DataFrame] = None
+    _feed_daily: Optional[pd.DataFrame] = None
+
+    # Versão do dataset carregado e datas dos períodos pré-definidos
+    _dataset_version: str = ""
+    _preset_ranges: Dict[str, List[str]] = {}
+
+    # Versão do dataset compartilhado em uso (modo multi-worker): a sessão guarda só a versão,
+    # os DataFrames ficam mapeados em memória uma única vez por processo
+    _shared_version: str = ""
 
     # Dados simplificados para exibição
     biometria_summary: str = ""
@@ -24,87 +143,192 @@ class State(rx.State):
     biometria_headers: List[str] = []
     racao_headers: List[str] = []
 
+    # Paginação das tabelas de dados (apenas a página visível vai para o navegador)
+    biometria_page: int = 0
+    racao_page: int = 0
+    biometria_page_count: int = 0
+    racao_page_count: int = 0
+
     # Estados de carregamento
     is_loading: bool = False
     load_message: str = ""
     has_data: bool = False
 
+    # Fazendas presentes nos dados e fazenda selecionada no dashboard
+    farms: List[str] = []
+    selected_farm: str = SourceRegistry.ALL_FARMS
+
     # Dashboard de métricas
     show_dashboard: bool = False
     start_date: str = ""
     end_date: str = ""
     is_calculating: bool = False
+    is_approximate: bool = False
+    auto_recalc: bool = False
+    _recalc_generation: int = 0
 
-    # Métricas simplificadas para o State
-    tank_metrics: List[List[str]] = []  # [tanque, peixes_medidos, area_media, racao_utilizada]
-    general_metrics: List[str] = []  # [total_peixes, area_media_geral, total_racao]
+    # Medições de biometria marcadas como atípicas na carga e opção de excluí-las das métricas
+    outlier_count: int = 0
+    exclude_outliers: bool = False
+
+    # Perfil dos event handlers desta sessão (apenas com UI_BIA_PROFILE=sessao e a chave de administrador)
+    is_profiling: bool = False
+    _profiling_authorized: bool = False
+    active_preset: str = ""
+
+    # Métricas em formato colunar numérico (a formatação é feita no navegador)
+    tank_ids: List[str] = []
+    tank_metrics: Dict[str, List[float]] = {}  # peixes_medidos, area_media, racao_utilizada
+    general_metrics: Dict[str, float] = {}  # total_peixes_medidos, area_media_geral, total_racao_utilizada
 
     # Dados para a tabela de correlação temporal
-    correlation_tank_data: List[
-        List[str]] = []  # [tanque, area_inicial, area_final, variacao, crescimento%, racao_total, eficiencia]
-    correlation_general_data: List[
-        str] = []  # [total_variacao, total_racao, media_crescimento, eficiencia_geral, tanques]
+    correlation_tank_ids: List[str] = []
+    correlation_tank_data: Dict[str, List[float]] = {}  # area_inicial, area_final, variacao_area, ...
+    correlation_general_data: Dict[str, float] = {}  # total_variacao_area, total_racao, ...
     has_correlation_data: bool = False
-
+    correlation_sort_key: str = ""
+    correlation_sort_desc: bool = False
+
+    # Gráficos de evolução temporal (pontos já reduzidos no servidor)
+    chart_tanks: List[str] = []
+    chart_tank: str = ""
+    area_series: List[Dict[str, Any]] = []
+    feed_series: List[Dict[str, Any]] = []
+
+    # Comparação do período selecionado (A) com um período de comparação (B)
+    compare_start: str = ""
+    compare_end: str = ""
+    comparison_tank_ids: List[str] = []
+    comparison_data: Dict[str, List[float]] = {}  # <campo>_a, <campo>_b e <campo>_delta
+    comparison_general: Dict[str, float] = {}
+
+    # Projeção da data em que cada tanque atinge a área média alvo
+    target_area: str = ""
+    forecast_tank_ids: List[str] = []
+    forecast_data: Dict[str, List[float]] = {}  # area_atual, taxa_diaria, r2, dias_para_meta
+    forecast_labels: Dict[str, List[str]] = {}  # modelo, previsao, intervalo
+
+    # Painel de detalhe de um tanque, calculado só quando aberto (as linhas brutas ficam no backend)
+    drill_tank: str = ""
+    drill_summary: Dict[str, float] = {}  # biometrias, peixes_medidos, area_media, area_desvio, ...
+    drill_area_series: List[Dict[str, Any]] = []
+    drill_feed_series: List[Dict[str, Any]] = []
+    drill_interval_labels: List[str] = []
+    drill_intervals: Dict[str, List[float]] = {}  # dias, area_inicial, area_final, variacao_area, ...
+    drill_histogram: List[Dict[str, Any]] = []
+    drill_headers: List[str] = []
+    drill_rows: List[List[str]] = []
+    drill_page: int = 0
+    drill_page_count: int = 0
+    _drill_raw: Optional[pd.DataFrame] = None
+
+    # Relatório de qualidade da última carga (tanques com linhas marcadas, por planilha)
+    quality_sheets: List[str] = []
+    quality_tanks: List[str] = []
+    quality_data: Dict[str, List[float]] = {}  # total, quarentena e contagem de cada regra
+    quality_summary: str = ""
+
+    # Versões do dataset gravadas (rótulo -> id) e a versão exibida ("Atual" = a carga mais recente)
+    version_options: List[str] = []
+    selected_version: str = "Atual"
+    # Período da última carga por "Buscar período" (vazio quando a sessão tem todo o histórico)
+    loaded_period: str = ""
+    _version_ids: Dict[str, int] = {}
+
+    # Período da última carga das planilhas e cópias servidas nela (para recarregar quando forem atualizadas)
+    _sheets_range: List[str] = ["", ""]
+    _stale_snapshots: List[Dict[str, Any]] = []
+
+    @ProfilingService.profiled
     def load_sheets_data(self):
         """Carrega os dados das planilhas"""
+        return self._load_from_sheets(revalidate=True)
+
+    @ProfilingService.profiled
+    def load_period_from_sheets(self):
+        """Baixa das planilhas apenas o período selecionado e as colunas usadas nas métricas"""
+        if not self.start_date or not self.end_date:
+            self.load_message = "Por favor, selecione as datas inicial e final para buscar o período."
+            return
+
+        revalidation = self._load_from_sheets(self.start_date, self.end_date, revalidate=True)
+        if self.has_data and self.show_dashboard:
+            return [event for event in (self.calculate_metrics(), revalidation) if event is not None]
+        return revalidation
+
+    @rx.event(background=True)
+    async def refresh_stale_sheets(self):
+        """Recarrega a sessão quando termina a atualização em segundo plano das cópias servidas"""
+        async with self:
+            served = list(self._stale_snapshots)
+
+        if not await asyncio.to_thread(SheetsService.wait_revalidation, served):
+            return
+
+        async with self:
+            if self.is_loading:
+                return
+            # As cópias acabaram de ser atualizadas: a recarga não vai ao Sheets
+            self._load_from_sheets(*self._sheets_range)
+            event = self.calculate_metrics() if self.has_data and self.show_dashboard else None
+        return event
+
+    @TelemetryService.timed("carga")
+    def _load_from_sheets(self, start_date: str = "", end_date: str = "", revalidate: bool = False):
+        """Carrega as planilhas (inteiras ou só o período informado) e prepara o State
+
+        Devolve o evento que recarrega a sessão quando alguma planilha veio de uma cópia
+        que está sendo atualizada em segundo plano. Com ``revalidate`` (botões de carga),
+        mesmo as cópias recentes são atualizadas.
+        """
         self.is_loading = True
         self.load_message = "Carregando dados das planilhas..."
+        self._sheets_range = [start_date, end_date]
+        snapshots: List[Dict[str, Any]] = []
 
         try:
-            # Carrega os dados
-            biometria_df, racao_df = SheetsService.load_all_sheets()
-
-            messages = []
-
-            # Processa dados de Biometria
-            if biometria_df is not None and not biometria_df.empty:
-                self.biometria_df = biometria_df
-                self.biometria_headers = [str(col) for col in biometria_df.columns]
-
-                # Preview das primeiras 10 linhas
-                preview_df = biometria_df.head(10)
-                self.biometria_preview = []
-
-                for _, row in preview_df.iterrows():
-                    row_data = []
-                    for value in row.values:
-                        str_val = str(value) if pd.notna(value) else ""
-                        if len(str_val) > 20:
-                            str_val = str_val[:20] + "..."
-                        row_data.append(str_val)
-                    self.biometria_preview.append(row_data)
-
-                self.biometria_summary = f"Total de {len(biometria_df)} registros, {len(biometria_df.columns)} colunas"
-                messages.append(f"Biometria: {len(biometria_df)} registros")
-
-            # Processa dados de Ração
-            if racao_df is not None and not racao_df.empty:
-                self.racao_df = racao_df
-                self.racao_headers = [str(col) for col in racao_df.columns]
-
-                # Preview das primeiras 10 linhas
-                preview_df = racao_df.head(10)
-                self.racao_preview = []
-
-                for _, row in preview_df.iterrows():
-                    row_data = []
-                    for value in row.values:
-                        str_val = str(value) if pd.notna(value) else ""
-                        if len(str_val) > 20:
-                            str_val = str_val[:20] + "..."
-                        row_data.append(str_val)
-                    self.racao_preview.append(row_data)
-
-                self.racao_summary = f"Total de {len(racao_df)} registros, {len(racao_df.columns)} colunas"
-                messages.append(f"Ração: {len(racao_df)} registros")
+            # Carrega os dados (cópias recentes são servidas na hora e atualizadas em segundo plano)
+            biometria_df, racao_df = SheetsService.load_all_sheets(
+                start_date, end_date, report=snapshots, revalidate=revalidate
+            )
+
+            # Cargas completas viram versões do histórico (as linhas como vieram, antes da validação)
+            if not start_date and not end_date:
+                try:
+                    VersionService.record(biometria_df, racao_df)
+                except Exception as e:
+                    logger.error("Erro ao gravar a versão do dataset", extra={"campos": {"erro": str(e)}})
+
+            # Valida a carga uma única vez: linhas inválidas ficam em quarentena e não são persistidas
+            validation = ValidationService.validate_sheets(biometria_df, racao_df)
+            biometria_df, racao_df = validation["biometria"].clean, validation["racao"].clean
+
+            # Grava o histórico no banco para sobreviver a reinícios
+            try:
+                PersistenceService.save_sheets(biometria_df, racao_df)
+                if METRICS_BACKEND == "sql":
+                    # No backend SQL a sessão trabalha sobre todo o histórico persistido
+                    biometria_df, racao_df = PersistenceService.load_sheets()
+            except Exception as e:
+                logger.error("Erro ao persistir dados", extra={"campos": {"erro": str(e)}})
+
+            # Carga por período no backend em memória: a sessão fica só com esse período
+            # (no backend SQL ela já voltou a ter todo o histórico persistido)
+            period = ""
+            if (start_date or end_date) and METRICS_BACKEND != "sql":
+                period = " a ".join(
+                    pd.to_datetime(value).strftime("%d/%m/%Y") if value else "…" for value in (start_date, end_date)
+                )
+
+            messages = self._ingest_frames(biometria_df, racao_df, validation=validation, period=period)
+            self.selected_version = "Atual"
+            self._refresh_versions()
 
             if messages:
-                self.load_message = "Dados carregados: " + " | ".join(messages)
-                self.has_data = True
+                self.load_message = "Dados carregados: " + " | ".join(messages) + \
+                    SheetsService.describe_snapshots(snapshots)
             else:
                 self.load_message = "Erro: Não foi possível carregar nenhuma planilha"
-                self.has_data = False
 
         except Exception as e:
             self.load_message = f"Erro ao carregar dados: {str(e)}"
@@ -113,20 +337,448 @@ class State(rx.State):
         finally:
             self.is_loading = False
 
+        self._stale_snapshots = snapshots
+        if any(entry["revalidando"] for entry in snapshots):
+            return State.refresh_stale_sheets
+
+    def restore_persisted_data(self):
+        """Restaura o histórico gravado no banco ao abrir a página, sem baixar as planilhas"""
+        if self._sync_shared_dataset() or self.has_data:
+            return
+
+        try:
+            biometria_df, racao_df = PersistenceService.load_sheets()
+            messages = self._ingest_frames(biometria_df, racao_df)
+            self._refresh_versions()
+            if messages:
+                self.load_message = "Histórico restaurado do banco: " + " | ".join(messages)
+        except Exception as e:
+            logger.error("Erro ao restaurar dados persistidos", extra={"campos": {"erro": str(e)}})
+
+    def _refresh_versions(self):
+        """Atualiza o seletor com as versões gravadas (a mais recente é a "Atual")"""
+        try:
+            history = VersionService.history()
+        except Exception as e:
+            logger.error("Erro ao listar as versões do dataset", extra={"campos": {"erro": str(e)}})
+            return
+
+        self._version_ids = {}
+        for entry in history[1:]:
+            label = (
+                f"v{entry['id']} · {entry['criada_em']:%d/%m/%Y %H:%M} · "
+                f"{entry['biometria_linhas'] + entry['racao_linhas']} linhas ({entry['linhas_novas']} novas)"
+            )
+            self._version_ids[label] = entry["id"]
+        self.version_options = ["Atual", *self._version_ids] if self._version_ids else []
+        if self.selected_version not in self.version_options:
+            self.selected_version = "Atual"
+
+    @ProfilingService.profiled
+    def select_version(self, label: str):
+        """Exibe os dados e as métricas como estavam em uma versão anterior, remontada do banco
+
+        "Atual" volta à carga mais recente (no backend SQL, ao histórico persistido).
+        """
+        if label == self.selected_version:
+            return
+
+        try:
+            if label == "Atual" and METRICS_BACKEND == "sql":
+                biometria_df, racao_df = PersistenceService.load_sheets()
+            else:
+                history = VersionService.history(limit=1)
+                version_id = self._version_ids.get(label) or (history[0]["id"] if history else 0)
+                biometria_df, racao_df = VersionService.load(version_id)
+        except Exception as e:
+            logger.error("Erro ao carregar a versão do dataset", extra={"campos": {"versao": label, "erro": str(e)}})
+            self.load_message = f"Erro ao carregar a versão: {str(e)}"
+            return
+
+        # Só a sessão passa a ver a versão: nada é persistido nem publicado para os demais workers
+        self.selected_version = label
+        messages = self._ingest_frames(biometria_df, racao_df, publish=False)
+        self.load_message = (
+            "Dados da carga mais recente: " if label == "Atual" else f"Dados da versão {label.split(' · ')[0]}: "
+        ) + " | ".join(messages)
+
+        if self.has_data and self.show_dashboard:
+            self._next_recalc_generation()
+            event = self.calculate_metrics()
+            if self.comparison_tank_ids:
+                self.calculate_comparison()
+            return event
+
+    def _metrics_backend(self) -> str:
+        """Versões anteriores são calculadas em memória, mesmo com o backend SQL"""
+        return "pandas" if self.selected_version != "Atual" else METRICS_BACKEND
+
+    def _payload_function(self):
+        """Cálculo dos períodos pré-definidos no mesmo backend do recálculo manual"""
+        return functools.partial(compute_dashboard_payload, backend=self._metrics_backend())
+
+    def _ingest_frames(self, biometria_df: Optional[pd.DataFrame], racao_df: Optional[pd.DataFrame],
+                       shared: Optional["SharedDataset"] = None,
+                       validation: Optional[Dict[str, "ValidationResult"]] = None,
+                       publish: bool = True, period: str = "") -> List[str]:
+        """Prepara as tabelas, o dataset tipado e os períodos pré-definidos a partir das planilhas
+
+        ``validation`` é o resultado da validação já feita na carga (as planilhas recebidas
+        já são as linhas limpas); sem ele, as planilhas são validadas aqui. Com ``publish``
+        desligado (versões anteriores), a carga não é publicada no modo compartilhado.
+        ``period`` é o rótulo do período quando a carga traz só esse período das planilhas.
+        """
+        messages = []
+        quarantine: Dict[str, Optional[pd.DataFrame]] = {}
+        quality: Dict[str, Any] = {}
+
+        if shared is None:
+            if validation is None:
+                validation = ValidationService.validate_sheets(biometria_df, racao_df)
+                biometria_df, racao_df = validation["biometria"].clean, validation["racao"].clean
+            quarantine = {
+                f"quarentena_{sheet}": result.quarantine
+                for sheet, result in validation.items() if result.quarantine is not None
+            }
+            quality_sheets, quality_tanks, quality_data = ValidationService.to_columns(validation)
+            quality = {
+                "sheets": quality_sheets, "tanks": quality_tanks, "data": quality_data,
+                "totals": ValidationService.summary(validation)
+            }
+
+        # Modo compartilhado: publica a carga para os demais workers e passa a usar a versão mapeada
+        if shared is None and publish and SharedDatasetService.enabled():
+            current_biometria, current_racao = self._frames(all_rows=True)
+            try:
+                shared = SharedDatasetService.publish(
+                    biometria_df if biometria_df is not None and not biometria_df.empty else current_biometria,
+                    racao_df if racao_df is not None and not racao_df.empty else current_racao,
+                    extra_frames=quarantine, metadata={"qualidade": quality, "periodo": period}
+                )
+            except Exception as e:
+                logger.error("Erro ao publicar o dataset compartilhado", extra={"campos": {"erro": str(e)}})
+
+        if shared is not None:
+            quality = shared.metadata.get("qualidade", quality)
+            period = shared.metadata.get("periodo", period)
+            quarantine = {name: frame for name, frame in shared.frames.items() if name.startswith("quarentena_")}
+            biometria_df, racao_df = shared.frames.get("biometria"), shared.frames.get("racao")
+            biometria_typed, racao_typed = shared.frames.get("biometria_typed"), shared.frames.get("racao_typed")
+        else:
+            biometria_typed = DatasetService.prepare_biometry(biometria_df) if biometria_df is not None else None
+            racao_typed = DatasetService.prepare_feed(racao_df) if racao_df is not None else None
+
+        # Processa dados de Biometria
+        if biometria_df is not None and not biometria_df.empty:
+            self._biometria_df = biometria_df if shared is None else None
+            self._biometria_typed = biometria_typed if shared is None else None
+            self.biometria_headers = TableService.headers(biometria_df)
+
+            # Janela visível da tabela (primeira página)
+            self.biometria_page = 0
+            self.biometria_page_count = TableService.page_count(biometria_df, TABLE_PAGE_SIZE)
+            self.biometria_preview = TableService.get_page(biometria_df, 0, TABLE_PAGE_SIZE)
+
+            self.biometria_summary = f"Total de {len(biometria_df)} registros, {len(self.biometria_headers)} colunas"
+            messages.append(f"Biometria: {len(biometria_df)} registros")
+
+        # Processa dados de Ração
+        if racao_df is not None and not racao_df.empty:
+            self._racao_df = racao_df if shared is None else None
+            self._racao_typed = racao_typed if shared is None else None
+            self.racao_headers = TableService.headers(racao_df)
+
+            # Janela visível da tabela (primeira página)
+            self.racao_page = 0
+            self.racao_page_count = TableService.page_count(racao_df, TABLE_PAGE_SIZE)
+            self.racao_preview = TableService.get_page(racao_df, 0, TABLE_PAGE_SIZE)
+
+            self.racao_summary = f"Total de {len(racao_df)} registros, {len(self.racao_headers)} colunas"
+            messages.append(f"Ração: {len(racao_df)} registros")
+
+        self.has_data = len(messages) > 0
+        self.comparison_tank_ids, self.comparison_data, self.comparison_general = [], {}, {}
+        self.forecast_tank_ids, self.forecast_data, self.forecast_labels = [], {}, {}
+        self.close_drilldown()
+        self._shared_version = shared.version if shared is not None else ""
+        self.loaded_period = period if self.has_data else ""
+
+        if quality:
+            self.quality_sheets = quality.get("sheets", [])
+            self.quality_tanks = quality.get("tanks", [])
+            self.quality_data = quality.get("data", {})
+            self.quality_summary = ValidationService.describe(quality.get("totals", {}))
+            self.outlier_count = quality.get("totals", {}).get("biometria", {}).get("atipica", 0)
+
+        if self.has_data:
+            biometria_df, racao_df = self._frames(all_rows=True)
+            biometria_typed, racao_typed = self._typed_frames(all_rows=True)
+
+            self.farms = SourceRegistry.farms(biometria_df, racao_df)
+            if self.selected_farm not in self.farms:
+                self.selected_farm = SourceRegistry.ALL_FARMS
+
+            # Nova versão do dataset: pré-calcula os períodos pré-definidos em segundo plano
+            self._dataset_version = shared.version if shared is not None else DatasetService.dataset_version(
+                biometria_df, racao_df
+            )
+            self._preset_ranges = PresetService.preset_ranges(biometria_typed, racao_typed)
+            PresetService.warm(
+                self._dataset_version, biometria_df, racao_df,
+                dict(self._preset_ranges), list(self.farms), self._payload_function()
+            )
+            ExportService.register(self._dataset_version, biometria_df, racao_df, quarantine)
+            if self._metrics_backend() != "sql" and biometria_typed is not None \
+                    and len(biometria_typed) >= PROGRESSIVE_MIN_ROWS:
+                SamplingService.warm(self._dataset_version, biometria_typed, biometria_df)
+
+        return messages
+
+    @rx.var
+    def export_query(self) -> str:
+        """Parâmetros dos links de exportação: versão do dataset, período, fazenda e exclusão das atípicas"""
+        params = {
+            "versao": self._dataset_version, "inicio": self.start_date, "fim": self.end_date,
+            "fazenda": self.selected_farm
+        }
+        if self.exclude_outliers:
+            params["sem_atipicas"] = "1"
+        return urlencode(params)
+
+    def _frames(self, all_rows: bool = False) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """Planilhas da sessão (no modo compartilhado, as da versão publicada, mapeadas em memória)
+
+        Com a exclusão das medições atípicas ligada, a biometria vem sem elas, exceto
+        com ``all_rows`` (tabelas de dados, versão e publicação do dataset).
+        """
+        biometria_df, racao_df = self._biometria_df, self._racao_df
+        if self._shared_version:
+            shared = SharedDatasetService.attach(self._shared_version) or SharedDatasetService.attach()
+            if shared is not None:
+                biometria_df, racao_df = shared.frames.get("biometria"), shared.frames.get("racao")
+        if self.exclude_outliers and not all_rows:
+            biometria_df = OutlierService.exclude(biometria_df, self._dataset_version, "biometria")
+        return biometria_df, racao_df
+
+    def _typed_frames(self, all_rows: bool = False) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """Conjunto tipado da sessão (no modo compartilhado, o da versão publicada)"""
+        biometria_typed, racao_typed = self._biometria_typed, self._racao_typed
+        if self._shared_version:
+            shared = SharedDatasetService.attach(self._shared_version) or SharedDatasetService.attach()
+            if shared is not None:
+                biometria_typed, racao_typed = shared.frames.get("biometria_typed"), shared.frames.get("racao_typed")
+        if self.exclude_outliers and not all_rows:
+            biometria_typed = OutlierService.exclude(biometria_typed, self._dataset_version, "biometria_typed")
+        return biometria_typed, racao_typed
+
+    def _metrics_version(self) -> str:
+        """Versão usada nas chaves dos caches de métricas (separa o cálculo sem as medições atípicas)"""
+        return OutlierService.metrics_version(self._dataset_version, self.exclude_outliers)
+
+    def _sync_shared_dataset(self) -> bool:
+        """Passa a usar a versão compartilhada mais recente, publicada por qualquer worker"""
+        if not SharedDatasetService.enabled() or self.selected_version != "Atual":
+            return False
+
+        version = SharedDatasetService.current_version()
+        if not version or version == self._shared_version:
+            return False
+
+        shared = SharedDatasetService.attach(version)
+        if shared is None:
+            return False
+
+        messages = self._ingest_frames(None, None, shared)
+        if messages:
+            self.load_message = "Dados compartilhados atualizados: " + " | ".join(messages)
+        return bool(messages)
+
+    def change_biometria_page(self, delta: int):
+        """Avança ou retrocede a página visível da tabela de biometria"""
+        page = min(max(self.biometria_page + delta, 0), max(self.biometria_page_count - 1, 0))
+        self.biometria_page = page
+        self.biometria_preview = TableService.get_page(self._frames(all_rows=True)[0], page, TABLE_PAGE_SIZE)
+
+    def change_racao_page(self, delta: int):
+        """Avança ou retrocede a página visível da tabela de ração"""
+        page = min(max(self.racao_page + delta, 0), max(self.racao_page_count - 1, 0))
+        self.racao_page = page
+        self.racao_preview = TableService.get_page(self._frames(all_rows=True)[1], page, TABLE_PAGE_SIZE)
+
+    @ProfilingService.profiled
     def toggle_dashboard(self):
         """Alterna exibição do dashboard"""
         self.show_dashboard = not self.show_dashboard
+        if self.show_dashboard:
+            self._sync_shared_dataset()
         if self.show_dashboard and self.has_data:
-            self.calculate_metrics()
+            return self.calculate_metrics()
 
     def set_start_date(self, value: str):
         """Define data inicial"""
         self.start_date = value
+        self.active_preset = ""
+        if self.auto_recalc:
+            return State.schedule_recalculation
 
     def set_end_date(self, value: str):
         """Define data final"""
         self.end_date = value
+        self.active_preset = ""
+        if self.auto_recalc:
+            return State.schedule_recalculation
+
+    @ProfilingService.profiled
+    def apply_preset(self, key: str):
+        """Aplica um período pré-definido, usando as métricas pré-calculadas quando disponíveis"""
+        if not self.has_data or key not in self._preset_ranges:
+            return
+
+        # Descarta qualquer recálculo automático ainda em andamento
+        self._next_recalc_generation()
+
+        self.start_date, self.end_date = self._preset_ranges[key]
+        self.active_preset = key
+
+        message = (
+            f"Métricas do período de {MetricsService.convert_date_format(self.start_date)} "
+            f"a {MetricsService.convert_date_format(self.end_date)}"
+        )
+
+        payload = PresetService.get_cached(self._metrics_version(), self.start_date, self.end_date, self.selected_farm)
+        if payload is None and self._apply_approximate_metrics():
+            self.load_message = message
+            return State.refine_metrics
+
+        if payload is None:
+            # Ainda não aquecido: calcula agora e deixa no cache para as demais sessões
+            biometria_df, racao_df = self._frames()
+            payload = PresetService.compute(
+                self._metrics_version(), biometria_df, racao_df, self.start_date, self.end_date,
+                self.selected_farm, self._payload_function()
+            )
+
+        self.apply_metrics_payload(payload)
+        self.update_time_series()
+        self.load_message = message
+
+    @ProfilingService.profiled
+    def set_selected_farm(self, value: str):
+        """Seleciona a fazenda analisada no dashboard e atualiza as métricas"""
+        self.selected_farm = value
+        if not self.has_data:
+            return
+
+        if self.active_preset:
+            event = self.apply_preset(self.active_preset)
+        else:
+            self._next_recalc_generation()
+            event = self.calculate_metrics()
+
+        if self.comparison_tank_ids:
+            self.calculate_comparison()
+        return event
+
+    def toggle_auto_recalc(self, value: bool):
+        """Liga ou desliga o recálculo automático ao alterar as datas"""
+        self.auto_recalc = value
+        if value:
+            return State.schedule_recalculation
+
+        # Desligado: descarta o recálculo que ainda estiver na espera ou em andamento
+        self._next_recalc_generation()
+
+    def toggle_exclude_outliers(self, value: bool):
+        """Liga ou desliga a exclusão das medições atípicas e recalcula as análises do período"""
+        self.exclude_outliers = value
+        if not self.has_data or not self.show_dashboard:
+            return
+
+        self._next_recalc_generation()
+        event = self.calculate_metrics()
+        if self.comparison_tank_ids:
+            self.calculate_comparison()
+        return event
+
+    def authorize_profiling(self):
+        """Libera a chave de perfil quando a página foi aberta com a chave de administrador na URL"""
+        key = self.router.page.params.get(ProfilingService.QUERY_PARAM, "")
+        self._profiling_authorized = ProfilingService.authorized(key if isinstance(key, str) else "")
+        if not self._profiling_authorized:
+            self.is_profiling = False
+
+    @rx.var
+    def can_profile(self) -> bool:
+        """A sessão pode ligar o perfil (modo sessao e chave de administrador válida)"""
+        return self._profiling_authorized
+
+    def toggle_profiling(self, value: bool):
+        """Liga ou desliga o perfil dos event handlers nesta sessão (modo UI_BIA_PROFILE=sessao)"""
+        self.is_profiling = value and self._profiling_authorized
+
+    def _next_recalc_generation(self) -> int:
+        """Invalida qualquer recálculo em andamento e retorna a nova geração
+
+        O recálculo descartado não volta a limpar o indicador de cálculo; quem o substitui
+        liga de novo o indicador se também for calcular em segundo plano.
+        """
+        self._recalc_generation += 1
+        self.is_calculating = False
+        _recalc_generations.advance(self.router.session.client_token, self._recalc_generation)
+        return self._recalc_generation
+
+    @rx.event(background=True)
+    async def schedule_recalculation(self):
+        """Recalcula as métricas após uma pausa nas alterações de data, descartando períodos obsoletos"""
+        async with self:
+            generation = self._next_recalc_generation()
+            token = self.router.session.client_token
+            _recalc_generations.start(token, generation)
+
+        def is_stale() -> bool:
+            return _recalc_generations.is_stale(token, generation)
+
+        try:
+            # Debounce: só segue se nenhuma outra alteração chegou durante a espera
+            await asyncio.sleep(RECALC_DEBOUNCE_SECONDS)
+
+            async with self:
+                if is_stale():
+                    return
+                if not self.has_data or not self.start_date or not self.end_date:
+                    self.is_calculating = False
+                    return
+
+                biometria_df, racao_df = self._frames()
+                start_date, end_date, farm = self.start_date, self.end_date, self.selected_farm
+                backend = self._metrics_backend()
+                profile = ProfilingService.wanted(self)
+                self.is_calculating = True
+
+                # Modo progressivo: mostra a estimativa pela amostra enquanto o valor exato é calculado
+                self._apply_approximate_metrics()
+
+            # Cálculo pesado fora do lock do State, interrompido se o período for substituído
+            payload = await asyncio.to_thread(
+                ProfilingService.call, "schedule_recalculation", profile, compute_dashboard_payload,
+                biometria_df, racao_df, start_date, end_date, farm, is_stale, backend
+            )
+
+            async with self:
+                if payload is None or is_stale():
+                    return
+
+                self.apply_metrics_payload(payload)
+                self.update_time_series()
+                self.is_calculating = False
+                self.load_message = (
+                    f"Métricas recalculadas para o período de {MetricsService.convert_date_format(start_date)} "
+                    f"a {MetricsService.convert_date_format(end_date)}"
+                )
+        finally:
+            _recalc_generations.finish(token)
 
+    @ProfilingService.profiled
     def recalculate_metrics(self):
         """Recalcula as métricas com base no período selecionado"""
         if not self.has_data:
@@ -136,12 +788,16 @@ class State(rx.State):
             self.load_message = "Por favor, selecione as datas inicial e final para recalcular as métricas."
             return
 
+        # Descarta qualquer recálculo automático ainda em andamento
+        self._next_recalc_generation()
+        self._sync_shared_dataset()
+
         self.is_calculating = True
         self.load_message = "Recalculando métricas para o período selecionado..."
+        event = None
 
         try:
-            self.calculate_metrics()
-            self.calculate_temporal_correlation()
+            event = self.calculate_metrics()
 
             # Mensagem de sucesso com datas formatadas
             try:
@@ -165,115 +821,267 @@ class State(rx.State):
         finally:
             self.is_calculating = False
 
+        return event
+
     def calculate_metrics(self):
-        """Calcula métricas do dashboard"""
+        """Calcula métricas do dashboard (no modo progressivo, estima e agenda o refinamento exato)"""
         if not self.has_data:
             return
 
         try:
-            # Calcula métricas de biometria
-            biometry_metrics = MetricsService.calculate_biometry_metrics(
-                self.biometria_df, self.start_date, self.end_date
+            if self._apply_approximate_metrics():
+                self._next_recalc_generation()
+                return State.refine_metrics
+
+            biometria_df, racao_df = self._frames()
+            payload = compute_dashboard_payload(
+                biometria_df, racao_df, self.start_date, self.end_date, self.selected_farm,
+                backend=self._metrics_backend()
             )
+            self.apply_metrics_payload(payload)
 
-            # Calcula métricas de ração
-            feed_metrics = MetricsService.calculate_feed_metrics(
-                self.racao_df, self.start_date, self.end_date
+            # Atualiza as séries dos gráficos
+            self.update_time_series()
+
+        except Exception as e:
+            logger.error("Erro ao calcular métricas", extra={"campos": {"erro": str(e)}})
+            self.apply_metrics_payload({})
+
+    def _apply_approximate_metrics(self) -> bool:
+        """Aplica as métricas estimadas pela amostra estratificada, se o modo progressivo estiver ativo"""
+        if self._metrics_backend() == "sql":
+            return False
+
+        strata = SamplingService.get_strata(self._metrics_version())
+        if strata is None:
+            return False
+
+        _, racao_typed = self._typed_frames()
+        self.apply_metrics_payload(SamplingService.approximate_payload(
+            strata, racao_typed, self.start_date, self.end_date, self.selected_farm
+        ))
+        self.update_time_series()
+        return True
+
+    @rx.event(background=True)
+    async def refine_metrics(self):
+        """Substitui as métricas estimadas pelas exatas, calculadas fora do lock do State"""
+        async with self:
+            generation = self._recalc_generation
+            token = self.router.session.client_token
+            biometria_df, racao_df = self._frames()
+            start_date, end_date, farm = self.start_date, self.end_date, self.selected_farm
+            backend = self._metrics_backend()
+            preset, version = self.active_preset, self._metrics_version()
+            profile = ProfilingService.wanted(self)
+            _recalc_generations.start(token, generation)
+
+        def is_stale() -> bool:
+            return _recalc_generations.is_stale(token, generation)
+
+        try:
+            payload = await asyncio.to_thread(
+                ProfilingService.call, "refine_metrics", profile, compute_dashboard_payload,
+                biometria_df, racao_df, start_date, end_date, farm, is_stale, backend
             )
 
-            # Converte para listas simples para o State
-            self.tank_metrics = []
-            self.general_metrics = []
-
-            # Métricas por tanque
-            if biometry_metrics.get('por_tanque') and feed_metrics.get('por_tanque'):
-                for tanque in biometry_metrics['por_tanque']:
-                    bio_data = biometry_metrics['por_tanque'][tanque]
-                    feed_data = feed_metrics['por_tanque'].get(tanque, {})
-
-                    tank_row = [
-                        str(tanque),
-                        str(bio_data.get('peixes_medidos', 0)),
-                        f"{bio_data.get('area_media', 0.0):.2f}",
-                        f"{feed_data.get('racao_utilizada', 0.0):.2f}"
-                    ]
-                    self.tank_metrics.append(tank_row)
-
-            # Métricas gerais
-            if biometry_metrics.get('geral') and feed_metrics.get('geral'):
-                self.general_metrics = [
-                    str(biometry_metrics['geral'].get('total_peixes_medidos', 0)),
-                    f"{biometry_metrics['geral'].get('area_media_geral', 0.0):.2f}",
-                    f"{feed_metrics['geral'].get('total_racao_utilizada', 0.0):.2f}"
-                ]
-
-            # Calcula correlação temporal
-            self.calculate_temporal_correlation()
+            # Período pré-definido ainda não aquecido: o resultado exato fica no cache para as demais sessões
+            if preset:
+                PresetService.store(version, start_date, end_date, farm, payload)
+
+            async with self:
+                if payload is None or is_stale():
+                    return
+                self.apply_metrics_payload(payload)
+        finally:
+            _recalc_generations.finish(token)
+
+    def apply_metrics_payload(self, payload: Dict[str, Any]):
+        """Aplica no State as tabelas numéricas calculadas pelo MetricsService"""
+        with TelemetryService.span("estado"):
+            # Estimativas pela amostra trazem as margens de erro junto com os valores
+            self.is_approximate = 'area_media_erro' in payload.get('tank_metrics', {})
+            self.tank_ids = payload.get('tank_ids', [])
+            self.tank_metrics = payload.get('tank_metrics', {})
+            self.general_metrics = payload.get('general_metrics', {})
+            self.correlation_tank_ids = payload.get('correlation_tank_ids', [])
+            self.correlation_tank_data = payload.get('correlation_tank_data', {})
+            self.correlation_general_data = payload.get('correlation_general_data', {})
+            self.has_correlation_data = payload.get('has_correlation_data', False)
+
+            if self.correlation_sort_key:
+                self.correlation_tank_ids, self.correlation_tank_data = MetricsService.sort_columns(
+                    self.correlation_tank_ids, self.correlation_tank_data,
+                    self.correlation_sort_key, self.correlation_sort_desc
+                )
+
+    def sort_correlation(self, key: str):
+        """Ordena a tabela de correlação pela coluna clicada (clicar de novo inverte a ordem)"""
+        if self.correlation_sort_key == key:
+            self.correlation_sort_desc = not self.correlation_sort_desc
+        else:
+            self.correlation_sort_key = key
+            self.correlation_sort_desc = False
+
+        self.correlation_tank_ids, self.correlation_tank_data = MetricsService.sort_columns(
+            self.correlation_tank_ids, self.correlation_tank_data,
+            self.correlation_sort_key, self.correlation_sort_desc
+        )
+
+    def update_time_series(self):
+        """Agrega as séries diárias por tanque para o período selecionado"""
+        biometria_typed, racao_typed = self._typed_frames()
+        biometria = DatasetService.filter_range(
+            SourceRegistry.filter_farm(biometria_typed, self.selected_farm), self.start_date, self.end_date
+        )
+        racao = DatasetService.filter_range(
+            SourceRegistry.filter_farm(racao_typed, self.selected_farm), self.start_date, self.end_date
+        )
+
+        self._area_daily = TimeSeriesService.daily_series(biometria, "area", "mean")
+        self._feed_daily = TimeSeriesService.daily_series(racao, "peso", "sum")
+
+        tanks = set(self._area_daily["tanque"].astype(str)) | set(self._feed_daily["tanque"].astype(str))
+        self.chart_tanks = sorted(tanks, key=lambda t: (len(t), t))
+        if self.chart_tank not in self.chart_tanks:
+            self.chart_tank = self.chart_tanks[0] if self.chart_tanks else ""
+
+        self.update_chart_points()
+
+        # A projeção e o detalhe aberto acompanham o período e a fazenda selecionados
+        if self.forecast_tank_ids:
+            self.calculate_forecast()
+        if self.drill_tank:
+            self._update_drilldown()
+
+    def select_chart_tank(self, value: str):
+        """Seleciona o tanque exibido nos gráficos"""
+        self.chart_tank = value
+        self.update_chart_points()
+
+    def update_chart_points(self):
+        """Monta os pontos dos gráficos do tanque selecionado"""
+        self.area_series = TimeSeriesService.chart_points(self._area_daily, self.chart_tank, "area")
+        self.feed_series = TimeSeriesService.chart_points(self._feed_daily, self.chart_tank, "peso")
+
+    def set_compare_start(self, value: str):
+        """Define a data inicial do período de comparação"""
+        self.compare_start = value
+
+    def set_compare_end(self, value: str):
+        """Define a data final do período de comparação"""
+        self.compare_end = value
+
+    def compare_previous_period(self):
+        """Compara o período selecionado com o período de mesma duração imediatamente anterior"""
+        if not self.start_date or not self.end_date:
+            self.load_message = "Por favor, selecione as datas inicial e final para comparar os períodos."
+            return
+
+        self.compare_start, self.compare_end = ComparisonService.previous_window(self.start_date, self.end_date)
+        self.calculate_comparison()
+
+    def calculate_comparison(self):
+        """Calcula os dois períodos em uma única passada e monta as diferenças por tanque (B - A)"""
+        if not self.has_data:
+            return
+
+        if not self.start_date or not self.end_date or not self.compare_start or not self.compare_end:
+            self.load_message = "Por favor, selecione os dois períodos para comparar."
+            return
+
+        try:
+            biometria_typed, racao_typed = self._typed_frames()
+            result = ComparisonService.window_metrics(
+                SourceRegistry.filter_farm(biometria_typed, self.selected_farm),
+                SourceRegistry.filter_farm(racao_typed, self.selected_farm),
+                [(self.start_date, self.end_date), (self.compare_start, self.compare_end)]
+            )
+            self.comparison_tank_ids, self.comparison_data, self.comparison_general = ComparisonService.deltas(result)
 
         except Exception as e:
-            print(f"Erro ao calcular métricas: {e}")
-            self.tank_metrics = []
-            self.general_metrics = []
+            logger.error("Erro ao comparar períodos", extra={"campos": {"erro": str(e)}})
+            self.comparison_tank_ids, self.comparison_data, self.comparison_general = [], {}, {}
+
+    def set_target_area(self, value: str):
+        """Define a área média alvo da projeção"""
+        self.target_area = value
+
+    def calculate_forecast(self):
+        """Projeta, para todos os tanques do período, a data em que a área média atinge o alvo"""
+        if not self.has_data:
+            return
 
-    def calculate_temporal_correlation(self):
-        """Calcula correlação temporal entre crescimento de área e ração"""
         try:
-            if not self.has_data:
-                self.has_correlation_data = False
-                return
+            target = float(self.target_area.replace(",", "."))
+        except ValueError:
+            target = 0.0
+        if target <= 0:
+            self.load_message = "Por favor, informe uma área média alvo maior que zero."
+            return
 
-            # Calcula correlação temporal
-            correlation_data = MetricsService.calculate_temporal_correlation(
-                self.biometria_df, self.racao_df, self.start_date, self.end_date
+        try:
+            biometria_typed, _ = self._typed_frames()
+            biometria = DatasetService.filter_range(
+                SourceRegistry.filter_farm(biometria_typed, self.selected_farm), self.start_date, self.end_date
+            )
+            self.forecast_tank_ids, self.forecast_data, self.forecast_labels = ForecastService.to_columns(
+                ForecastService.project(biometria, target)
             )
 
-            if not correlation_data:
-                self.has_correlation_data = False
-                self.correlation_tank_data = []
-                self.correlation_general_data = []
-                return
-
-            # Converte dados por tanque para lista simples
-            self.correlation_tank_data = []
-            for tanque, data in correlation_data.items():
-                if tanque == 'geral':
-                    continue
-
-                # Determina cor do crescimento baseado no valor
-                crescimento_val = data.get('percentual_crescimento', 0)
-                crescimento_str = f"{crescimento_val:.1f}%"
-
-                tank_row = [
-                    str(tanque),  # Tanque
-                    f"{data.get('area_inicial', 0):.2f}",  # Área Inicial
-                    f"{data.get('area_final', 0):.2f}",  # Área Final
-                    f"{data.get('variacao_area', 0):.2f}",  # Variação
-                    crescimento_str,  # Crescimento %
-                    f"{data.get('racao_total', 0):.2f}",  # Ração Total
-                    f"{data.get('eficiencia_crescimento', 0):.4f}"  # Eficiência
-                ]
-                self.correlation_tank_data.append(tank_row)
-
-            # Converte dados gerais para lista simples
-            if 'geral' in correlation_data:
-                geral = correlation_data['geral']
-                self.correlation_general_data = [
-                    f"{geral.get('total_variacao_area', 0):.2f}",  # Total Variação Área
-                    f"{geral.get('total_racao', 0):.2f}",  # Total Ração
-                    f"{geral.get('media_crescimento_percentual', 0):.1f}%",  # Média Crescimento %
-                    f"{geral.get('eficiencia_geral', 0):.4f}",  # Eficiência Geral
-                    str(geral.get('tanques_analisados', 0))  # Tanques Analisados
-                ]
-            else:
-                self.correlation_general_data = []
+        except Exception as e:
+            logger.error("Erro ao projetar a data de despesca", extra={"campos": {"erro": str(e)}})
+            self.forecast_tank_ids, self.forecast_data, self.forecast_labels = [], {}, {}
 
-            self.has_correlation_data = len(self.correlation_tank_data) > 0
+    def open_drilldown(self, tank: str):
+        """Abre o detalhe de um tanque (clicar de novo no mesmo tanque fecha o painel)"""
+        if tank == self.drill_tank:
+            self.close_drilldown()
+            return
+        self.drill_tank = tank
+        self._update_drilldown()
+
+    def close_drilldown(self):
+        """Fecha o painel de detalhe"""
+        self.drill_tank = ""
+        self.drill_summary, self.drill_area_series, self.drill_feed_series = {}, [], []
+        self.drill_interval_labels, self.drill_intervals, self.drill_histogram = [], {}, []
+        self.drill_headers, self.drill_rows, self.drill_page, self.drill_page_count = [], [], 0, 0
+        self._drill_raw = None
+
+    def _update_drilldown(self):
+        """Calcula (ou lê do cache) o detalhe do tanque aberto para o período e a fazenda selecionados"""
+        if not self.has_data or not self.drill_tank:
+            return
 
+        try:
+            detail = DrillDownService.get(
+                self._metrics_version(), self.drill_tank, self.start_date, self.end_date, self.selected_farm,
+                self._frames(), self._typed_frames()
+            )
         except Exception as e:
-            print(f"Erro ao calcular correlação temporal: {e}")
-            self.has_correlation_data = False
-            self.correlation_tank_data = []
-            self.correlation_general_data = []
+            logger.error("Erro ao detalhar tanque", extra={"campos": {"tanque": self.drill_tank, "erro": str(e)}})
+            self.close_drilldown()
+            return
+
+        self.drill_summary = detail["resumo"]
+        self.drill_area_series = detail["area_series"]
+        self.drill_feed_series = detail["feed_series"]
+        self.drill_interval_labels = detail["intervalo_rotulos"]
+        self.drill_intervals = detail["intervalos"]
+        self.drill_histogram = detail["histograma"]
+
+        self._drill_raw = detail["linhas"]
+        self.drill_headers = TableService.headers(self._drill_raw)
+        self.drill_page = 0
+        self.drill_page_count = TableService.page_count(self._drill_raw, TABLE_PAGE_SIZE)
+        self.drill_rows = TableService.get_page(self._drill_raw, 0, TABLE_PAGE_SIZE)
+
+    def change_drill_page(self, delta: int):
+        """Avança ou retrocede a página das linhas brutas do tanque detalhado"""
+        page = min(max(self.drill_page + delta, 0), max(self.drill_page_count - 1, 0))
+        self.drill_page = page
+        self.drill_rows = TableService.get_page(self._drill_raw, page, TABLE_PAGE_SIZE)
 
 
 def create_metric_card(title: str, value: str, icon: str) -> rx.Component:
@@ -309,6 +1117,23 @@ def create_metric_card(title: str, value: str, icon: str) -> rx.Component:
     )
 
 
+def create_sortable_header(label: str, key: str) -> rx.Component:
+    """Cria um cabeçalho de coluna que ordena a tabela de correlação ao ser clicado"""
+    return rx.table.column_header_cell(
+        rx.hstack(
+            rx.text(label),
+            rx.cond(
+                State.correlation_sort_key == key,
+                rx.icon(rx.cond(State.correlation_sort_desc, "arrow-down", "arrow-up"), size=12)
+            ),
+            spacing="1",
+            align="center"
+        ),
+        on_click=State.sort_correlation(key),
+        style={"font_weight": "bold", "cursor": "pointer"}
+    )
+
+
 def create_correlation_table() -> rx.Component:
     """Cria a tabela de correlação temporal"""
     return rx.box(
@@ -352,35 +1177,49 @@ def create_correlation_table() -> rx.Component:
                             rx.table.root(
                                 rx.table.header(
                                     rx.table.row(
-                                        rx.table.column_header_cell("Tanque", style={"font_weight": "bold"}),
-                                        rx.table.column_header_cell("Área Inicial", style={"font_weight": "bold"}),
-                                        rx.table.column_header_cell("Área Final", style={"font_weight": "bold"}),
-                                        rx.table.column_header_cell("Variação", style={"font_weight": "bold"}),
-                                        rx.table.column_header_cell("Crescimento %", style={"font_weight": "bold"}),
-                                        rx.table.column_header_cell("Ração Total (kg)", style={"font_weight": "bold"}),
-                                        rx.table.column_header_cell("Eficiência*", style={"font_weight": "bold"})
+                                        create_sortable_header("Tanque", "tanque"),
+                                        create_sortable_header("Área Inicial", "area_inicial"),
+                                        create_sortable_header("Área Final", "area_final"),
+                                        create_sortable_header("Variação", "variacao_area"),
+                                        create_sortable_header("Crescimento %", "percentual_crescimento"),
+                                        create_sortable_header("Ração Total (kg)", "racao_total"),
+                                        create_sortable_header("Eficiência*", "eficiencia_crescimento")
                                     )
                                 ),
                                 rx.table.body(
                                     rx.foreach(
-                                        State.correlation_tank_data,
-                                        lambda row: rx.table.row(
-                                            rx.table.cell(f"Tanque {row[0]}",
+                                        State.correlation_tank_ids,
+                                        lambda tanque, i: rx.table.row(
+                                            rx.table.cell(f"Tanque {tanque}",
                                                           style={"font_weight": "bold", "color": "black"}),
-                                            rx.table.cell(row[1], style={"color": "black"}),
-                                            rx.table.cell(row[2], style={"color": "black"}),
-                                            rx.table.cell(row[3], style={"color": "black"}),
-                                            # Corrigido: usando rx.cond() em vez do operador 'in'
+                                            rx.table.cell(rx.cond(
+                                                State.is_approximate,
+                                                f"{State.correlation_tank_data['area_inicial'][i]:.2f} ± "
+                                                f"{State.correlation_tank_data['area_inicial_erro'][i]:.2f}",
+                                                f"{State.correlation_tank_data['area_inicial'][i]:.2f}"
+                                            ), style={"color": "black"}),
+                                            rx.table.cell(rx.cond(
+                                                State.is_approximate,
+                                                f"{State.correlation_tank_data['area_final'][i]:.2f} ± "
+                                                f"{State.correlation_tank_data['area_final_erro'][i]:.2f}",
+                                                f"{State.correlation_tank_data['area_final'][i]:.2f}"
+                                            ), style={"color": "black"}),
+                                            rx.table.cell(f"{State.correlation_tank_data['variacao_area'][i]:.2f}",
+                                                          style={"color": "black"}),
                                             rx.table.cell(
-                                                row[4],
+                                                f"{State.correlation_tank_data['percentual_crescimento'][i]:.1f}%",
                                                 style=rx.cond(
-                                                    row[4].contains("-"),
+                                                    State.correlation_tank_data['percentual_crescimento'][i] < 0,
                                                     {"color": "red"},
                                                     {"color": "green"}
                                                 )
                                             ),
-                                            rx.table.cell(row[5], style={"color": "black"}),
-                                            rx.table.cell(row[6], style={"color": "black"})
+                                            rx.table.cell(f"{State.correlation_tank_data['racao_total'][i]:.2f}",
+                                                          style={"color": "black"}),
+                                            rx.table.cell(
+                                                f"{State.correlation_tank_data['eficiencia_crescimento'][i]:.4f}",
+                                                style={"color": "black"}
+                                            )
                                         )
                                     )
                                 ),
@@ -403,13 +1242,21 @@ def create_correlation_table() -> rx.Component:
                         rx.vstack(
                             rx.heading("📊 Resumo Geral do Período", size="3", color="black"),
                             rx.hstack(
-                                create_metric_card("Variação Total da Área", State.correlation_general_data[0],
+                                create_metric_card("Variação Total da Área",
+                                                   f"{State.correlation_general_data['total_variacao_area']:.2f}",
                                                    "trending-up"),
-                                create_metric_card("Ração Total Utilizada", f"{State.correlation_general_data[1]} kg",
+                                create_metric_card("Ração Total Utilizada",
+                                                   f"{State.correlation_general_data['total_racao']:.2f} kg",
                                                    "package"),
-                                create_metric_card("Crescimento Médio", State.correlation_general_data[2], "percent"),
-                                create_metric_card("Eficiência Geral", State.correlation_general_data[3], "zap"),
-                                create_metric_card("Tanques Analisados", State.correlation_general_data[4], "database"),
+                                create_metric_card("Crescimento Médio",
+                                                   f"{State.correlation_general_data['media_crescimento_percentual']:.1f}%",
+                                                   "percent"),
+                                create_metric_card("Eficiência Geral",
+                                                   f"{State.correlation_general_data['eficiencia_geral']:.4f}",
+                                                   "zap"),
+                                create_metric_card("Tanques Analisados",
+                                                   State.correlation_general_data['tanques_analisados'].to_string(),
+                                                   "database"),
                                 spacing="3",
                                 width="100%",
                                 wrap="wrap"
@@ -492,6 +1339,622 @@ def create_correlation_table() -> rx.Component:
     )
 
 
+def create_time_series_charts() -> rx.Component:
+    """Cria os gráficos de evolução da área e da ração por tanque"""
+    return rx.box(
+        rx.vstack(
+            rx.hstack(
+                rx.heading("📉 Evolução Temporal por Tanque", size="4", color="black"),
+                rx.spacer(),
+                rx.select(
+                    State.chart_tanks,
+                    value=State.chart_tank,
+                    on_change=State.select_chart_tank,
+                    placeholder="Tanque",
+                    size="2"
+                ),
+                width="100%",
+                align="center"
+            ),
+            rx.text("Área média diária", size="2", weight="bold", color="black"),
+            rx.recharts.area_chart(
+                rx.recharts.area(
+                    data_key="valor",
+                    stroke=rx.color("blue", 9),
+                    fill=rx.color("blue", 4),
+                    is_animation_active=False
+                ),
+                rx.recharts.x_axis(data_key="data"),
+                rx.recharts.y_axis(),
+                rx.recharts.cartesian_grid(stroke_dasharray="3 3"),
+                rx.recharts.graphing_tooltip(),
+                data=State.area_series,
+                width="100%",
+                height=250
+            ),
+            rx.text("Ração utilizada por dia (kg)", size="2", weight="bold", color="black"),
+            rx.recharts.line_chart(
+                rx.recharts.line(
+                    data_key="valor",
+                    stroke=rx.color("green", 9),
+                    dot=False,
+                    is_animation_active=False
+                ),
+                rx.recharts.x_axis(data_key="data"),
+                rx.recharts.y_axis(),
+                rx.recharts.cartesian_grid(stroke_dasharray="3 3"),
+                rx.recharts.graphing_tooltip(),
+                data=State.feed_series,
+                width="100%",
+                height=250
+            ),
+            spacing="3",
+            width="100%"
+        ),
+        padding="1rem",
+        border="1px solid",
+        border_color=rx.color("gray", 4),
+        border_radius="8px",
+        bg=rx.color("gray", 1),
+        width="100%"
+    )
+
+
+# Colunas da comparação entre períodos: campo, rótulo e casas decimais
+COMPARISON_COLUMNS = [
+    ("area_media", "Área Média", 2),
+    ("racao_utilizada", "Ração (kg)", 2),
+    ("variacao_area", "Variação da Área", 2),
+    ("eficiencia_crescimento", "Eficiência", 4),
+]
+
+
+def create_comparison_value(field: str, suffix: str, digits: int, i) -> rx.Component:
+    """Cria a célula de um valor da comparação (a diferença é colorida pelo sinal)"""
+    value = State.comparison_data[f"{field}_{suffix}"][i]
+    text = f"{value:.4f}" if digits == 4 else f"{value:.2f}"
+    if suffix != "delta":
+        return rx.table.cell(text, style={"color": "black"})
+    return rx.table.cell(
+        text,
+        style=rx.cond(value < 0, {"color": "red", "font_weight": "bold"}, {"color": "green", "font_weight": "bold"})
+    )
+
+
+def create_comparison_table() -> rx.Component:
+    """Cria a comparação por tanque entre o período selecionado (A) e um período de comparação (B)"""
+    return rx.box(
+        rx.vstack(
+            rx.heading("🔀 Comparação entre Períodos", size="4", color="black"),
+            rx.text(
+                "A: período selecionado nos filtros. B: período de comparação. Δ = B - A.",
+                size="1",
+                color="black"
+            ),
+            rx.hstack(
+                rx.vstack(
+                    rx.text("Início de B", size="1", weight="bold", color="black"),
+                    rx.input(
+                        value=State.compare_start,
+                        on_change=State.set_compare_start,
+                        type="date",
+                        size="2"
+                    ),
+                    spacing="1",
+                    align="start"
+                ),
+                rx.vstack(
+                    rx.text("Fim de B", size="1", weight="bold", color="black"),
+                    rx.input(
+                        value=State.compare_end,
+                        on_change=State.set_compare_end,
+                        type="date",
+                        size="2"
+                    ),
+                    spacing="1",
+                    align="start"
+                ),
+                rx.button(
+                    rx.hstack(
+                        rx.icon("history", size=16),
+                        rx.text("Período anterior", size="1"),
+                        spacing="2",
+                        align="center"
+                    ),
+                    on_click=State.compare_previous_period,
+                    variant="outline",
+                    color_scheme="blue",
+                    size="2"
+                ),
+                rx.button(
+                    rx.hstack(
+                        rx.icon("git-compare", size=16),
+                        rx.text("Comparar", size="1"),
+                        spacing="2",
+                        align="center"
+                    ),
+                    on_click=State.calculate_comparison,
+                    variant="solid",
+                    color_scheme="blue",
+                    size="2"
+                ),
+                spacing="4",
+                align="end",
+                wrap="wrap"
+            ),
+            rx.cond(
+                State.comparison_tank_ids.length() > 0,
+                rx.vstack(
+                    rx.hstack(
+                        create_metric_card("Δ Peixes Medidos",
+                                           State.comparison_general['total_peixes_medidos_delta'].to_string(), "fish"),
+                        create_metric_card("Δ Área Média Geral",
+                                           f"{State.comparison_general['area_media_geral_delta']:.2f}", "ruler"),
+                        create_metric_card("Δ Ração Utilizada",
+                                           f"{State.comparison_general['total_racao_utilizada_delta']:.2f} kg",
+                                           "package"),
+                        create_metric_card("Δ Eficiência Geral",
+                                           f"{State.comparison_general['eficiencia_geral_delta']:.4f}", "zap"),
+                        spacing="3",
+                        width="100%",
+                        wrap="wrap"
+                    ),
+                    rx.box(
+                        rx.table.root(
+                            rx.table.header(
+                                rx.table.row(
+                                    rx.table.column_header_cell("Tanque", style={"font_weight": "bold"}),
+                                    *[
+                                        rx.table.column_header_cell(f"{label} {suffix}", style={"font_weight": "bold"})
+                                        for _, label, _ in COMPARISON_COLUMNS
+                                        for suffix in ("A", "B", "Δ")
+                                    ]
+                                )
+                            ),
+                            rx.table.body(
+                                rx.foreach(
+                                    State.comparison_tank_ids,
+                                    lambda tanque, i: rx.table.row(
+                                        rx.table.cell(f"Tanque {tanque}",
+                                                      style={"font_weight": "bold", "color": "black"}),
+                                        *[
+                                            create_comparison_value(field, suffix, digits, i)
+                                            for field, _, digits in COMPARISON_COLUMNS
+                                            for suffix in ("a", "b", "delta")
+                                        ]
+                                    )
+                                )
+                            ),
+                            variant="surface",
+                            size="1"
+                        ),
+                        width="100%",
+                        overflow_x="auto",
+                        border="1px solid",
+                        border_color=rx.color("gray", 4),
+                        border_radius="8px"
+                    ),
+                    spacing="3",
+                    width="100%"
+                )
+            ),
+            spacing="3",
+            width="100%"
+        ),
+        padding="1rem",
+        border="1px solid",
+        border_color=rx.color("gray", 4),
+        border_radius="8px",
+        bg=rx.color("gray", 1),
+        width="100%"
+    )
+
+
+def create_forecast_table() -> rx.Component:
+    """Cria a projeção por tanque da data em que a área média alvo será atingida"""
+    return rx.box(
+        rx.vstack(
+            rx.heading("🎯 Projeção de Despesca", size="4", color="black"),
+            rx.text(
+                "Ajusta os modelos linear e log-linear às médias diárias de área do período selecionado "
+                "e projeta quando cada tanque atinge a área alvo (intervalo de 95% da taxa de crescimento).",
+                size="1",
+                color="black"
+            ),
+            rx.hstack(
+                rx.vstack(
+                    rx.text("Área média alvo", size="1", weight="bold", color="black"),
+                    rx.input(
+                        placeholder="ex.: 40",
+                        value=State.target_area,
+                        on_change=State.set_target_area,
+                        type="number",
+                        size="2"
+                    ),
+                    spacing="1",
+                    align="start"
+                ),
+                rx.button(
+                    rx.hstack(
+                        rx.icon("target", size=16),
+                        rx.text("Projetar", size="1"),
+                        spacing="2",
+                        align="center"
+                    ),
+                    on_click=State.calculate_forecast,
+                    variant="solid",
+                    color_scheme="blue",
+                    size="2"
+                ),
+                spacing="4",
+                align="end"
+            ),
+            rx.cond(
+                State.forecast_tank_ids.length() > 0,
+                rx.box(
+                    rx.table.root(
+                        rx.table.header(
+                            rx.table.row(
+                                *[
+                                    rx.table.column_header_cell(label, style={"font_weight": "bold"})
+                                    for label in ["Tanque", "Modelo", "Área Atual", "Crescimento/dia", "R²",
+                                                  "Dias até a Meta", "Data Prevista", "Intervalo"]
+                                ]
+                            )
+                        ),
+                        rx.table.body(
+                            rx.foreach(
+                                State.forecast_tank_ids,
+                                lambda tanque, i: rx.table.row(
+                                    rx.table.cell(f"Tanque {tanque}", style={"font_weight": "bold", "color": "black"}),
+                                    rx.table.cell(State.forecast_labels["modelo"][i], style={"color": "black"}),
+                                    rx.table.cell(f"{State.forecast_data['area_atual'][i]:.2f}",
+                                                  style={"color": "black"}),
+                                    rx.table.cell(f"{State.forecast_data['taxa_diaria'][i]:.4f}",
+                                                  style={"color": "black"}),
+                                    rx.table.cell(f"{State.forecast_data['r2'][i]:.3f}", style={"color": "black"}),
+                                    rx.table.cell(State.forecast_data["dias_para_meta"][i].to_string(),
+                                                  style={"color": "black"}),
+                                    rx.table.cell(State.forecast_labels["previsao"][i],
+                                                  style={"font_weight": "bold", "color": "black"}),
+                                    rx.table.cell(State.forecast_labels["intervalo"][i], style={"color": "black"})
+                                )
+                            )
+                        ),
+                        variant="surface",
+                        size="1"
+                    ),
+                    width="100%",
+                    overflow_x="auto",
+                    border="1px solid",
+                    border_color=rx.color("gray", 4),
+                    border_radius="8px"
+                )
+            ),
+            spacing="3",
+            width="100%"
+        ),
+        padding="1rem",
+        border="1px solid",
+        border_color=rx.color("gray", 4),
+        border_radius="8px",
+        bg=rx.color("gray", 1),
+        width="100%"
+    )
+
+
+# Colunas do crescimento entre biometrias no detalhe do tanque: campo, rótulo e casas decimais
+INTERVAL_COLUMNS = [
+    ("area_inicial", "Área Inicial", 2),
+    ("area_final", "Área Final", 2),
+    ("variacao_area", "Variação", 2),
+    ("taxa_diaria", "Crescimento/dia", 4),
+    ("percentual_crescimento", "Crescimento %", 1),
+    ("racao", "Ração (kg)", 2),
+    ("eficiencia_crescimento", "Eficiência", 4),
+]
+
+
+def create_interval_value(field: str, digits: int, i) -> rx.Component:
+    """Cria a célula de um valor do crescimento entre biometrias"""
+    value = State.drill_intervals[field][i]
+    text = {1: f"{value:.1f}", 2: f"{value:.2f}", 4: f"{value:.4f}"}[digits]
+    if field != "variacao_area":
+        return rx.table.cell(text, style={"color": "black"})
+    return rx.table.cell(text, style=rx.cond(value < 0, {"color": "red"}, {"color": "green"}))
+
+
+def create_drilldown_panel() -> rx.Component:
+    """Cria o painel de detalhe do tanque aberto a partir das métricas por tanque"""
+    return rx.box(
+        rx.vstack(
+            rx.hstack(
+                rx.heading(f"🔎 Detalhe do Tanque {State.drill_tank}", size="4", color="black"),
+                rx.spacer(),
+                rx.button(
+                    rx.icon("x", size=16),
+                    on_click=State.close_drilldown,
+                    variant="ghost",
+                    color_scheme="gray",
+                    size="1"
+                ),
+                width="100%",
+                align="center"
+            ),
+            rx.hstack(
+                create_metric_card("Biometrias", State.drill_summary['biometrias'].to_string(), "calendar"),
+                create_metric_card("Peixes Medidos", State.drill_summary['peixes_medidos'].to_string(), "fish"),
+                create_metric_card("Área Média",
+                                   f"{State.drill_summary['area_media']:.2f} ± {State.drill_summary['area_desvio']:.2f}",
+                                   "ruler"),
+                create_metric_card("Coef. de Variação", f"{State.drill_summary['area_cv']:.1f}%", "percent"),
+                create_metric_card("Crescimento/dia", f"{State.drill_summary['crescimento_diario']:.4f}",
+                                   "trending-up"),
+                create_metric_card("Ração Total", f"{State.drill_summary['racao_total']:.2f} kg", "package"),
+                spacing="3",
+                width="100%",
+                wrap="wrap"
+            ),
+            rx.text(
+                f"Área: mínimo {State.drill_summary['area_min']:.2f} · 1º quartil {State.drill_summary['area_p25']:.2f}"
+                f" · mediana {State.drill_summary['area_mediana']:.2f} · 3º quartil {State.drill_summary['area_p75']:.2f}"
+                f" · máximo {State.drill_summary['area_max']:.2f}",
+                size="1",
+                color="black"
+            ),
+            rx.hstack(
+                rx.vstack(
+                    rx.text("Área média diária", size="2", weight="bold", color="black"),
+                    rx.recharts.line_chart(
+                        rx.recharts.line(
+                            data_key="valor",
+                            stroke=rx.color("blue", 9),
+                            is_animation_active=False
+                        ),
+                        rx.recharts.x_axis(data_key="data"),
+                        rx.recharts.y_axis(),
+                        rx.recharts.cartesian_grid(stroke_dasharray="3 3"),
+                        rx.recharts.graphing_tooltip(),
+                        data=State.drill_area_series,
+                        width="100%",
+                        height=220
+                    ),
+                    width="100%"
+                ),
+                rx.vstack(
+                    rx.text("Distribuição das áreas medidas", size="2", weight="bold", color="black"),
+                    rx.recharts.bar_chart(
+                        rx.recharts.bar(
+                            data_key="peixes",
+                            fill=rx.color("blue", 8),
+                            is_animation_active=False
+                        ),
+                        rx.recharts.x_axis(data_key="faixa"),
+                        rx.recharts.y_axis(allow_decimals=False),
+                        rx.recharts.cartesian_grid(stroke_dasharray="3 3"),
+                        rx.recharts.graphing_tooltip(),
+                        data=State.drill_histogram,
+                        width="100%",
+                        height=220
+                    ),
+                    width="100%"
+                ),
+                spacing="4",
+                width="100%"
+            ),
+            rx.text("Ração utilizada por dia (kg)", size="2", weight="bold", color="black"),
+            rx.recharts.bar_chart(
+                rx.recharts.bar(
+                    data_key="valor",
+                    fill=rx.color("green", 8),
+                    is_animation_active=False
+                ),
+                rx.recharts.x_axis(data_key="data"),
+                rx.recharts.y_axis(),
+                rx.recharts.cartesian_grid(stroke_dasharray="3 3"),
+                rx.recharts.graphing_tooltip(),
+                data=State.drill_feed_series,
+                width="100%",
+                height=180
+            ),
+            rx.text("Crescimento entre biometrias", size="2", weight="bold", color="black"),
+            rx.cond(
+                State.drill_interval_labels.length() > 0,
+                rx.box(
+                    rx.table.root(
+                        rx.table.header(
+                            rx.table.row(
+                                rx.table.column_header_cell("Intervalo", style={"font_weight": "bold"}),
+                                rx.table.column_header_cell("Dias", style={"font_weight": "bold"}),
+                                *[
+                                    rx.table.column_header_cell(label, style={"font_weight": "bold"})
+                                    for _, label, _ in INTERVAL_COLUMNS
+                                ]
+                            )
+                        ),
+                        rx.table.body(
+                            rx.foreach(
+                                State.drill_interval_labels,
+                                lambda intervalo, i: rx.table.row(
+                                    rx.table.cell(intervalo, style={"font_weight": "bold", "color": "black"}),
+                                    rx.table.cell(State.drill_intervals["dias"][i].to_string(),
+                                                  style={"color": "black"}),
+                                    *[
+                                        create_interval_value(field, digits, i)
+                                        for field, _, digits in INTERVAL_COLUMNS
+                                    ]
+                                )
+                            )
+                        ),
+                        variant="surface",
+                        size="1"
+                    ),
+                    width="100%",
+                    overflow_x="auto",
+                    border="1px solid",
+                    border_color=rx.color("gray", 4),
+                    border_radius="8px"
+                ),
+                rx.text("São necessárias ao menos duas biometrias no período.", size="1", color="black")
+            ),
+            create_virtualized_data_table(
+                "Linhas da biometria",
+                "Linhas da planilha do tanque no período, como foram carregadas",
+                State.drill_headers,
+                State.drill_rows,
+                State.drill_page,
+                State.drill_page_count,
+                on_previous=State.change_drill_page(-1),
+                on_next=State.change_drill_page(1),
+                visible_rows=TABLE_PAGE_SIZE
+            ),
+            spacing="3",
+            width="100%"
+        ),
+        padding="1rem",
+        border="1px solid",
+        border_color=rx.color("blue", 6),
+        border_radius="8px",
+        bg=rx.color("gray", 1),
+        width="100%"
+    )
+
+
+EXPORT_TABLES = [
+    ("biometria", "Biometria"),
+    ("racao", "Ração"),
+    ("tanques", "Métricas por tanque"),
+    ("correlacao", "Correlação"),
+]
+
+
+def create_export_link(table: str, file_format: str) -> rx.Component:
+    """Link de download gerado em fluxo pelo backend (/api/export)"""
+    return rx.link(
+        rx.button(
+            rx.icon("download", size=14),
+            rx.text(file_format.upper(), size="1"),
+            variant="soft",
+            color_scheme="blue",
+            size="1"
+        ),
+        href=f"{rx.config.get_config().api_url}/api/export/{table}.{file_format}?" + State.export_query,
+        is_external=True
+    )
+
+
+def create_export_bar() -> rx.Component:
+    """Downloads das linhas filtradas e das tabelas de métricas do período selecionado"""
+    return rx.hstack(
+        rx.text("Exportar período:", size="2", weight="bold", color="black"),
+        *[
+            rx.hstack(
+                rx.text(label, size="1", color="black"),
+                create_export_link(table, "csv"),
+                create_export_link(table, "xlsx"),
+                spacing="1",
+                align="center"
+            )
+            for table, label in EXPORT_TABLES
+        ],
+        spacing="4",
+        align="center",
+        wrap="wrap",
+        width="100%"
+    )
+
+
+QUALITY_COLUMNS = [
+    ("total", "Linhas"),
+    ("quarentena", "Quarentena"),
+    ("data_invalida", "Data inválida"),
+    ("tanque_ausente", "Sem tanque"),
+    ("largura_nao_numerico", "Largura não numérica"),
+    ("largura_fora_faixa", "Largura fora da faixa"),
+    ("altura_nao_numerico", "Altura não numérica"),
+    ("altura_fora_faixa", "Altura fora da faixa"),
+    ("peso_nao_numerico", "Peso não numérico"),
+    ("peso_fora_faixa", "Peso fora da faixa"),
+    ("duplicada", "Duplicadas"),
+    ("atipica", "Medições atípicas"),
+]
+
+
+def create_quality_report() -> rx.Component:
+    """Relatório da validação da carga: linhas marcadas por regra em cada tanque e downloads da quarentena"""
+    return rx.box(
+        rx.vstack(
+            rx.heading("🧪 Qualidade dos Dados", size="4", color="black"),
+            rx.text(State.quality_summary, size="2", color="black"),
+            rx.hstack(
+                rx.text("Linhas em quarentena:", size="1", color="black"),
+                *[
+                    rx.hstack(
+                        rx.text(label, size="1", color="black"),
+                        create_export_link(table, "csv"),
+                        create_export_link(table, "xlsx"),
+                        spacing="1",
+                        align="center"
+                    )
+                    for table, label in [("quarentena_biometria", "Biometria"), ("quarentena_racao", "Ração")]
+                ],
+                spacing="4",
+                align="center",
+                wrap="wrap"
+            ),
+            rx.cond(
+                State.quality_tanks.length() > 0,
+                rx.box(
+                    rx.table.root(
+                        rx.table.header(
+                            rx.table.row(
+                                rx.table.column_header_cell("Planilha", style={"font_weight": "bold"}),
+                                rx.table.column_header_cell("Tanque", style={"font_weight": "bold"}),
+                                *[
+                                    rx.table.column_header_cell(label, style={"font_weight": "bold"})
+                                    for _, label in QUALITY_COLUMNS
+                                ]
+                            )
+                        ),
+                        rx.table.body(
+                            rx.foreach(
+                                State.quality_tanks,
+                                lambda tanque, i: rx.table.row(
+                                    rx.table.cell(
+                                        rx.cond(State.quality_sheets[i] == "racao", "Ração", "Biometria"),
+                                        style={"color": "black"}
+                                    ),
+                                    rx.table.cell(tanque, style={"font_weight": "bold", "color": "black"}),
+                                    *[
+                                        rx.table.cell(State.quality_data[key][i].to_string(), style={"color": "black"})
+                                        for key, _ in QUALITY_COLUMNS
+                                    ]
+                                )
+                            )
+                        ),
+                        variant="surface",
+                        size="1"
+                    ),
+                    width="100%",
+                    overflow_x="auto",
+                    border="1px solid",
+                    border_color=rx.color("gray", 4),
+                    border_radius="8px"
+                ),
+                rx.text("Nenhuma linha inválida, duplicada ou fora da faixa.", size="1", color="black")
+            ),
+            spacing="3",
+            width="100%"
+        ),
+        padding="1rem",
+        border="1px solid",
+        border_color=rx.color("gray", 4),
+        border_radius="8px",
+        bg=rx.color("gray", 1),
+        width="100%"
+    )
+
+
 def create_dashboard() -> rx.Component:
     """Cria o dashboard de métricas"""
     return rx.vstack(
@@ -511,6 +1974,64 @@ def create_dashboard() -> rx.Component:
                     weight="bold",
                     color="black"
                 ),
+                # Fazenda analisada (aparece quando há mais de uma fonte)
+                rx.cond(
+                    State.farms.length() > 2,
+                    rx.hstack(
+                        rx.icon("warehouse", size=16, color="black"),
+                        rx.select(
+                            State.farms,
+                            value=State.selected_farm,
+                            on_change=State.set_selected_farm,
+                            size="2"
+                        ),
+                        spacing="2",
+                        align="center"
+                    )
+                ),
+                # Versão do dataset analisada (aparece quando há versões anteriores gravadas)
+                rx.cond(
+                    State.version_options.length() > 1,
+                    rx.hstack(
+                        rx.icon("history", size=16, color="black"),
+                        rx.select(
+                            State.version_options,
+                            value=State.selected_version,
+                            on_change=State.select_version,
+                            size="2"
+                        ),
+                        rx.cond(
+                            State.selected_version != "Atual",
+                            rx.badge("Versão anterior: métricas como estavam nessa carga", color_scheme="amber")
+                        ),
+                        spacing="2",
+                        align="center"
+                    )
+                ),
+                # Sessão carregada por "Buscar período": os presets valem só para esse período
+                rx.cond(
+                    State.loaded_period != "",
+                    rx.badge(
+                        rx.icon("calendar-range", size=14),
+                        "Somente o período " + State.loaded_period + " (use Carregar Planilhas para o histórico)",
+                        color_scheme="amber"
+                    )
+                ),
+                # Períodos pré-definidos (pré-calculados após cada carga)
+                rx.hstack(
+                    *[
+                        rx.button(
+                            label,
+                            on_click=State.apply_preset(key),
+                            variant=rx.cond(State.active_preset == key, "solid", "soft"),
+                            color_scheme="blue",
+                            size="1"
+                        )
+                        for key, label in PresetService.PRESETS
+                    ],
+                    spacing="2",
+                    wrap="wrap"
+                ),
                 rx.hstack(
                     rx.vstack(
                         rx.text(
@@ -579,9 +2100,83 @@ def create_dashboard() -> rx.Component:
                         spacing="1",
                         align="start"
                     ),
+                    # Busca na planilha apenas o período selecionado
+                    rx.button(
+                        rx.hstack(
+                            rx.icon("cloud-download", size=16),
+                            rx.text("Buscar período", size="1"),
+                            spacing="2",
+                            align="center"
+                        ),
+                        on_click=State.load_period_from_sheets,
+                        variant="outline",
+                        color_scheme="blue",
+                        size="2",
+                        disabled=State.is_loading
+                    ),
+                    # Recálculo automático ao alterar as datas
+                    rx.hstack(
+                        rx.switch(
+                            checked=State.auto_recalc,
+                            on_change=State.toggle_auto_recalc,
+                            size="2"
+                        ),
+                        rx.text("Recálculo automático", size="1", color="black"),
+                        spacing="2",
+                        align="center",
+                        padding_bottom="0.5rem"
+                    ),
+                    # Exclusão das medições atípicas (mediana/MAD do tanque no dia) das métricas
+                    rx.hstack(
+                        rx.switch(
+                            checked=State.exclude_outliers,
+                            on_change=State.toggle_exclude_outliers,
+                            color_scheme="amber",
+                            size="2"
+                        ),
+                        rx.text("Excluir atípicas", size="1", color="black"),
+                        rx.badge(
+                            State.outlier_count.to_string(),
+                            color_scheme=rx.cond(State.outlier_count > 0, "amber", "gray"),
+                            variant="soft"
+                        ),
+                        spacing="2",
+                        align="center",
+                        padding_bottom="0.5rem"
+                    ),
+                    # Perfil dos handlers desta sessão, só com UI_BIA_PROFILE=sessao e a chave de administrador
+                    *([rx.cond(
+                        State.can_profile,
+                        rx.hstack(
+                            rx.switch(
+                                checked=State.is_profiling,
+                                on_change=State.toggle_profiling,
+                                color_scheme="orange",
+                                size="2"
+                            ),
+                            rx.text("Perfil", size="1", color="black"),
+                            spacing="2",
+                            align="center",
+                            padding_bottom="0.5rem"
+                        )
+                    )] if ProfilingService.session_toggle() else []),
                     spacing="4",
                     align="end"
                 ),
+                # Métricas estimadas pela amostra enquanto o cálculo exato não termina
+                rx.cond(
+                    State.is_approximate,
+                    rx.badge(
+                        rx.hstack(
+                            rx.spinner(size="1"),
+                            rx.text("Estimativa por amostra — refinando...", size="1"),
+                            spacing="2",
+                            align="center"
+                        ),
+                        color_scheme="amber",
+                        variant="soft"
+                    )
+                ),
                 spacing="3"
             ),
             padding="1rem",
@@ -592,9 +2187,15 @@ def create_dashboard() -> rx.Component:
             width="100%"
         ),
 
+        # Exportação do período selecionado
+        create_export_bar(),
+
+        # Validação da carga
+        rx.cond(State.quality_summary != "", create_quality_report()),
+
         # Métricas por Tanque
         rx.cond(
-            State.tank_metrics.length() > 0,
+            State.tank_ids.length() > 0,
             rx.vstack(
                 rx.heading(
                     "Métricas por Tanque",
@@ -602,17 +2203,39 @@ def create_dashboard() -> rx.Component:
                     color="black"
                 ),
                 rx.foreach(
-                    State.tank_metrics,
-                    lambda tank_row: rx.vstack(
-                        rx.heading(
-                            f"Tanque {tank_row[0]}",
-                            size="3",
-                            color="black"
+                    State.tank_ids,
+                    lambda tanque, i: rx.vstack(
+                        rx.hstack(
+                            rx.heading(
+                                f"Tanque {tanque}",
+                                size="3",
+                                color="black"
+                            ),
+                            rx.button(
+                                rx.hstack(
+                                    rx.icon("search", size=14),
+                                    rx.text("Detalhar", size="1"),
+                                    spacing="1",
+                                    align="center"
+                                ),
+                                on_click=State.open_drilldown(tanque),
+                                variant=rx.cond(State.drill_tank == tanque, "solid", "soft"),
+                                color_scheme="blue",
+                                size="1"
+                            ),
+                            spacing="3",
+                            align="center"
                         ),
                         rx.hstack(
-                            create_metric_card("Peixes Medidos", tank_row[1], "fish"),
-                            create_metric_card("Área Média", tank_row[2], "ruler"),
-                            create_metric_card("Ração Utilizada", f"{tank_row[3]} kg", "package"),
+                            create_metric_card("Peixes Medidos",
+                                               State.tank_metrics['peixes_medidos'][i].to_string(), "fish"),
+                            create_metric_card("Área Média", rx.cond(
+                                State.is_approximate,
+                                f"{State.tank_metrics['area_media'][i]:.2f} ± {State.tank_metrics['area_media_erro'][i]:.2f}",
+                                f"{State.tank_metrics['area_media'][i]:.2f}"
+                            ), "ruler"),
+                            create_metric_card("Ração Utilizada",
+                                               f"{State.tank_metrics['racao_utilizada'][i]:.2f} kg", "package"),
                             spacing="4",
                             width="100%"
                         ),
@@ -625,6 +2248,9 @@ def create_dashboard() -> rx.Component:
             )
         ),
 
+        # Detalhe do tanque escolhido nas métricas por tanque (calculado só ao abrir)
+        rx.cond(State.drill_tank != "", create_drilldown_panel()),
+
         # Métricas Gerais
         rx.cond(
             State.general_metrics.length() > 0,
@@ -635,9 +2261,15 @@ def create_dashboard() -> rx.Component:
                     color="black"
                 ),
                 rx.hstack(
-                    create_metric_card("Total Peixes Medidos", State.general_metrics[0], "fish"),
-                    create_metric_card("Área Média Geral", State.general_metrics[1], "ruler"),
-                    create_metric_card("Total Ração Utilizada", f"{State.general_metrics[2]} kg", "package"),
+                    create_metric_card("Total Peixes Medidos",
+                                       State.general_metrics['total_peixes_medidos'].to_string(), "fish"),
+                    create_metric_card("Área Média Geral", rx.cond(
+                        State.is_approximate,
+                        f"{State.general_metrics['area_media_geral']:.2f} ± {State.general_metrics['area_media_geral_erro']:.2f}",
+                        f"{State.general_metrics['area_media_geral']:.2f}"
+                    ), "ruler"),
+                    create_metric_card("Total Ração Utilizada",
+                                       f"{State.general_metrics['total_racao_utilizada']:.2f} kg", "package"),
                     spacing="4",
                     width="100%"
                 ),
@@ -646,9 +2278,27 @@ def create_dashboard() -> rx.Component:
             )
         ),
 
+        # Gráficos de Evolução Temporal
+        rx.cond(
+            State.chart_tanks.length() > 0,
+            create_time_series_charts()
+        ),
+
         # Tabela de Correlação Temporal
         create_correlation_table(),
 
+        # Comparação entre períodos
+        rx.cond(
+            State.has_data,
+            create_comparison_table()
+        ),
+
+        # Projeção de despesca
+        rx.cond(
+            State.has_data,
+            create_forecast_table()
+        ),
+
         spacing="6",
         width="100%"
     )
@@ -718,85 +2368,35 @@ def index() -> rx.Component:
                             width="100%"
                         ),
                         rx.vstack(
-                            # Preview da Tabela Biometria
+                            # Tabela de Biometria (janela paginada)
                             rx.cond(
                                 State.biometria_headers.length() > 0,
-                                rx.vstack(
-                                    rx.heading("📊 Dados de Biometria", size="6"),
-                                    rx.text(State.biometria_summary, color="gray", size="2"),
-                                    rx.box(
-                                        rx.table.root(
-                                            rx.table.header(
-                                                rx.table.row(
-                                                    rx.foreach(
-                                                        State.biometria_headers,
-                                                        lambda header: rx.table.column_header_cell(header)
-                                                    )
-                                                )
-                                            ),
-                                            rx.table.body(
-                                                rx.foreach(
-                                                    State.biometria_preview,
-                                                    lambda row: rx.table.row(
-                                                        rx.foreach(
-                                                            row,
-                                                            lambda cell: rx.table.cell(cell)
-                                                        )
-                                                    )
-                                                )
-                                            ),
-                                            variant="surface",
-                                            size="1"
-                                        ),
-                                        width="100%",
-                                        overflow_x="auto",
-                                        border="1px solid",
-                                        border_color=rx.color("gray", 4),
-                                        border_radius="8px"
-                                    ),
-                                    spacing="4",
-                                    width="100%"
+                                create_virtualized_data_table(
+                                    "📊 Dados de Biometria",
+                                    State.biometria_summary,
+                                    State.biometria_headers,
+                                    State.biometria_preview,
+                                    State.biometria_page,
+                                    State.biometria_page_count,
+                                    on_previous=State.change_biometria_page(-1),
+                                    on_next=State.change_biometria_page(1),
+                                    visible_rows=TABLE_PAGE_SIZE
                                 )
                             ),
 
-                            # Preview da Tabela Ração
+                            # Tabela de Ração (janela paginada)
                             rx.cond(
                                 State.racao_headers.length() > 0,
-                                rx.vstack(
-                                    rx.heading("🍽️ Dados de Ração", size="6"),
-                                    rx.text(State.racao_summary, color="gray", size="2"),
-                                    rx.box(
-                                        rx.table.root(
-                                            rx.table.header(
-                                                rx.table.row(
-                                                    rx.foreach(
-                                                        State.racao_headers,
-                                                        lambda header: rx.table.column_header_cell(header)
-                                                    )
-                                                )
-                                            ),
-                                            rx.table.body(
-                                                rx.foreach(
-                                                    State.racao_preview,
-                                                    lambda row: rx.table.row(
-                                                        rx.foreach(
-                                                            row,
-                                                            lambda cell: rx.table.cell(cell)
-                                                        )
-                                                    )
-                                                )
-                                            ),
-                                            variant="surface",
-                                            size="1"
-                                        ),
-                                        width="100%",
-                                        overflow_x="auto",
-                                        border="1px solid",
-                                        border_color=rx.color("gray", 4),
-                                        border_radius="8px"
-                                    ),
-                                    spacing="4",
-                                    width="100%"
+                                create_virtualized_data_table(
+                                    "🍽️ Dados de Ração",
+                                    State.racao_summary,
+                                    State.racao_headers,
+                                    State.racao_preview,
+                                    State.racao_page,
+                                    State.racao_page_count,
+                                    on_previous=State.change_racao_page(-1),
+                                    on_next=State.change_racao_page(1),
+                                    visible_rows=TABLE_PAGE_SIZE
                                 )
                             ),
 
@@ -822,5 +2422,5 @@ def index() -> rx.Component:
 
 
 # Configuração da aplicação
-app = rx.App()
-app.add_page(index, route="/", title="Aquicultura Analytics Pro")
\ No newline at end of file
+app = rx.App(api_transformer=create_api(compute_dashboard_payload))
+app.add_page(index, route="/", title="Aquicultura Analytics Pro", on_load=[State.authorize_profiling, State.restore_persisted_data])
\ No newline at end of file
@@ -0,0 +1,122 @@
+from typing import Any, Callable, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from .services.lazy_import import LazyImport
+from .services.source_registry import SourceRegistry
+from .services.telemetry_service import TelemetryService
+
+# Carregados na primeira requisição, como os serviços do State
+ExportService = LazyImport(".services.export_service", "ExportService", __package__)
+MetricsApiService = LazyImport(".services.metrics_api_service", "MetricsApiService", __package__)
+OutlierService = LazyImport(".services.outlier_service", "OutlierService", __package__)
+PresetService = LazyImport(".services.preset_service", "PresetService", __package__)
+
+
+def create_api(dashboard_payload: Callable[..., Optional[Dict[str, Any]]]) -> Starlette:
+    """Endpoints HTTP do backend, montados junto da API do Reflex (App.api_transformer)
+
+    ``dashboard_payload`` calcula as tabelas de métricas com o mesmo backend de execução
+    do dashboard: (biometria, ração, data inicial, data final, fazenda) -> payload.
+    """
+
+    async def cached_payload(version: str, frames, start_date: str, end_date: str, farm: str) -> Dict[str, Any]:
+        """Métricas do período pelo cache do dashboard ou da API, calculadas fora do event loop quando ausentes
+
+        O cache do dashboard só é lido: o que a API calcula fica no cache próprio dela.
+        """
+        payload = PresetService.get_cached(version, start_date, end_date, farm)
+        if payload is not None:
+            return payload
+
+        key = PresetService.cache_key(version, start_date, end_date, farm)
+        payload = MetricsApiService.cached_payload(key)
+        if payload is None:
+            payload = await run_in_threadpool(dashboard_payload, frames[0], frames[1], start_date, end_date, farm)
+            MetricsApiService.store_payload(key, payload)
+        return payload
+
+    async def export(request: Request):
+        """GET /api/export/<tabela>.<csv|xlsx>?versao=...&inicio=...&fim=...&fazenda=...[&sem_atipicas=1]
+
+        Com ``sem_atipicas``, as tabelas de métricas são calculadas sem as medições
+        atípicas, como no dashboard; as linhas exportadas continuam todas as da planilha.
+        """
+        table = request.path_params["tabela"]
+        file_format = request.path_params["formato"]
+        if table not in ExportService.TABLES or file_format not in ExportService.FORMATS:
+            return PlainTextResponse("Exportação não encontrada", status_code=404)
+
+        version = request.query_params.get("versao", "")
+        start_date = request.query_params.get("inicio", "")
+        end_date = request.query_params.get("fim", "")
+        farm = request.query_params.get("fazenda", SourceRegistry.ALL_FARMS)
+
+        frames = ExportService.frames(version)
+        if frames is None:
+            return PlainTextResponse("Dados não disponíveis neste servidor; recarregue as planilhas", status_code=404)
+
+        payload = None
+        if table in ("tanques", "correlacao"):
+            excluded = request.query_params.get("sem_atipicas", "") == "1"
+            metrics_frames = (OutlierService.exclude(frames[0], version, "biometria"), frames[1]) if excluded else frames
+            payload = await cached_payload(
+                OutlierService.metrics_version(version, excluded), metrics_frames, start_date, end_date, farm
+            )
+        quarantine = ExportService.quarantine(version, table) if table in ExportService.QUARANTINE_TABLES else None
+
+        period = (start_date, end_date) if quarantine is None else ()
+        filename = "_".join(part for part in (table, *period) if part) + f".{file_format}"
+        return StreamingResponse(
+            ExportService.stream(table, file_format, frames, start_date, end_date, farm, payload, quarantine),
+            media_type=ExportService.FORMATS[file_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    async def metrics(request: Request):
+        """GET /api/metrics[/<biometria|racao|correlacao>]?inicio=...&fim=...&fazenda=...&tanques=1,2&versao=...
+
+        Sem versão, usa a última carga do dataset. Respostas com ETag (If-None-Match -> 304)
+        e gzip quando o cliente aceita.
+        """
+        section = request.path_params.get("secao", "")
+        if section and section not in MetricsApiService.SECTIONS:
+            return PlainTextResponse("Seção não encontrada", status_code=404)
+
+        version = request.query_params.get("versao", "") or ExportService.latest_version()
+        start_date = request.query_params.get("inicio", "")
+        end_date = request.query_params.get("fim", "")
+        farm = request.query_params.get("fazenda", SourceRegistry.ALL_FARMS)
+        tanks = MetricsApiService.parse_tanks(request.query_params.get("tanques", ""))
+        key = MetricsApiService.cache_key(version, start_date, end_date, farm, section, tanks)
+
+        encoded = MetricsApiService.cached(key)
+        if encoded is None:
+            frames = ExportService.frames(version) if version else None
+            if frames is None:
+                return PlainTextResponse("Dados não disponíveis neste servidor; recarregue as planilhas", status_code=404)
+            encoded = MetricsApiService.response(key, await cached_payload(version, frames, start_date, end_date, farm))
+
+        headers = {"ETag": encoded.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if MetricsApiService.matches(request.headers.get("if-none-match", ""), encoded.etag):
+            return Response(status_code=304, headers=headers)
+
+        if MetricsApiService.accepts_gzip(request.headers.get("accept-encoding", "")):
+            return Response(encoded.gzipped, media_type="application/json",
+                            headers={**headers, "Content-Encoding": "gzip"})
+        return Response(encoded.body, media_type="application/json", headers=headers)
+
+    async def prometheus(request: Request):
+        """GET /metrics: latência por etapa, linhas processadas e acertos de cache (texto do Prometheus)"""
+        return PlainTextResponse(TelemetryService.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return Starlette(routes=[
+        Route("/api/export/{tabela}.{formato}", export, methods=["GET"]),
+        Route("/api/metrics", metrics, methods=["GET"]),
+        Route("/api/metrics/{secao}", metrics, methods=["GET"]),
+        Route("/metrics", prometheus, methods=["GET"]),
+    ])
@@ -1,5 +1,5 @@
 import reflex as rx
-from typing import List, Dict
+from typing import List, Dict, Callable
 
 
 def create_data_table(data: List[Dict], columns: List[str], title: str) -> rx.Component:
@@ -21,9 +21,9 @@ def create_data_table(data: List[Dict], columns: List[str], title: str) -> rx.Co
     for row_data in data:
         cells = []
         for col in columns:
-            value = row_data.get(col, "")
             # Converte para string e limita o tamanho
-            cell_value = str(value)[:50] + ("..." if len(str(value)) > 50 else "")
+            value = str(row_data.get(col, ""))
+            cell_value = value[:50] + ("..." if len(value) > 50 else "")
             cells.append(rx.table.cell(cell_value))
         rows.append(rx.table.row(*cells))
 
@@ -44,4 +44,95 @@ def create_data_table(data: List[Dict], columns: List[str], title: str) -> rx.Co
         ),
         spacing="4",
         width="100%"
-    )
\ No newline at end of file
+    )
+
+
+def create_virtualized_data_table(
+        title: str,
+        summary,
+        headers,
+        rows,
+        page,
+        page_count,
+        on_previous: Callable,
+        on_next: Callable,
+        row_height: int = 32,
+        visible_rows: int = 25
+) -> rx.Component:
+    """Cria uma tabela paginada que monta apenas as linhas da janela visível
+
+    As linhas vêm de uma fatia mantida no State, então o navegador nunca recebe
+    o conjunto completo de dados, independente do número de registros.
+    """
+
+    cell_style = {
+        "height": f"{row_height}px",
+        "white_space": "nowrap",
+        "overflow": "hidden",
+        "padding_top": "0",
+        "padding_bottom": "0",
+        "vertical_align": "middle"
+    }
+
+    return rx.vstack(
+        rx.heading(title, size="6"),
+        rx.text(summary, color="gray", size="2"),
+        rx.box(
+            rx.table.root(
+                rx.table.header(
+                    rx.table.row(
+                        rx.foreach(
+                            headers,
+                            lambda header: rx.table.column_header_cell(header, style=cell_style)
+                        )
+                    )
+                ),
+                rx.table.body(
+                    rx.foreach(
+                        rows,
+                        lambda row: rx.table.row(
+                            rx.foreach(
+                                row,
+                                lambda cell: rx.table.cell(cell, style=cell_style)
+                            ),
+                            height=f"{row_height}px"
+                        )
+                    )
+                ),
+                variant="surface",
+                size="1"
+            ),
+            width="100%",
+            height=f"{row_height * (visible_rows + 1) + 2}px",
+            overflow_x="auto",
+            overflow_y="hidden",
+            border="1px solid",
+            border_color=rx.color("gray", 4),
+            border_radius="8px"
+        ),
+        # Sem linhas não há páginas: o paginador só aparece quando a tabela tem conteúdo
+        rx.cond(
+            page_count > 0,
+            rx.hstack(
+                rx.button(
+                    rx.icon("chevron-left", size=16),
+                    on_click=on_previous,
+                    variant="outline",
+                    size="1",
+                    disabled=page <= 0
+                ),
+                rx.text(f"Página {page + 1} de {page_count}", size="1", color="gray"),
+                rx.button(
+                    rx.icon("chevron-right", size=16),
+                    on_click=on_next,
+                    variant="outline",
+                    size="1",
+                    disabled=page >= page_count - 1
+                ),
+                spacing="3",
+                align="center"
+            )
+        ),
+        spacing="4",
+        width="100%"
+    )
@@ -1,2 +1,2 @@
 from .sidebar import create_sidebar
-from .data_table import create_data_table
\ No newline at end of file
+from .data_table import create_data_table, create_virtualized_data_table
\ No newline at end of file
@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from .telemetry_service import TelemetryService
+
+
+class MetricsCache:
+    """Cache LRU limitado e seguro entre threads, compartilhado por todas as sessões
+
+    ``name`` identifica o cache nas métricas de acertos (ui_bia_cache_requests_total).
+    """
+
+    def __init__(self, max_entries: int = 64, name: str = "metricas"):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna o valor em cache (ou None) e o marca como usado recentemente"""
+        with self._lock:
+            hit = key in self._entries
+            if hit:
+                self._entries.move_to_end(key)
+                value = self._entries[key]
+        TelemetryService.cache(self.name, hit)
+        return value if hit else None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Armazena um valor, descartando os mais antigos além do limite"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+
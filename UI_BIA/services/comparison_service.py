@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .dataset_service import DatasetService
+
+
+class ComparisonService:
+    """Métricas de vários períodos em uma única passada vetorizada sobre o conjunto tipado
+
+    Os dados são acumulados uma vez em matrizes tanque x dia (contagem, soma de área e
+    soma de ração) com somas de prefixo ao longo dos dias; cada período passa a custar
+    apenas duas leituras por matriz, qualquer que seja o número de períodos.
+    """
+
+    # Métricas por tanque calculadas para cada período
+    WINDOW_FIELDS = [
+        "peixes_medidos", "area_media", "racao_utilizada",
+        "area_inicial", "area_final", "variacao_area", "percentual_crescimento", "eficiencia_crescimento"
+    ]
+
+    # Métricas gerais de cada período
+    WINDOW_GENERAL_FIELDS = [
+        "total_peixes_medidos", "area_media_geral", "total_racao_utilizada",
+        "total_variacao_area", "eficiencia_geral", "tanques_analisados"
+    ]
+
+    # Métricas exibidas lado a lado, com a diferença, na comparação do dashboard
+    COMPARISON_FIELDS = ["area_media", "racao_utilizada", "variacao_area", "eficiencia_crescimento"]
+
+    @staticmethod
+    def _grid(biometry_typed: pd.DataFrame, feed_typed: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """Acumula os dados em matrizes tanque x dia com somas de prefixo"""
+        bio = biometry_typed if biometry_typed is not None else pd.DataFrame(columns=["tanque", "data_parsed", "area"])
+        feed = feed_typed if feed_typed is not None else pd.DataFrame(columns=["tanque", "data_parsed", "peso"])
+        if bio.empty and feed.empty:
+            return None
+
+        bio_tanks = bio["tanque"].astype(str)
+        feed_tanks = feed["tanque"].astype(str)
+        tanks = sorted(set(bio_tanks) | set(feed_tanks), key=lambda t: (len(t), t))
+
+        bio_days = pd.to_datetime(bio["data_parsed"]).dt.normalize()
+        feed_days = pd.to_datetime(feed["data_parsed"]).dt.normalize()
+        first_day = min(day for day in (bio_days.min(), feed_days.min()) if pd.notna(day))
+        last_day = max(day for day in (bio_days.max(), feed_days.max()) if pd.notna(day))
+        n_tanks, n_days = len(tanks), (last_day - first_day).days + 1
+
+        def cells(tank_values: pd.Series, days: pd.Series) -> np.ndarray:
+            tank_codes = pd.Categorical(tank_values, categories=tanks).codes.astype(np.int64)
+            day_codes = ((days - first_day) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+            return tank_codes * n_days + day_codes
+
+        def matrix(flat: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+            return np.bincount(flat, weights=weights, minlength=n_tanks * n_days).reshape(n_tanks, n_days)
+
+        bio_cells = cells(bio_tanks, bio_days)
+        feed_cells = cells(feed_tanks, feed_days)
+
+        count = matrix(bio_cells)
+        area_sum = matrix(bio_cells, bio["area"].to_numpy(dtype=float))
+        feed_sum = matrix(feed_cells, feed["peso"].to_numpy(dtype=float))
+        feed_days_mask = matrix(feed_cells) > 0
+        bio_days_mask = count > 0
+
+        def prefix(values: np.ndarray) -> np.ndarray:
+            return np.concatenate([np.zeros((n_tanks, 1)), np.cumsum(values, axis=1, dtype=float)], axis=1)
+
+        # Próximo / último dia com biometria a partir de cada dia, para a área inicial e final do período
+        day_index = np.arange(n_days)
+        next_bio = np.minimum.accumulate(np.where(bio_days_mask, day_index, n_days)[:, ::-1], axis=1)[:, ::-1]
+        prev_bio = np.maximum.accumulate(np.where(bio_days_mask, day_index, -1), axis=1)
+
+        return {
+            "tanks": tanks, "first_day": first_day, "n_days": n_days,
+            "count": count, "area_sum": area_sum,
+            "count_prefix": prefix(count), "area_prefix": prefix(area_sum), "feed_prefix": prefix(feed_sum),
+            "bio_days_prefix": prefix(bio_days_mask), "feed_days_prefix": prefix(feed_days_mask),
+            "next_bio": next_bio, "prev_bio": prev_bio,
+        }
+
+    @staticmethod
+    def _window_bounds(grid: Dict[str, Any], windows: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Converte os períodos em índices de dia [início, fim] inclusivos (fim < início se vazio)"""
+        starts, ends = [], []
+        for start_date, end_date in windows:
+            start_dt, end_dt = DatasetService.parse_range(start_date, end_date)
+            if start_dt is None or end_dt is None:
+                # Mesmo comportamento do MetricsService: sem período, considera todos os dados
+                starts.append(0)
+                ends.append(grid["n_days"] - 1)
+                continue
+            starts.append(int(np.ceil((pd.Timestamp(start_dt) - grid["first_day"]) / pd.Timedelta(days=1))))
+            ends.append(int(np.floor((pd.Timestamp(end_dt) - grid["first_day"]) / pd.Timedelta(days=1))))
+
+        starts = np.clip(np.array(starts, dtype=np.int64), 0, grid["n_days"])
+        ends = np.clip(np.array(ends, dtype=np.int64), -1, grid["n_days"] - 1)
+        return starts, ends
+
+    @staticmethod
+    def window_metrics(biometry_typed: pd.DataFrame, feed_typed: pd.DataFrame,
+                       windows: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Calcula biometria, ração e eficiência de crescimento por tanque para todos os períodos
+
+        Retorna {"tank_ids": [...], "windows": [{"start", "end", "tank_metrics", "general_metrics"}, ...]}
+        no formato colunar do State, com os mesmos critérios do MetricsService: área inicial e
+        final nas médias do primeiro e do último dia com biometria e correlação apenas para
+        tanques com ao menos dois dias de biometria e de ração no período. As contagens
+        consideram as medições com área válida.
+        """
+        grid = ComparisonService._grid(biometry_typed, feed_typed)
+        if grid is None or not windows:
+            return {"tank_ids": [], "windows": []}
+
+        starts, ends = ComparisonService._window_bounds(grid, windows)
+        empty = ends < starts
+        # Índices seguros para leitura; os períodos vazios são zerados pela máscara
+        lo = np.where(empty, 0, starts)
+        hi = np.where(empty, 0, ends + 1)
+
+        def window_sum(prefix: np.ndarray) -> np.ndarray:
+            return np.where(empty, 0.0, prefix[:, hi] - prefix[:, lo])
+
+        count = window_sum(grid["count_prefix"])
+        area_sum = window_sum(grid["area_prefix"])
+        feed = window_sum(grid["feed_prefix"])
+        bio_days = window_sum(grid["bio_days_prefix"])
+        feed_days = window_sum(grid["feed_days_prefix"])
+
+        rows = np.arange(len(grid["tanks"]))[:, None]
+        first = grid["next_bio"][:, np.minimum(lo, grid["n_days"] - 1)]
+        last = grid["prev_bio"][:, np.maximum(hi - 1, 0)]
+        has_correlation = (bio_days >= 2) & (feed_days >= 2)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            area_media = np.where(count > 0, area_sum / count, 0.0)
+            first_safe, last_safe = np.clip(first, 0, grid["n_days"] - 1), np.clip(last, 0, grid["n_days"] - 1)
+            area_inicial = grid["area_sum"][rows, first_safe] / grid["count"][rows, first_safe]
+            area_final = grid["area_sum"][rows, last_safe] / grid["count"][rows, last_safe]
+            area_inicial = np.where(has_correlation, area_inicial, 0.0)
+            area_final = np.where(has_correlation, area_final, 0.0)
+            variacao = area_final - area_inicial
+            percentual = np.where(area_inicial > 0, variacao / area_inicial * 100, 0.0)
+            eficiencia = np.where(has_correlation & (feed > 0), variacao / feed, 0.0)
+
+        fields = {
+            "peixes_medidos": count,
+            "area_media": np.round(area_media, 2),
+            "racao_utilizada": np.round(feed, 2),
+            "area_inicial": np.round(area_inicial, 2),
+            "area_final": np.round(area_final, 2),
+            "variacao_area": np.round(variacao, 2),
+            "percentual_crescimento": np.round(percentual, 2),
+            "eficiencia_crescimento": np.round(eficiencia, 4),
+        }
+
+        # Gerais: mesmas regras do MetricsService, somando os valores já arredondados por tanque
+        total_count = count.sum(axis=0)
+        total_variacao = np.where(has_correlation, fields["variacao_area"], 0.0).sum(axis=0)
+        total_racao_correlacao = np.where(has_correlation, fields["racao_utilizada"], 0.0).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            general = {
+                "total_peixes_medidos": total_count,
+                "area_media_geral": np.round(np.where(total_count > 0, area_sum.sum(axis=0) / total_count, 0.0), 2),
+                "total_racao_utilizada": np.round(feed.sum(axis=0), 2),
+                "total_variacao_area": np.round(total_variacao, 2),
+                "eficiencia_geral": np.round(
+                    np.where(total_racao_correlacao > 0, total_variacao / total_racao_correlacao, 0.0), 4
+                ),
+                "tanques_analisados": has_correlation.sum(axis=0).astype(float),
+            }
+
+        return {
+            "tank_ids": list(grid["tanks"]),
+            "windows": [
+                {
+                    "start": start_date,
+                    "end": end_date,
+                    "tank_metrics": {field: values[:, w].astype(float).tolist() for field, values in fields.items()},
+                    "general_metrics": {field: float(values[w]) for field, values in general.items()},
+                }
+                for w, (start_date, end_date) in enumerate(windows)
+            ],
+        }
+
+    @staticmethod
+    def deltas(result: Dict[str, Any], base: int = 0, other: int = 1,
+               fields: Optional[List[str]] = None) -> Tuple[List[str], Dict[str, List[float]], Dict[str, float]]:
+        """Compara dois períodos do resultado: colunas <campo>_a, <campo>_b e <campo>_delta (b - a)
+
+        Mantém apenas os tanques com dados em ao menos um dos dois períodos.
+        """
+        fields = fields or ComparisonService.COMPARISON_FIELDS
+        if not result["windows"]:
+            return [], {}, {}
+
+        window_a = result["windows"][base]
+        window_b = result["windows"][other]
+        present = [
+            i for i in range(len(result["tank_ids"]))
+            if window_a["tank_metrics"]["peixes_medidos"][i] or window_b["tank_metrics"]["peixes_medidos"][i]
+            or window_a["tank_metrics"]["racao_utilizada"][i] or window_b["tank_metrics"]["racao_utilizada"][i]
+        ]
+
+        columns: Dict[str, List[float]] = {}
+        for field in fields:
+            values_a = [window_a["tank_metrics"][field][i] for i in present]
+            values_b = [window_b["tank_metrics"][field][i] for i in present]
+            digits = 4 if field == "eficiencia_crescimento" else 2
+            columns[f"{field}_a"] = values_a
+            columns[f"{field}_b"] = values_b
+            columns[f"{field}_delta"] = [round(b - a, digits) for a, b in zip(values_a, values_b)]
+
+        general = {}
+        for field in ComparisonService.WINDOW_GENERAL_FIELDS:
+            a, b = window_a["general_metrics"][field], window_b["general_metrics"][field]
+            digits = 4 if field == "eficiencia_geral" else 2
+            general[f"{field}_a"], general[f"{field}_b"], general[f"{field}_delta"] = a, b, round(b - a, digits)
+
+        return [result["tank_ids"][i] for i in present], columns, general
+
+    @staticmethod
+    def previous_window(start_date: str, end_date: str) -> Tuple[str, str]:
+        """Período de mesma duração imediatamente anterior ao informado (datas ISO)"""
+        start_dt, end_dt = DatasetService.parse_range(start_date, end_date)
+        if start_dt is None or end_dt is None:
+            return "", ""
+        length = end_dt - start_dt
+        previous_end = start_dt - timedelta(days=1)
+        return (previous_end - length).strftime("%Y-%m-%d"), previous_end.strftime("%Y-%m-%d")
@@ -0,0 +1,110 @@
+import hashlib
+import pandas as pd
+from datetime import datetime
+from typing import Optional, Tuple
+
+from .metrics_service import MetricsService
+from .telemetry_service import TelemetryService
+
+
+class DatasetService:
+    """Serviço para preparar o conjunto de dados tipado usado nas análises"""
+
+    # Mesmos formatos aceitos por MetricsService.parse_date, na mesma ordem de prioridade
+    DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y"]
+
+    # Colunas acrescentadas às planilhas na validação da carga (não exibidas nem exportadas)
+    DERIVED_COLUMNS = ["data_parsed"]
+
+    @staticmethod
+    @TelemetryService.timed("datas")
+    def parse_dates(series: pd.Series) -> pd.Series:
+        """Converte uma coluna de datas em texto para datetime64 de forma vetorizada"""
+        text = series.astype(str)
+        parsed = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+
+        for fmt in DatasetService.DATE_FORMATS:
+            missing = parsed.isna()
+            if not missing.any():
+                break
+            parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+
+        return parsed
+
+    @staticmethod
+    def sheet_dates(df: pd.DataFrame) -> pd.Series:
+        """Datas da planilha: as convertidas na validação da carga ou, sem elas, convertidas agora"""
+        if "data_parsed" in df.columns and pd.api.types.is_datetime64_any_dtype(df["data_parsed"]):
+            return df["data_parsed"]
+        return DatasetService.parse_dates(df["data"])
+
+    @staticmethod
+    @TelemetryService.timed("preparacao")
+    def prepare_biometry(df: pd.DataFrame) -> pd.DataFrame:
+        """Gera o conjunto tipado de biometria: tanque, data_parsed, area (e atipica, se marcada)"""
+        if df is None or df.empty:
+            return pd.DataFrame(columns=["tanque", "data_parsed", "area"])
+
+        typed = pd.DataFrame({
+            "tanque": df["tanque"].astype(str).astype("category"),
+            "data_parsed": DatasetService.sheet_dates(df),
+            "area": pd.to_numeric(df["largura"], errors="coerce") * pd.to_numeric(df["altura"], errors="coerce")
+        })
+        DatasetService._copy_farm(df, typed)
+        if "atipica" in df.columns:
+            # Marca das medições atípicas da validação, para excluí-las das análises sob demanda
+            typed["atipica"] = df["atipica"].to_numpy(dtype=bool)
+        return typed.dropna(subset=["data_parsed", "area"]).reset_index(drop=True)
+
+    @staticmethod
+    @TelemetryService.timed("preparacao")
+    def prepare_feed(df: pd.DataFrame) -> pd.DataFrame:
+        """Gera o conjunto tipado de ração: tanque, data_parsed e peso"""
+        if df is None or df.empty:
+            return pd.DataFrame(columns=["tanque", "data_parsed", "peso"])
+
+        typed = pd.DataFrame({
+            "tanque": df["tanque"].astype(str).astype("category"),
+            "data_parsed": DatasetService.sheet_dates(df),
+            "peso": pd.to_numeric(df["peso"], errors="coerce")
+        })
+        DatasetService._copy_farm(df, typed)
+        return typed.dropna(subset=["data_parsed", "peso"]).reset_index(drop=True)
+
+    @staticmethod
+    def _copy_farm(source: pd.DataFrame, typed: pd.DataFrame) -> None:
+        """Mantém a dimensão farm no conjunto tipado quando os dados vêm de várias fazendas"""
+        if "farm" in source.columns:
+            typed["farm"] = source["farm"].astype(str).astype("category")
+
+    @staticmethod
+    def parse_range(start_date: str, end_date: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Converte as datas do filtro de período, aceitando os mesmos formatos das planilhas"""
+        if not start_date or not end_date:
+            return None, None
+        return MetricsService.parse_date(start_date), MetricsService.parse_date(end_date)
+
+    @staticmethod
+    def filter_range(typed_df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        """Filtra o conjunto tipado pelo período, sem reprocessar as datas"""
+        if typed_df is None or typed_df.empty:
+            return typed_df
+
+        start_dt, end_dt = DatasetService.parse_range(start_date, end_date)
+        if start_dt is None or end_dt is None:
+            return typed_df
+
+        mask = (typed_df["data_parsed"] >= start_dt) & (typed_df["data_parsed"] <= end_dt)
+        return typed_df[mask]
+
+    @staticmethod
+    def dataset_version(*frames: Optional[pd.DataFrame]) -> str:
+        """Gera uma versão determinística a partir do conteúdo das planilhas carregadas"""
+        digest = hashlib.sha1()
+        for df in frames:
+            if df is None:
+                digest.update(b"<vazio>")
+                continue
+            digest.update("|".join(str(col) for col in df.columns).encode())
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()[:16]
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_service import MetricsCache
+from .dataset_service import DatasetService
+from .source_registry import SourceRegistry
+from .telemetry_service import TelemetryService
+from .timeseries_service import TimeSeriesService
+
+
+class DrillDownService:
+    """Análise detalhada de um único tanque, calculada só quando o painel de detalhe é aberto
+
+    O recálculo do dashboard continua produzindo apenas o resumo por tanque; a série
+    diária, o crescimento entre biometrias, a distribuição das áreas e as linhas brutas
+    de um tanque são calculados sob demanda sobre o subconjunto desse tanque e guardados
+    por (versão do dataset, fazenda, tanque, período), compartilhados entre as sessões.
+    """
+
+    # Faixas do histograma de áreas
+    HISTOGRAM_BINS = 12
+
+    # Colunas do crescimento entre biometrias consecutivas
+    INTERVAL_FIELDS = ["dias", "area_inicial", "area_final", "variacao_area", "taxa_diaria",
+                       "percentual_crescimento", "racao", "eficiencia_crescimento"]
+
+    _details = MetricsCache(max_entries=32, name="detalhe_tanque")
+
+    @staticmethod
+    def cache_key(version: str, tank: str, start_date: str, end_date: str,
+                  farm: str = SourceRegistry.ALL_FARMS) -> Tuple[str, str, str, str, str, str]:
+        """Chave do detalhe de um tanque em um período (e fazenda) de uma versão do dataset"""
+        return ("detalhe", version, farm, tank, start_date, end_date)
+
+    @staticmethod
+    def get(version: str, tank: str, start_date: str, end_date: str, farm: str,
+            frames: Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]],
+            typed_frames: Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]) -> Dict[str, Any]:
+        """Detalhe do tanque pelo cache, calculado e guardado quando ausente"""
+        key = DrillDownService.cache_key(version, tank, start_date, end_date, farm)
+        detail = DrillDownService._details.get(key)
+        if detail is None:
+            detail = DrillDownService.compute(
+                tank, start_date, end_date, SourceRegistry.filter_farm(frames[0], farm),
+                SourceRegistry.filter_farm(typed_frames[0], farm), SourceRegistry.filter_farm(typed_frames[1], farm)
+            )
+            DrillDownService._details.put(key, detail)
+        return detail
+
+    @staticmethod
+    def _tank_rows(typed_df: Optional[pd.DataFrame], tank: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Linhas tipadas de um tanque no período"""
+        if typed_df is None or typed_df.empty:
+            return pd.DataFrame(columns=["tanque", "data_parsed"])
+        return DatasetService.filter_range(typed_df[typed_df["tanque"] == tank], start_date, end_date)
+
+    @staticmethod
+    @TelemetryService.timed("detalhe_tanque")
+    def compute(tank: str, start_date: str, end_date: str, biometry_df: Optional[pd.DataFrame],
+                biometry_typed: Optional[pd.DataFrame], feed_typed: Optional[pd.DataFrame]) -> Dict[str, Any]:
+        """Calcula o detalhe de um tanque: resumo, séries, intervalos, distribuição e linhas brutas"""
+        biometry = DrillDownService._tank_rows(biometry_typed, tank, start_date, end_date)
+        feed = DrillDownService._tank_rows(feed_typed, tank, start_date, end_date)
+
+        area_daily = TimeSeriesService.daily_series(biometry, "area", "mean")
+        feed_daily = TimeSeriesService.daily_series(feed, "peso", "sum")
+        interval_labels, intervals = DrillDownService.interval_growth(area_daily, feed_daily)
+
+        return {
+            "tanque": tank,
+            "resumo": DrillDownService.summary(biometry, area_daily, feed),
+            "area_series": TimeSeriesService.chart_points(area_daily, tank, "area"),
+            "feed_series": TimeSeriesService.chart_points(feed_daily, tank, "peso"),
+            "intervalos": intervals,
+            "intervalo_rotulos": interval_labels,
+            "histograma": DrillDownService.histogram(biometry["area"] if "area" in biometry else None),
+            "linhas": DrillDownService.raw_rows(biometry_df, tank, start_date, end_date),
+        }
+
+    @staticmethod
+    def summary(biometry: pd.DataFrame, area_daily: pd.DataFrame, feed: pd.DataFrame) -> Dict[str, float]:
+        """Estatísticas da área no período, ração total e crescimento diário médio entre a primeira e a última biometria"""
+        areas = biometry["area"].to_numpy(dtype=float) if not biometry.empty else np.array([])
+        result = {
+            "biometrias": float(len(area_daily)),
+            "peixes_medidos": float(len(areas)),
+            "racao_total": round(float(feed["peso"].sum()) if not feed.empty else 0.0, 2),
+            "area_media": 0.0, "area_desvio": 0.0, "area_cv": 0.0,
+            "area_min": 0.0, "area_p25": 0.0, "area_mediana": 0.0, "area_p75": 0.0, "area_max": 0.0,
+            "crescimento_diario": 0.0,
+        }
+        if len(areas) == 0:
+            return result
+
+        mean = float(areas.mean())
+        std = float(areas.std(ddof=1)) if len(areas) > 1 else 0.0
+        minimum, p25, median, p75, maximum = np.percentile(areas, [0, 25, 50, 75, 100])
+        result.update({
+            "area_media": round(mean, 2), "area_desvio": round(std, 2),
+            "area_cv": round(std / mean * 100, 1) if mean > 0 else 0.0,
+            "area_min": round(float(minimum), 2), "area_p25": round(float(p25), 2),
+            "area_mediana": round(float(median), 2), "area_p75": round(float(p75), 2),
+            "area_max": round(float(maximum), 2),
+        })
+
+        if len(area_daily) > 1:
+            days = (area_daily["data_parsed"].iloc[-1] - area_daily["data_parsed"].iloc[0]).days
+            change = float(area_daily["area"].iloc[-1] - area_daily["area"].iloc[0])
+            result["crescimento_diario"] = round(change / days, 4) if days > 0 else 0.0
+        return result
+
+    @staticmethod
+    def interval_growth(area_daily: pd.DataFrame, feed_daily: pd.DataFrame) -> Tuple[List[str], Dict[str, List[float]]]:
+        """Crescimento entre biometrias consecutivas e a ração fornecida em cada intervalo
+
+        A ração de um intervalo é a soma dos dias posteriores à biometria anterior até a
+        biometria atual, lida de uma soma acumulada (uma busca binária por intervalo).
+        """
+        if len(area_daily) < 2:
+            return [], {field: [] for field in DrillDownService.INTERVAL_FIELDS}
+
+        days = area_daily["data_parsed"].to_numpy(dtype="datetime64[ns]")
+        areas = area_daily["area"].to_numpy(dtype=float)
+
+        feed_days = feed_daily["data_parsed"].to_numpy(dtype="datetime64[ns]")
+        cumulative = np.concatenate(([0.0], np.cumsum(feed_daily["peso"].to_numpy(dtype=float))))
+        fed_until = cumulative[np.searchsorted(feed_days, days, side="right")]
+
+        elapsed = (np.diff(days) // np.timedelta64(1, "D")).astype(float)
+        change = np.diff(areas)
+        feed = np.diff(fed_until)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(elapsed > 0, change / elapsed, 0.0)
+            percent = np.where(areas[:-1] > 0, change / areas[:-1] * 100, 0.0)
+            efficiency = np.where(feed > 0, change / feed, 0.0)
+
+        labels = pd.DatetimeIndex(days).strftime("%d/%m/%Y")
+        columns = {
+            "dias": elapsed, "area_inicial": areas[:-1], "area_final": areas[1:], "variacao_area": change,
+            "taxa_diaria": rate, "percentual_crescimento": percent, "racao": feed,
+            "eficiencia_crescimento": efficiency,
+        }
+        digits = {"taxa_diaria": 4, "eficiencia_crescimento": 4, "percentual_crescimento": 1, "dias": 0}
+        return (
+            [f"{labels[i]} a {labels[i + 1]}" for i in range(len(days) - 1)],
+            {field: np.round(np.nan_to_num(values), digits.get(field, 2)).tolist() for field, values in columns.items()}
+        )
+
+    @staticmethod
+    def histogram(areas: Optional[pd.Series], bins: int = HISTOGRAM_BINS) -> List[Dict[str, Any]]:
+        """Distribuição das áreas medidas em faixas de mesma largura, no formato dos gráficos"""
+        if areas is None or areas.empty:
+            return []
+
+        counts, edges = np.histogram(areas.to_numpy(dtype=float), bins=bins)
+        return [
+            {"faixa": f"{edges[i]:.1f}–{edges[i + 1]:.1f}", "peixes": int(counts[i])}
+            for i in range(len(counts))
+        ]
+
+    @staticmethod
+    def raw_rows(biometry_df: Optional[pd.DataFrame], tank: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Linhas da planilha de biometria do tanque no período, como foram carregadas
+
+        As datas são convertidas só nas linhas do tanque, não na planilha inteira.
+        """
+        if biometry_df is None or biometry_df.empty:
+            return pd.DataFrame()
+
+        rows = biometry_df[biometry_df["tanque"].astype(str) == tank]
+        start_dt, end_dt = DatasetService.parse_range(start_date, end_date)
+        if rows.empty or start_dt is None or end_dt is None:
+            return rows
+
+        dates = DatasetService.sheet_dates(rows)
+        return rows[(dates >= start_dt) & (dates <= end_dt)]
@@ -0,0 +1,290 @@
+import re
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from .cache_service import MetricsCache
+from .dataset_service import DatasetService
+from .metrics_service import MetricsService
+from .shared_dataset import SharedDatasetService
+from .source_registry import SourceRegistry
+
+
+class _ZipStream:
+    """Destino de escrita sem seek para o zipfile: acumula os bytes até o próximo drain()"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+class ExportService:
+    """Exportação das linhas filtradas e das tabelas de métricas em CSV e XLSX
+
+    Os arquivos são gerados por geradores que processam CHUNK_ROWS linhas por vez
+    e devolvem os bytes à medida que ficam prontos: o servidor nunca monta o
+    arquivo inteiro em memória. O XLSX é escrito direto no formato Office Open XML
+    (zip com strings inline), sem dependências externas.
+    """
+
+    TABLES = ["biometria", "racao", "tanques", "correlacao", "quarentena_biometria", "quarentena_racao"]
+
+    # Linhas descartadas na validação da carga (exportadas sem filtro de período: a data pode ser a causa)
+    QUARANTINE_TABLES = ["quarentena_biometria", "quarentena_racao"]
+
+    FORMATS = {
+        "csv": "text/csv; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+
+    # Linhas processadas (e enviadas) por vez
+    CHUNK_ROWS = 50_000
+
+    # Limite de linhas por planilha do Excel; acima disso o XLSX continua em novas abas
+    MAX_SHEET_ROWS = 1_048_576
+
+    # Planilhas carregadas por versão do dataset, para os downloads fora das sessões
+    _datasets = MetricsCache(max_entries=4, name="exportacao")
+    _quarantine = MetricsCache(max_entries=4, name="quarentena")
+    _latest_version = ""
+
+    _INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+    @staticmethod
+    def register(version: str, biometria_df: Optional[pd.DataFrame], racao_df: Optional[pd.DataFrame],
+                 quarantine: Optional[Dict[str, Optional[pd.DataFrame]]] = None) -> None:
+        """Disponibiliza as planilhas (e as linhas em quarentena) de uma versão do dataset para exportação"""
+        if version:
+            ExportService._datasets.put(version, (biometria_df, racao_df))
+            ExportService._quarantine.put(version, dict(quarantine or {}))
+            ExportService._latest_version = version
+
+    @staticmethod
+    def latest_version() -> str:
+        """Versão mais recente: a publicada no dataset compartilhado ou a última carregada neste processo"""
+        if SharedDatasetService.enabled():
+            return SharedDatasetService.current_version() or ExportService._latest_version
+        return ExportService._latest_version
+
+    @staticmethod
+    def frames(version: str) -> Optional[Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]]:
+        """Planilhas da versão (registradas neste processo ou publicadas no dataset compartilhado)"""
+        frames = ExportService._datasets.get(version)
+        if frames is not None:
+            return frames
+
+        shared = SharedDatasetService.attach(version) if SharedDatasetService.enabled() else None
+        if shared is not None:
+            return shared.frames.get("biometria"), shared.frames.get("racao")
+        return None
+
+    @staticmethod
+    def quarantine(version: str, table: str) -> Optional[pd.DataFrame]:
+        """Linhas em quarentena de uma planilha na versão informada"""
+        frames = ExportService._quarantine.get(version)
+        if frames is not None:
+            return frames.get(table)
+
+        shared = SharedDatasetService.attach(version) if SharedDatasetService.enabled() else None
+        return shared.frames.get(table) if shared is not None else None
+
+    @staticmethod
+    def filtered_chunks(df: Optional[pd.DataFrame], start_date: str = "", end_date: str = "",
+                        farm: str = SourceRegistry.ALL_FARMS,
+                        chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Percorre a planilha em blocos, aplicando o filtro de fazenda e de período em cada um"""
+        if df is None or df.empty:
+            return
+
+        start_dt, end_dt = DatasetService.parse_range(start_date, end_date)
+        for offset in range(0, len(df), chunk_rows):
+            chunk = SourceRegistry.filter_farm(df.iloc[offset:offset + chunk_rows], farm)
+            if start_dt is not None and end_dt is not None and "data" in chunk.columns:
+                dates = DatasetService.sheet_dates(chunk)
+                chunk = chunk[(dates >= start_dt) & (dates <= end_dt)]
+            if not chunk.empty:
+                yield chunk.drop(columns=DatasetService.DERIVED_COLUMNS, errors="ignore")
+
+    @staticmethod
+    def table_frame(payload: Optional[Dict[str, Any]], table: str) -> pd.DataFrame:
+        """Tabela de métricas por tanque ou de correlação do payload do dashboard"""
+        if table == "tanques":
+            ids_key, data_key, fields = "tank_ids", "tank_metrics", MetricsService.TANK_FIELDS
+        else:
+            ids_key, data_key, fields = "correlation_tank_ids", "correlation_tank_data", MetricsService.CORRELATION_FIELDS
+
+        payload = payload or {}
+        columns = {"tanque": payload.get(ids_key, [])}
+        for field in fields:
+            columns[field] = payload.get(data_key, {}).get(field, [])
+        return pd.DataFrame(columns)
+
+    @staticmethod
+    def csv_stream(chunks: Iterable[pd.DataFrame], columns: Optional[List[str]] = None) -> Iterator[bytes]:
+        """CSV em UTF-8 (com BOM, para o Excel reconhecer a acentuação), um bloco por vez"""
+        header = True
+        for chunk in chunks:
+            yield chunk.to_csv(index=False, header=header).encode("utf-8-sig" if header else "utf-8")
+            header = False
+
+        # Sem nenhuma linha no período: apenas o cabeçalho
+        if header and columns:
+            yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8-sig")
+
+    @staticmethod
+    def _cells(column: pd.Series) -> np.ndarray:
+        """Células XML de uma coluna: números como valores e o restante como strings inline
+
+        O XML é montado só para os valores distintos (datas, tanques e medições se repetem
+        muito) e expandido pelos códigos do factorize; células vazias viram <c/>.
+        """
+        codes, uniques = pd.factorize(column)
+        values = pd.Series(np.asarray(uniques, dtype=object))
+        numbers = pd.to_numeric(values, errors="coerce") if values.dtype == object else values
+        if pd.api.types.is_bool_dtype(column):
+            numbers = pd.Series(np.nan, index=values.index)
+
+        cells = np.empty(len(values) + 1, dtype=object)
+        for i, (value, number) in enumerate(zip(values, numbers)):
+            if pd.notna(number) and np.isfinite(number):
+                cells[i] = f"<c><v>{number!r}</v></c>" if isinstance(number, float) else f"<c><v>{number}</v></c>"
+            else:
+                text = escape(ExportService._INVALID_XML.sub("", str(value)))
+                cells[i] = f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>' if text else "<c/>"
+        cells[-1] = "<c/>"
+        return cells[codes]
+
+    @staticmethod
+    def _rows_xml(df: pd.DataFrame) -> str:
+        """Linhas <row> de um bloco, montadas coluna a coluna"""
+        if df.empty:
+            return ""
+        cells = [ExportService._cells(df[name].reset_index(drop=True)) for name in df.columns]
+        rows = np.full(len(df), "<row>", dtype=object)
+        for column in cells:
+            rows = rows + column
+        return "".join(rows + "</row>")
+
+    @staticmethod
+    def xlsx_stream(chunks: Iterable[pd.DataFrame], columns: List[str], sheet_name: str = "dados") -> Iterator[bytes]:
+        """XLSX gerado em fluxo: cada bloco vira linhas da planilha e os bytes comprimidos saem na hora"""
+        stream = _ZipStream()
+        archive = zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED)
+        header_row = ExportService._rows_xml(pd.DataFrame([columns], columns=columns).astype(str))
+        sheets = 0
+        sheet = None
+        rows_in_sheet = 0
+
+        def open_sheet():
+            nonlocal sheet, sheets, rows_in_sheet
+            sheets += 1
+            sheet = archive.open(f"xl/worksheets/sheet{sheets}.xml", "w", force_zip64=True)
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(header_row.encode("utf-8"))
+            rows_in_sheet = 1
+
+        def close_sheet():
+            sheet.write(b"</sheetData></worksheet>")
+            sheet.close()
+
+        open_sheet()
+        for chunk in chunks:
+            while not chunk.empty:
+                if rows_in_sheet >= ExportService.MAX_SHEET_ROWS:
+                    close_sheet()
+                    open_sheet()
+                part = chunk.iloc[:ExportService.MAX_SHEET_ROWS - rows_in_sheet]
+                sheet.write(ExportService._rows_xml(part).encode("utf-8"))
+                rows_in_sheet += len(part)
+                chunk = chunk.iloc[len(part):]
+            yield stream.drain()
+        close_sheet()
+
+        # Partes do pacote escritas no fim, quando o número de abas já é conhecido
+        name = escape(sheet_name[:28])
+        sheet_entries = "".join(
+            f'<sheet name="{name}{"" if i == 1 else f" {i}"}" sheetId="{i}" r:id="rId{i}"/>' for i in range(1, sheets + 1)
+        )
+        archive.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheet_entries}</sheets></workbook>'
+        ))
+        archive.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, sheets + 1)
+            )
+            + '</Relationships>'
+        ))
+        archive.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ))
+        archive.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for i in range(1, sheets + 1)
+            )
+            + '</Types>'
+        ))
+        archive.close()
+        yield stream.drain()
+
+    @staticmethod
+    def stream(table: str, file_format: str, frames: Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]],
+               start_date: str = "", end_date: str = "", farm: str = SourceRegistry.ALL_FARMS,
+               payload: Optional[Dict[str, Any]] = None, quarantine: Optional[pd.DataFrame] = None) -> Iterator[bytes]:
+        """Gerador de bytes do arquivo pedido (linhas filtradas, quarentena ou tabela de métricas)"""
+        if table in ("biometria", "racao"):
+            df = frames[0] if table == "biometria" else frames[1]
+            columns = [str(name) for name in df.columns if name not in DatasetService.DERIVED_COLUMNS] \
+                if df is not None else []
+            chunks = ExportService.filtered_chunks(df, start_date, end_date, farm)
+        elif table in ExportService.QUARANTINE_TABLES:
+            columns = [str(name) for name in quarantine.columns] if quarantine is not None else []
+            chunks = ExportService.filtered_chunks(quarantine, farm=farm)
+        else:
+            frame = ExportService.table_frame(payload, table)
+            columns = list(frame.columns)
+            chunks = iter([frame]) if not frame.empty else iter([])
+
+        if file_format == "xlsx":
+            return ExportService.xlsx_stream(chunks, columns, sheet_name=table)
+        return ExportService.csv_stream(chunks, columns)
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ForecastService:
+    """Projeção da data em que cada tanque atinge a área média alvo
+
+    As médias diárias de área são organizadas em uma matriz (tanque x observação)
+    preenchida com máscara, e os modelos linear (area = a + b·dia) e log-linear
+    (ln area = a + b·dia) são ajustados para todos os tanques de uma vez por mínimos
+    quadrados em forma fechada. Em cada tanque fica o modelo com maior R² na escala
+    da área; o intervalo de confiança vem do intervalo de 95% da inclinação.
+    """
+
+    # Quantis t de Student (bicaudal, 95%) para 1..30 graus de liberdade; acima disso, 1,96
+    T_QUANTILES_95 = np.array([
+        12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+    ])
+
+    MODELS = ["linear", "log-linear"]
+
+    @staticmethod
+    def padded_daily_matrix(biometry_typed: pd.DataFrame) -> Tuple[List[str], pd.Timestamp, np.ndarray, np.ndarray, np.ndarray]:
+        """Médias diárias de área por tanque em matrizes preenchidas (dias, áreas e máscara)"""
+        days = biometry_typed["data_parsed"].dt.normalize()
+        first_day = days.min()
+        day_index = ((days - first_day) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+        n_days = int(day_index.max()) + 1
+
+        # Média diária por (tanque, dia) com uma chave inteira única, sem groupby sobre texto
+        codes, names = pd.factorize(biometry_typed["tanque"], sort=False)
+        keys, inverse = np.unique(codes.astype(np.int64) * n_days + day_index, return_inverse=True)
+        means = np.bincount(inverse, weights=biometry_typed["area"].to_numpy(dtype=float)) / np.bincount(inverse)
+        tank_of, day_of = keys // n_days, keys % n_days
+
+        # Posição de cada dia dentro do seu tanque (as chaves estão ordenadas por tanque e dia)
+        position = np.arange(len(keys)) - np.searchsorted(tank_of, tank_of, side="left")
+        width = int(position.max()) + 1 if len(position) else 0
+
+        # Tanques em ordem natural (2 antes de 10), como nas demais tabelas
+        names = [str(name) for name in names]
+        order = sorted(range(len(names)), key=lambda i: (len(names[i]), names[i]))
+        row_of_code = np.empty(len(names), dtype=np.int64)
+        row_of_code[order] = np.arange(len(names))
+        tanks = [names[i] for i in order]
+        rows = row_of_code[tank_of]
+
+        x = np.zeros((len(tanks), width))
+        y = np.zeros((len(tanks), width))
+        mask = np.zeros((len(tanks), width), dtype=bool)
+        x[rows, position] = day_of
+        y[rows, position] = means
+        mask[rows, position] = True
+
+        return tanks, first_day, x, y, mask
+
+    @staticmethod
+    def fit_batched(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """Mínimos quadrados y = a + b·x em lote (uma reta por linha, ignorando as células fora da máscara)"""
+        w = mask.astype(float)
+        n = w.sum(axis=1)
+        sx, sy = (w * x).sum(axis=1), (w * y).sum(axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_x, mean_y = sx / n, sy / n
+            dx = np.where(mask, x - mean_x[:, None], 0.0)
+            dy = np.where(mask, y - mean_y[:, None], 0.0)
+            sxx = (dx * dx).sum(axis=1)
+            slope = (dx * dy).sum(axis=1) / sxx
+            intercept = mean_y - slope * mean_x
+
+            residuals = np.where(mask, y - (intercept[:, None] + slope[:, None] * x), 0.0)
+            sse = (residuals * residuals).sum(axis=1)
+            slope_se = np.sqrt(sse / (n - 2) / sxx)
+
+        return {
+            "n": n, "slope": slope, "intercept": intercept, "slope_se": np.where(n > 2, slope_se, np.nan),
+            "mean_x": mean_x, "mean_y": mean_y
+        }
+
+    @staticmethod
+    def _r2_on_area(y: np.ndarray, mask: np.ndarray, predicted: np.ndarray) -> np.ndarray:
+        """R² calculado na escala da área (comparável entre os dois modelos)"""
+        w = mask.astype(float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_y = (w * y).sum(axis=1) / w.sum(axis=1)
+            ss_tot = (w * (y - mean_y[:, None]) ** 2).sum(axis=1)
+            ss_res = (w * (y - predicted) ** 2).sum(axis=1)
+            return np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.nan)
+
+    @staticmethod
+    def _crossing_day(fit: Dict[str, np.ndarray], target: np.ndarray, slope: np.ndarray) -> np.ndarray:
+        """Dia em que a reta (pelo centróide) com a inclinação informada atinge o alvo; NaN se não cresce"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(slope > 0, fit["mean_x"] + (target - fit["mean_y"]) / slope, np.nan)
+
+    @staticmethod
+    def project(biometry_typed: Optional[pd.DataFrame], target_area: float) -> Dict[str, Any]:
+        """Ajusta os modelos para todos os tanques e projeta a data em que a área média atinge o alvo
+
+        Retorna arrays alinhados a tank_ids: modelo escolhido, área atual (última média diária),
+        taxa de crescimento por dia na última observação, R², dias até o alvo a partir da
+        última biometria e as datas prevista, mínima e máxima (NaT quando não há previsão).
+        ``com_intervalo`` indica se o erro da inclinação existe (mais de 2 dias no ajuste).
+        """
+        empty = {"tank_ids": [], "target": target_area}
+        if biometry_typed is None or biometry_typed.empty or not target_area or target_area <= 0:
+            return empty
+
+        tanks, first_day, x, y, mask = ForecastService.padded_daily_matrix(biometry_typed)
+        rows = np.arange(len(tanks))
+        last_position = mask.sum(axis=1) - 1
+        last_day, current_area = x[rows, last_position], y[rows, last_position]
+
+        # Modelo linear sobre a área e log-linear sobre ln(área) (apenas áreas positivas)
+        linear = ForecastService.fit_batched(x, y, mask)
+        log_mask = mask & (y > 0)
+        log_linear = ForecastService.fit_batched(x, np.log(np.where(log_mask, y, 1.0)), log_mask)
+
+        r2_linear = ForecastService._r2_on_area(y, mask, linear["intercept"][:, None] + linear["slope"][:, None] * x)
+        with np.errstate(over="ignore"):
+            r2_log = ForecastService._r2_on_area(
+                y, mask, np.exp(log_linear["intercept"][:, None] + log_linear["slope"][:, None] * x)
+            )
+        use_log = np.nan_to_num(r2_log, nan=-np.inf) > np.nan_to_num(r2_linear, nan=-np.inf)
+
+        # Dias (contados desde o primeiro dia) em que cada modelo atinge o alvo, com o intervalo da inclinação
+        def crossings(fit: Dict[str, np.ndarray], target: float) -> Tuple[np.ndarray, ...]:
+            # Graus de liberdade do próprio ajuste (o log-linear ignora as áreas não positivas)
+            df = np.maximum(fit["n"] - 2, 1).astype(int)
+            t = np.where(df <= len(ForecastService.T_QUANTILES_95),
+                         ForecastService.T_QUANTILES_95[np.minimum(df, len(ForecastService.T_QUANTILES_95)) - 1], 1.96)
+            target_values = np.full(len(tanks), target)
+            margin = t * fit["slope_se"]
+            return (ForecastService._crossing_day(fit, target_values, fit["slope"]),
+                    ForecastService._crossing_day(fit, target_values, fit["slope"] + margin),
+                    ForecastService._crossing_day(fit, target_values, fit["slope"] - margin),
+                    np.isfinite(margin))
+
+        linear_days = crossings(linear, target_area)
+        log_days = crossings(log_linear, np.log(target_area))
+        expected, earliest, latest, has_interval = (np.where(use_log, log_value, linear_value)
+                                                    for linear_value, log_value in zip(linear_days, log_days))
+
+        slope = np.where(use_log, log_linear["slope"], linear["slope"])
+        growth_per_day = np.where(use_log, log_linear["slope"] * current_area, linear["slope"])
+        enough_data = linear["n"] >= 2
+        reached = current_area >= target_area
+
+        # Previsões nunca anteriores à última biometria; tanques que já atingiram o alvo ficam em 0 dias
+        def days_ahead(day_index: np.ndarray) -> np.ndarray:
+            ahead = np.maximum(day_index - last_day, 0.0)
+            return np.where(reached, 0.0, np.where(enough_data & (slope > 0), ahead, np.nan))
+
+        expected_days, earliest_days, latest_days = days_ahead(expected), days_ahead(earliest), days_ahead(latest)
+
+        def to_dates(days: np.ndarray) -> np.ndarray:
+            base = np.datetime64(first_day.to_datetime64(), "D") + last_day.astype(np.int64).astype("timedelta64[D]")
+            offsets = np.where(np.isfinite(days), np.ceil(days), 0).astype("timedelta64[D]")
+            return np.where(np.isfinite(days), base + offsets, np.datetime64("NaT"))
+
+        return {
+            "tank_ids": tanks,
+            "target": target_area,
+            "modelo": np.where(use_log, ForecastService.MODELS[1], ForecastService.MODELS[0]),
+            "n_dias": linear["n"],
+            "area_atual": current_area,
+            "taxa_diaria": np.where(enough_data, growth_per_day, np.nan),
+            "r2": np.where(use_log, r2_log, r2_linear),
+            "atingido": reached,
+            "dias_para_meta": expected_days,
+            "dias_min": earliest_days,
+            "dias_max": latest_days,
+            "data_prevista": to_dates(expected_days),
+            "data_min": to_dates(earliest_days),
+            "data_max": to_dates(latest_days),
+            "com_intervalo": has_interval,
+        }
+
+    @staticmethod
+    def to_columns(result: Dict[str, Any]) -> Tuple[List[str], Dict[str, List[float]], Dict[str, List[str]]]:
+        """Converte a projeção para o State: colunas numéricas (sem NaN) e rótulos de texto"""
+        tanks = result["tank_ids"]
+        if not tanks:
+            return [], {}, {}
+
+        def numbers(values: np.ndarray, digits: int) -> List[float]:
+            return np.round(np.nan_to_num(values.astype(float), nan=0.0), digits).tolist()
+
+        def date_text(values: np.ndarray) -> List[str]:
+            return [pd.Timestamp(value).strftime("%d/%m/%Y") if not pd.isna(value) else "—" for value in values]
+
+        expected, earliest, latest = (date_text(result[key]) for key in ("data_prevista", "data_min", "data_max"))
+        forecast = []
+        interval = []
+        for i in range(len(tanks)):
+            if result["atingido"][i]:
+                forecast.append("Meta atingida")
+                interval.append("—")
+            elif result["n_dias"][i] < 2:
+                forecast.append("Dados insuficientes")
+                interval.append("—")
+            elif expected[i] == "—":
+                forecast.append("Sem crescimento")
+                interval.append("—")
+            elif not result["com_intervalo"][i]:
+                # Sem erro da inclinação (2 dias de biometria) não há intervalo, nem parcial
+                forecast.append(expected[i])
+                interval.append("—")
+            else:
+                forecast.append(expected[i])
+                interval.append(f"{earliest[i]} a {latest[i]}" if latest[i] != "—" else f"a partir de {earliest[i]}")
+
+        columns = {
+            "area_atual": numbers(result["area_atual"], 2),
+            "taxa_diaria": numbers(result["taxa_diaria"], 4),
+            "r2": numbers(result["r2"], 3),
+            "dias_para_meta": numbers(result["dias_para_meta"], 0),
+        }
+        labels = {"modelo": [str(model) for model in result["modelo"]], "previsao": forecast, "intervalo": interval}
+        return list(tanks), columns, labels
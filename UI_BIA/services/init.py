@@ -1,2 +1,24 @@
 from .sheets_service import SheetsService
-from .metrics_service import MetricsService
\ No newline at end of file
+from .metrics_service import MetricsService
+from .table_service import TableService
+from .dataset_service import DatasetService
+from .timeseries_service import TimeSeriesService
+from .cache_service import MetricsCache
+from .preset_service import PresetService
+from .persistence_service import PersistenceService, SqlMetricsBackend
+from .source_registry import FarmSource, SourceRegistry
+from .shared_dataset import SharedDataset, SharedDatasetService
+from .comparison_service import ComparisonService
+from .forecast_service import ForecastService
+from .sampling_service import SamplingService
+from .export_service import ExportService
+from .metrics_api_service import MetricsApiService, EncodedResponse
+from .validation_service import ValidationService, ValidationResult
+from .telemetry_service import TelemetryService, Histogram
+from .log_service import LogService, RateLimitFilter, StructuredFormatter
+from .profiling_service import ProfilingService
+from .lazy_import import LazyImport
+from .drilldown_service import DrillDownService
+from .outlier_service import OutlierService
+from .version_service import VersionService, BlocoLinhas, VersaoDataset
+from .local_source_service import LocalSourceService
@@ -0,0 +1,35 @@
+import importlib
+from typing import Any, Optional
+
+
+class LazyImport:
+    """Referência a um atributo de módulo (ex.: uma classe de serviço) importado só no primeiro uso
+
+    Usado no módulo do app para que o worker comece a atender sem carregar os serviços
+    que só são necessários ao processar eventos (requests, modelos do banco, exportação).
+    O acesso a atributos e as chamadas são repassados ao objeto real.
+    """
+
+    __slots__ = ("_module", "_name", "_package", "_target")
+
+    def __init__(self, module: str, name: str, package: Optional[str] = None):
+        self._module = module
+        self._name = name
+        self._package = package
+        self._target = None
+
+    def _load(self) -> Any:
+        # O lock de importação do Python serializa carregamentos simultâneos do mesmo módulo
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self._module, self._package), self._name)
+        return self._target
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        state = "carregado" if self._target is not None else "pendente"
+        return f"<LazyImport {self._module}.{self._name} ({state})>"
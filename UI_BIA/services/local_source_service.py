@@ -0,0 +1,126 @@
+import glob
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import pandas as pd
+
+from .cache_service import MetricsCache
+from .log_service import LogService
+from .telemetry_service import TelemetryService
+
+logger = LogService.get_logger(__name__)
+
+
+class LocalSourceService:
+    """Fonte local: um arquivo CSV ou um diretório de CSVs (ex.: um arquivo por dia em uma pasta compartilhada)
+
+    Uma fonte é local quando a URL da planilha no registro de fontes é um caminho ou uma
+    URL ``file://``. Os arquivos são lidos com mapeamento em memória (memory_map do
+    leitor C do pandas), e os que mudaram desde a última carga são lidos em paralelo em
+    um pool de threads (ou de processos, com UI_BIA_LOCAL_POOL=process). Cada arquivo
+    fica em cache pelo caminho, com o mtime e o tamanho da leitura: arquivos sem
+    alteração não são lidos de novo, e um arquivo alterado substitui a leitura anterior
+    em vez de acumular versões. O diretório é concatenado a cada carga a partir desse
+    cache, sem guardar uma segunda cópia das linhas.
+
+    Todas as colunas são lidas como texto, para que arquivos diferentes do mesmo
+    diretório tenham os mesmos tipos; a conversão fica com a validação e o dataset
+    tipado, como nas planilhas (o histórico de versões guarda esses tipos).
+    """
+
+    # Arquivos lidos de um diretório
+    PATTERN = "*.csv"
+
+    # Pool de leitura: "thread" ou "process", e número de workers
+    POOL = os.environ.get("UI_BIA_LOCAL_POOL", "thread").lower()
+    WORKERS = int(os.environ.get("UI_BIA_LOCAL_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+    # Separador e codificação dos arquivos
+    SEPARATOR = os.environ.get("UI_BIA_LOCAL_SEP", ",")
+    ENCODING = os.environ.get("UI_BIA_LOCAL_ENCODING", "utf-8")
+
+    # Caminho -> (mtime, tamanho, leitura)
+    _files = MetricsCache(max_entries=int(os.environ.get("UI_BIA_LOCAL_FILES", "4096")), name="arquivos_locais")
+
+    @staticmethod
+    def is_local(url: str) -> bool:
+        """URL ``file://`` ou caminho do sistema de arquivos (inclusive C:\\... no Windows)"""
+        scheme = urlparse(url).scheme
+        return scheme == "file" or scheme == "" or len(scheme) == 1
+
+    @staticmethod
+    def path_of(url: str) -> str:
+        """Caminho local de uma URL ``file://`` ou do próprio caminho"""
+        parsed = urlparse(url)
+        return url2pathname(parsed.path) if parsed.scheme == "file" else os.path.expanduser(url)
+
+    @staticmethod
+    def list_files(path: str) -> List[str]:
+        """Arquivos da fonte: o próprio arquivo ou os CSVs do diretório, em ordem de nome"""
+        if os.path.isdir(path):
+            return sorted(glob.glob(os.path.join(path, LocalSourceService.PATTERN)))
+        return [path] if os.path.isfile(path) else []
+
+    @staticmethod
+    def read_file(path: str) -> pd.DataFrame:
+        """Lê um CSV com mapeamento em memória, todas as colunas como texto"""
+        if os.path.getsize(path) == 0:
+            return pd.DataFrame()
+        return pd.read_csv(path, dtype=str, memory_map=True, sep=LocalSourceService.SEPARATOR,
+                           encoding=LocalSourceService.ENCODING)
+
+    @staticmethod
+    def _executor(count: int) -> Executor:
+        workers = max(min(LocalSourceService.WORKERS, count), 1)
+        if LocalSourceService.POOL == "process" and count > 1:
+            return ProcessPoolExecutor(max_workers=workers)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="local-csv")
+
+    @staticmethod
+    def read_files(files: List[Tuple[str, int, int]]) -> List[pd.DataFrame]:
+        """Lê os arquivos (caminho, mtime, tamanho), em paralelo só os que mudaram desde a última leitura"""
+        frames: List[Optional[pd.DataFrame]] = []
+        for path, mtime, size in files:
+            cached = LocalSourceService._files.get(path)
+            frames.append(cached[2] if cached is not None and cached[:2] == (mtime, size) else None)
+        changed = [i for i, frame in enumerate(frames) if frame is None]
+
+        if len(changed) == 1:
+            frames[changed[0]] = LocalSourceService.read_file(files[changed[0]][0])
+        elif changed:
+            with LocalSourceService._executor(len(changed)) as executor:
+                for i, frame in zip(changed, executor.map(LocalSourceService.read_file,
+                                                         [files[i][0] for i in changed])):
+                    frames[i] = frame
+
+        for i in changed:
+            path, mtime, size = files[i]
+            LocalSourceService._files.put(path, (mtime, size, frames[i]))
+        TelemetryService.rows("leitura_local", sum(len(frames[i]) for i in changed))
+        return frames
+
+    @staticmethod
+    def load(url: str) -> Optional[pd.DataFrame]:
+        """Carrega a fonte local (None se não houver arquivos ou se a leitura falhar)"""
+        path = LocalSourceService.path_of(url)
+        try:
+            with TelemetryService.span("leitura_local"):
+                files = []
+                for name in LocalSourceService.list_files(path):
+                    stat = os.stat(name)
+                    files.append((name, stat.st_mtime_ns, stat.st_size))
+                if not files:
+                    logger.error("Fonte local sem arquivos", extra={"campos": {"caminho": path}})
+                    return None
+
+                frames = [frame for frame in LocalSourceService.read_files(files) if not frame.empty]
+                if len(frames) == 1:
+                    return frames[0]
+                return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        except Exception as e:
+            logger.error("Erro ao ler fonte local", extra={"campos": {"caminho": path, "erro": str(e)}})
+            return None
@@ -0,0 +1,127 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from .telemetry_service import TelemetryService
+
+
+class RateLimitFilter(logging.Filter):
+    """Limita cada mensagem (logger + texto sem os parâmetros) a ``burst`` registros por ``interval`` segundos
+
+    As repetições descartadas são contadas e informadas no campo ``suprimidas`` do
+    próximo registro aceito da mesma mensagem.
+    """
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                # Janela nova: [início, aceitos, descartados]
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+            else:
+                suppressed = 0
+
+            if window[1] >= self.burst:
+                window[2] += 1
+                accepted = False
+            else:
+                window[1] += 1
+                accepted = True
+
+        if not accepted:
+            TelemetryService.count("ui_bia_log_suppressed_total", logger=record.name)
+            return False
+        if suppressed:
+            record.suprimidas = suppressed
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Uma linha JSON por registro: horário, nível, logger, mensagem e os campos extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        document.update(getattr(record, "campos", {}))
+        if getattr(record, "suprimidas", 0):
+            document["suprimidas"] = record.suprimidas
+        if record.exc_info:
+            document["erro"] = self.formatException(record.exc_info)
+        return json.dumps(document, ensure_ascii=False, default=str)
+
+
+class LogService:
+    """Logging estruturado e com nível do backend (UI_BIA_LOG_LEVEL, padrão INFO)
+
+    A escrita acontece em uma thread própria (QueueHandler/QueueListener): quem registra
+    só coloca o registro na fila, sem bloquear o cálculo em I/O de terminal. Cada mensagem
+    é limitada a UI_BIA_LOG_BURST registros a cada UI_BIA_LOG_INTERVAL segundos.
+    Campos estruturados vão em ``extra={"campos": {...}}``.
+    """
+
+    ROOT = "UI_BIA"
+
+    _configured = False
+    _lock = threading.Lock()
+    _listener = None
+
+    @staticmethod
+    def configure() -> None:
+        """Configura o logger raiz do pacote uma única vez por processo"""
+        with LogService._lock:
+            if LogService._configured:
+                return
+
+            root = logging.getLogger(LogService.ROOT)
+            root.setLevel(os.environ.get("UI_BIA_LOG_LEVEL", "INFO").upper())
+            root.propagate = False
+
+            # O registro é formatado (JSON) antes de entrar na fila; a thread de escrita só o imprime
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+
+            records = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(records)
+            queue_handler.setFormatter(StructuredFormatter())
+            queue_handler.addFilter(RateLimitFilter(
+                burst=int(os.environ.get("UI_BIA_LOG_BURST", "10")),
+                interval=float(os.environ.get("UI_BIA_LOG_INTERVAL", "60"))
+            ))
+            root.addHandler(queue_handler)
+
+            LogService._listener = logging.handlers.QueueListener(records, handler)
+            LogService._listener.start()
+            atexit.register(LogService._listener.stop)
+            LogService._configured = True
+
+    @staticmethod
+    def get_logger(name: str) -> logging.Logger:
+        """Logger de um módulo do pacote (ex.: LogService.get_logger(__name__))"""
+        LogService.configure()
+        if name != LogService.ROOT and not name.startswith(LogService.ROOT + "."):
+            name = f"{LogService.ROOT}.{name}"
+        return logging.getLogger(name)
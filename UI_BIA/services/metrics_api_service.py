@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_service import MetricsCache
+from .metrics_service import MetricsService
+
+
+@dataclass
+class EncodedResponse:
+    """Corpo JSON já serializado e comprimido de uma resposta da API, com o ETag correspondente"""
+
+    etag: str
+    body: bytes
+    gzipped: bytes
+
+
+class MetricsApiService:
+    """Respostas da API de métricas (biometria, ração e correlação) para sistemas externos
+
+    As métricas são lidas do cache do dashboard, mas as calculadas para a API ficam no
+    cache próprio dela: períodos arbitrários de sistemas externos não descartam os
+    períodos pré-definidos das sessões. A resposta serializada em JSON e comprimida com
+    gzip também fica em cache, indexada pela versão do dataset e pelos filtros. O ETag é fraco (vale para as duas codificações) e muda junto com o conteúdo,
+    então um cliente que faz polling recebe 304 sem que nada seja recalculado.
+    """
+
+    SECTIONS = ["biometria", "racao", "correlacao"]
+
+    # Métricas calculadas para a API, pela mesma chave do cache do dashboard
+    _payloads = MetricsCache(max_entries=64, name="api_payloads")
+
+    # Respostas prontas por (versão, fazenda, período, seção, tanques)
+    _responses = MetricsCache(max_entries=256, name="api_metricas")
+
+    @staticmethod
+    def cached_payload(key: Tuple) -> Optional[Dict[str, Any]]:
+        """Métricas já calculadas para a API (chave de PresetService.cache_key)"""
+        return MetricsApiService._payloads.get(key)
+
+    @staticmethod
+    def store_payload(key: Tuple, payload: Dict[str, Any]) -> None:
+        """Guarda as métricas calculadas para a API, fora do cache usado pelas sessões"""
+        MetricsApiService._payloads.put(key, payload)
+
+    @staticmethod
+    def accepts_gzip(accept_encoding: str) -> bool:
+        """O cliente aceita gzip: ``gzip`` (ou ``*``) no Accept-Encoding com peso q maior que zero"""
+        weights = {}
+        for part in accept_encoding.split(","):
+            coding, *params = [item.strip() for item in part.split(";")]
+            if not coding:
+                continue
+            weight = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+            weights[coding.lower()] = weight
+
+        return weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0))) > 0
+
+    @staticmethod
+    def parse_tanks(value: str) -> List[str]:
+        """Filtro de tanques da query string (lista separada por vírgulas)"""
+        return sorted({tank.strip() for tank in value.split(",") if tank.strip()}, key=lambda t: (len(t), t))
+
+    @staticmethod
+    def sections(payload: Dict[str, Any], tanks: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Converte o payload colunar do dashboard em métricas por tanque e gerais de cada seção
+
+        O filtro de tanques restringe apenas as métricas por tanque; as gerais continuam
+        sendo as do período e da fazenda, como no dashboard.
+        """
+        selected = set(tanks) if tanks else None
+
+        def rows(ids: List[str], columns: Dict[str, List[float]], fields: List[str]) -> Dict[str, Dict[str, float]]:
+            return {
+                tank: {field: columns[field][i] for field in fields if field in columns}
+                for i, tank in enumerate(ids) if selected is None or tank in selected
+            }
+
+        tank_ids = payload.get("tank_ids", [])
+        tank_metrics = payload.get("tank_metrics", {})
+        general = payload.get("general_metrics", {})
+
+        return {
+            "biometria": {
+                "por_tanque": rows(tank_ids, tank_metrics, ["peixes_medidos", "area_media"]),
+                "geral": {field: general[field] for field in ("total_peixes_medidos", "area_media_geral")
+                          if field in general},
+            },
+            "racao": {
+                "por_tanque": rows(tank_ids, tank_metrics, ["racao_utilizada"]),
+                "geral": {field: general[field] for field in ("total_racao_utilizada",) if field in general},
+            },
+            "correlacao": {
+                "por_tanque": rows(payload.get("correlation_tank_ids", []), payload.get("correlation_tank_data", {}),
+                                   MetricsService.CORRELATION_FIELDS),
+                "geral": dict(payload.get("correlation_general_data", {})),
+            },
+        }
+
+    @staticmethod
+    def encode(document: Dict[str, Any]) -> EncodedResponse:
+        """Serializa uma resposta uma única vez: JSON, versão gzip e ETag do conteúdo"""
+        body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = 'W/"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        return EncodedResponse(etag=etag, body=body, gzipped=gzip.compress(body, compresslevel=6, mtime=0))
+
+    @staticmethod
+    def cache_key(version: str, start_date: str, end_date: str, farm: str, section: str = "",
+                  tanks: Optional[List[str]] = None) -> Tuple:
+        """Chave das respostas prontas: versão, fazenda, período, seção e tanques"""
+        return (version, farm, start_date, end_date, section, tuple(tanks or ()))
+
+    @staticmethod
+    def cached(key: Tuple) -> Optional[EncodedResponse]:
+        """Resposta já codificada, sem tocar no dataset nem no cálculo das métricas"""
+        return MetricsApiService._responses.get(key)
+
+    @staticmethod
+    def response(key: Tuple, payload: Dict[str, Any]) -> EncodedResponse:
+        """Monta, codifica e guarda em cache a resposta de uma seção (ou de todas) das métricas"""
+        version, farm, start_date, end_date, section, tanks = key
+        sections = MetricsApiService.sections(payload, list(tanks))
+        document = {"versao": version, "inicio": start_date, "fim": end_date, "fazenda": farm}
+        if tanks:
+            document["tanques"] = list(tanks)
+        if section:
+            document[section] = sections[section]
+        else:
+            document.update(sections)
+
+        encoded = MetricsApiService.encode(document)
+        MetricsApiService._responses.put(key, encoded)
+        return encoded
+
+    @staticmethod
+    def matches(if_none_match: str, etag: str) -> bool:
+        """Compara o If-None-Match do cliente com o ETag (comparação fraca, aceita '*')"""
+        def opaque(tag: str) -> str:
+            tag = tag.strip()
+            return tag[2:] if tag.startswith("W/") else tag
+
+        candidates = [tag.strip() for tag in if_none_match.split(",") if tag.strip()]
+        return "*" in candidates or any(opaque(tag) == opaque(etag) for tag in candidates)
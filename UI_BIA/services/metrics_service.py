@@ -1,11 +1,25 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Any, Callable
+
+from .log_service import LogService
+from .telemetry_service import TelemetryService
+
+logger = LogService.get_logger(__name__)
 
 
 class MetricsService:
     """Serviço para cálculo de métricas do dashboard"""
 
+    # Colunas numéricas enviadas ao navegador (a formatação é feita no cliente)
+    TANK_FIELDS = ['peixes_medidos', 'area_media', 'racao_utilizada']
+    GENERAL_FIELDS = ['total_peixes_medidos', 'area_media_geral', 'total_racao_utilizada']
+    CORRELATION_FIELDS = ['area_inicial', 'area_final', 'variacao_area', 'percentual_crescimento',
+                          'racao_total', 'eficiencia_crescimento']
+    CORRELATION_GENERAL_FIELDS = ['total_variacao_area', 'total_racao', 'media_crescimento_percentual',
+                                  'eficiencia_geral', 'tanques_analisados']
+
     @staticmethod
     def parse_date(date_str: str) -> Optional[datetime]:
         """Converte string de data para datetime"""
@@ -23,6 +37,23 @@ class MetricsService:
         except:
             return None
 
+    @staticmethod
+    @TelemetryService.timed("datas")
+    def parse_date_column(series: pd.Series) -> pd.Series:
+        """Aplica parse_date a uma coluna; em colunas categóricas só as categorias são convertidas"""
+        parsed = series.apply(MetricsService.parse_date)
+        if isinstance(parsed.dtype, pd.CategoricalDtype):
+            # Categorias de datas não admitem comparação de ordem: volta para datetime64
+            parsed = parsed.astype("datetime64[ns]")
+        return parsed
+
+    @staticmethod
+    def sheet_dates(df: pd.DataFrame) -> pd.Series:
+        """Datas da planilha: as convertidas na validação da carga (data_parsed) ou, sem elas, convertidas agora"""
+        if 'data_parsed' in df.columns and pd.api.types.is_datetime64_any_dtype(df['data_parsed']):
+            return df['data_parsed']
+        return MetricsService.parse_date_column(df['data'])
+
     @staticmethod
     def convert_date_format(date_str: str) -> str:
         """Converte data do formato ISO (YYYY-MM-DD) para formato brasileiro (dd/mm/YYYY)"""
@@ -44,6 +75,7 @@ class MetricsService:
             return date_str
 
     @staticmethod
+    @TelemetryService.timed("filtro")
     def filter_data_by_date(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
         """Filtra DataFrame por período de datas"""
         if df is None or df.empty:
@@ -81,32 +113,31 @@ class MetricsService:
                     continue
 
             if start_dt is None or end_dt is None:
-                print(f"Erro: Não foi possível converter as datas. Start: {start_date}, End: {end_date}")
+                logger.warning("Não foi possível converter as datas do filtro",
+                               extra={"campos": {"inicio": start_date, "fim": end_date}})
                 return df
 
-            # Converte coluna de data do DataFrame
-            df_copy = df.copy()
-            df_copy['data_parsed'] = df_copy['data'].apply(MetricsService.parse_date)
-
-            # Remove linhas com datas inválidas
-            df_copy = df_copy.dropna(subset=['data_parsed'])
+            # Datas já convertidas na carga (linhas com data inválida ficam fora do período)
+            dates = MetricsService.sheet_dates(df)
 
             # Filtra por período
-            mask = (df_copy['data_parsed'] >= start_dt) & (df_copy['data_parsed'] <= end_dt)
-            filtered_df = df_copy[mask].drop('data_parsed', axis=1)
+            mask = (dates >= start_dt) & (dates <= end_dt)
+            filtered_df = df[mask.to_numpy()]
 
-            print(f"Filtro aplicado: {start_date} a {end_date}")
-            print(f"Registros antes do filtro: {len(df)}")
-            print(f"Registros após o filtro: {len(filtered_df)}")
+            TelemetryService.rows("filtro", len(df))
+            logger.debug("Filtro aplicado", extra={"campos": {
+                "inicio": start_date, "fim": end_date, "antes": len(df), "depois": len(filtered_df)
+            }})
 
             return filtered_df
 
         except Exception as e:
-            print(f"Erro ao filtrar dados por data: {e}")
-            print(f"Datas recebidas - Start: {start_date}, End: {end_date}")
+            logger.error("Erro ao filtrar dados por data",
+                         extra={"campos": {"erro": str(e), "inicio": start_date, "fim": end_date}})
             return df
 
     @staticmethod
+    @TelemetryService.timed("agregacao_biometria")
     def calculate_biometry_metrics(df: pd.DataFrame, start_date: str = "", end_date: str = "") -> Dict:
         """Calcula métricas de biometria"""
         if df is None or df.empty:
@@ -120,10 +151,10 @@ class MetricsService:
             return {}
 
         try:
-            # Calcula área (largura x altura)
+            # Calcula área (largura x altura); as medições já chegam numéricas da validação da carga
+            TelemetryService.rows("agregacao_biometria", len(df))
             df_copy = df.copy()
-            df_copy['area'] = pd.to_numeric(df_copy['largura'], errors='coerce') * pd.to_numeric(df_copy['altura'],
-                                                                                                 errors='coerce')
+            df_copy['area'] = df_copy['largura'] * df_copy['altura']
 
             # Métricas por tanque
             metrics_by_tank = {}
@@ -147,10 +178,11 @@ class MetricsService:
             }
 
         except Exception as e:
-            print(f"Erro ao calcular métricas de biometria: {e}")
+            logger.error("Erro ao calcular métricas de biometria", extra={"campos": {"erro": str(e)}})
             return {}
 
     @staticmethod
+    @TelemetryService.timed("agregacao_racao")
     def calculate_feed_metrics(df: pd.DataFrame, start_date: str = "", end_date: str = "") -> Dict:
         """Calcula métricas de ração"""
         if df is None or df.empty:
@@ -164,13 +196,12 @@ class MetricsService:
             return {}
 
         try:
-            df_copy = df.copy()
-            df_copy['peso'] = pd.to_numeric(df_copy['peso'], errors='coerce')
+            TelemetryService.rows("agregacao_racao", len(df))
 
-            # Métricas por tanque
+            # Métricas por tanque (peso já numérico, validado na carga)
             metrics_by_tank = {}
-            for tanque in df_copy['tanque'].unique():
-                tank_data = df_copy[df_copy['tanque'] == tanque]
+            for tanque in df['tanque'].unique():
+                tank_data = df[df['tanque'] == tanque]
 
                 metrics_by_tank[str(tanque)] = {
                     'racao_utilizada': round(tank_data['peso'].sum(), 2) if not tank_data['peso'].isna().all() else 0.0
@@ -178,7 +209,7 @@ class MetricsService:
 
             # Métricas gerais
             general_metrics = {
-                'total_racao_utilizada': round(df_copy['peso'].sum(), 2) if not df_copy['peso'].isna().all() else 0.0
+                'total_racao_utilizada': round(df['peso'].sum(), 2) if not df['peso'].isna().all() else 0.0
             }
 
             return {
@@ -187,10 +218,11 @@ class MetricsService:
             }
 
         except Exception as e:
-            print(f"Erro ao calcular métricas de ração: {e}")
+            logger.error("Erro ao calcular métricas de ração", extra={"campos": {"erro": str(e)}})
             return {}
 
     @staticmethod
+    @TelemetryService.timed("correlacao")
     def calculate_temporal_correlation(biometry_df: pd.DataFrame, feed_df: pd.DataFrame,
                                        start_date: str = "", end_date: str = "") -> Dict:
         """Calcula correlação temporal entre crescimento de área e ração utilizada"""
@@ -206,82 +238,184 @@ class MetricsService:
             if biometry_filtered.empty or feed_filtered.empty:
                 return {}
 
-            # Prepara dados de biometria
+            # Prepara dados de biometria (linhas já validadas na carga: datas e medições válidas)
             bio_df = biometry_filtered.copy()
-            bio_df['data_parsed'] = bio_df['data'].apply(MetricsService.parse_date)
-            bio_df['area'] = pd.to_numeric(bio_df['largura'], errors='coerce') * pd.to_numeric(bio_df['altura'],
-                                                                                               errors='coerce')
-            bio_df = bio_df.dropna(subset=['data_parsed', 'area'])
+            bio_df['data_parsed'] = MetricsService.sheet_dates(bio_df)
+            bio_df['area'] = bio_df['largura'] * bio_df['altura']
 
             # Prepara dados de ração
             feed_df_copy = feed_filtered.copy()
-            feed_df_copy['data_parsed'] = feed_df_copy['data'].apply(MetricsService.parse_date)
-            feed_df_copy['peso'] = pd.to_numeric(feed_df_copy['peso'], errors='coerce')
-            feed_df_copy = feed_df_copy.dropna(subset=['data_parsed', 'peso'])
+            feed_df_copy['data_parsed'] = MetricsService.sheet_dates(feed_df_copy)
 
-            # Agrupa por tanque e data para calcular evolução temporal
-            correlation_data = {}
+            return MetricsService.correlation_from_frames(bio_df, feed_df_copy)
 
-            # Análise por tanque
-            for tanque in bio_df['tanque'].unique():
-                if tanque not in feed_df_copy['tanque'].values:
-                    continue
+        except Exception as e:
+            logger.error("Erro ao calcular correlação temporal", extra={"campos": {"erro": str(e)}})
+            return {}
 
-                # Dados de biometria do tanque
-                tank_bio = bio_df[bio_df['tanque'] == tanque].copy()
-                tank_bio_grouped = tank_bio.groupby('data_parsed')['area'].mean().reset_index()
-                tank_bio_grouped = tank_bio_grouped.sort_values('data_parsed')
+    @staticmethod
+    def correlation_from_frames(bio_df: pd.DataFrame, feed_df: pd.DataFrame) -> Dict:
+        """Calcula a correlação a partir de dados já tipados (tanque, data_parsed, area / peso)
+
+        Aceita tanto as linhas individuais quanto agregados diários por tanque,
+        o que permite reaproveitar o cálculo com agregações feitas fora do pandas.
+        """
+        # Agrupa por tanque e data para calcular evolução temporal
+        correlation_data = {}
+
+        # Análise por tanque
+        for tanque in bio_df['tanque'].unique():
+            if tanque not in feed_df['tanque'].values:
+                continue
+
+            # Dados de biometria do tanque
+            tank_bio = bio_df[bio_df['tanque'] == tanque].copy()
+            tank_bio_grouped = tank_bio.groupby('data_parsed')['area'].mean().reset_index()
+            tank_bio_grouped = tank_bio_grouped.sort_values('data_parsed')
+
+            # Dados de ração do tanque
+            tank_feed = feed_df[feed_df['tanque'] == tanque].copy()
+            tank_feed_grouped = tank_feed.groupby('data_parsed')['peso'].sum().reset_index()
+            tank_feed_grouped = tank_feed_grouped.sort_values('data_parsed')
+
+            if len(tank_bio_grouped) < 2 or len(tank_feed_grouped) < 2:
+                continue
+
+            # Calcula variação temporal
+            area_inicial = tank_bio_grouped['area'].iloc[0]
+            area_final = tank_bio_grouped['area'].iloc[-1]
+            variacao_area = area_final - area_inicial
+            percentual_crescimento = ((area_final - area_inicial) / area_inicial * 100) if area_inicial > 0 else 0
+
+            racao_total = tank_feed_grouped['peso'].sum()
+            racao_media_diaria = racao_total / len(tank_feed_grouped) if len(tank_feed_grouped) > 0 else 0
+
+            # Calcula eficiência (crescimento por kg de ração)
+            eficiencia = variacao_area / racao_total if racao_total > 0 else 0
+
+            correlation_data[str(tanque)] = {
+                'area_inicial': round(area_inicial, 2),
+                'area_final': round(area_final, 2),
+                'variacao_area': round(variacao_area, 2),
+                'percentual_crescimento': round(percentual_crescimento, 2),
+                'racao_total': round(racao_total, 2),
+                'racao_media_diaria': round(racao_media_diaria, 2),
+                'eficiencia_crescimento': round(eficiencia, 4),
+                'dias_periodo': len(tank_bio_grouped)
+            }
 
-                # Dados de ração do tanque
-                tank_feed = feed_df_copy[feed_df_copy['tanque'] == tanque].copy()
-                tank_feed_grouped = tank_feed.groupby('data_parsed')['peso'].sum().reset_index()
-                tank_feed_grouped = tank_feed_grouped.sort_values('data_parsed')
+        # Análise geral (todos os tanques)
+        if correlation_data:
+            # Calcula médias gerais
+            total_variacao_area = sum([data['variacao_area'] for data in correlation_data.values()])
+            total_racao = sum([data['racao_total'] for data in correlation_data.values()])
+            media_crescimento = sum([data['percentual_crescimento'] for data in correlation_data.values()]) / len(
+                correlation_data)
+            eficiencia_geral = total_variacao_area / total_racao if total_racao > 0 else 0
+
+            correlation_data['geral'] = {
+                'total_variacao_area': round(total_variacao_area, 2),
+                'total_racao': round(total_racao, 2),
+                'media_crescimento_percentual': round(media_crescimento, 2),
+                'eficiencia_geral': round(eficiencia_geral, 4),
+                'tanques_analisados': len([k for k in correlation_data.keys() if k != 'geral'])
+            }
 
-                if len(tank_bio_grouped) < 2 or len(tank_feed_grouped) < 2:
-                    continue
+        return correlation_data
 
-                # Calcula variação temporal
-                area_inicial = tank_bio_grouped['area'].iloc[0]
-                area_final = tank_bio_grouped['area'].iloc[-1]
-                variacao_area = area_final - area_inicial
-                percentual_crescimento = ((area_final - area_inicial) / area_inicial * 100) if area_inicial > 0 else 0
-
-                racao_total = tank_feed_grouped['peso'].sum()
-                racao_media_diaria = racao_total / len(tank_feed_grouped) if len(tank_feed_grouped) > 0 else 0
-
-                # Calcula eficiência (crescimento por kg de ração)
-                eficiencia = variacao_area / racao_total if racao_total > 0 else 0
-
-                correlation_data[str(tanque)] = {
-                    'area_inicial': round(area_inicial, 2),
-                    'area_final': round(area_final, 2),
-                    'variacao_area': round(variacao_area, 2),
-                    'percentual_crescimento': round(percentual_crescimento, 2),
-                    'racao_total': round(racao_total, 2),
-                    'racao_media_diaria': round(racao_media_diaria, 2),
-                    'eficiencia_crescimento': round(eficiencia, 4),
-                    'dias_periodo': len(tank_bio_grouped)
-                }
+    @staticmethod
+    def to_columns(rows: Dict[str, Dict], fields: List[str]) -> Tuple[List[str], Dict[str, List[float]]]:
+        """Converte métricas por tanque em colunas numéricas alinhadas à lista de tanques"""
+        ids = [str(key) for key in rows.keys()]
+        columns = {field: [float(rows[key].get(field, 0.0)) for key in rows.keys()] for field in fields}
+        return ids, columns
 
-            # Análise geral (todos os tanques)
-            if correlation_data:
-                # Calcula médias gerais
-                total_variacao_area = sum([data['variacao_area'] for data in correlation_data.values()])
-                total_racao = sum([data['racao_total'] for data in correlation_data.values()])
-                media_crescimento = sum([data['percentual_crescimento'] for data in correlation_data.values()]) / len(
-                    correlation_data)
-                eficiencia_geral = total_variacao_area / total_racao if total_racao > 0 else 0
-
-                correlation_data['geral'] = {
-                    'total_variacao_area': round(total_variacao_area, 2),
-                    'total_racao': round(total_racao, 2),
-                    'media_crescimento_percentual': round(media_crescimento, 2),
-                    'eficiencia_geral': round(eficiencia_geral, 4),
-                    'tanques_analisados': len([k for k in correlation_data.keys() if k != 'geral'])
-                }
+    @staticmethod
+    def sort_columns(ids: List[str], columns: Dict[str, List[float]], key: str,
+                     descending: bool = False) -> Tuple[List[str], Dict[str, List[float]]]:
+        """Ordena uma tabela colunar reaproveitando os valores numéricos, sem reconversão de texto"""
+        if not ids:
+            return ids, columns
 
-            return correlation_data
+        if key in columns:
+            order = np.argsort(np.asarray(columns[key], dtype=float), kind='stable')
+        else:
+            # Ordenação natural pelo código do tanque (ex.: 2 antes de 10)
+            order = np.array(sorted(range(len(ids)), key=lambda i: (len(ids[i]), ids[i])))
 
-        except Exception as e:
-            print(f"Erro ao calcular correlação temporal: {e}")
-            return {}
\ No newline at end of file
+        if descending:
+            order = order[::-1]
+
+        return [ids[i] for i in order], {field: [values[i] for i in order] for field, values in columns.items()}
+
+    @staticmethod
+    @TelemetryService.timed("metricas")
+    def build_dashboard_payload(biometry_df: pd.DataFrame, feed_df: pd.DataFrame,
+                                start_date: str = "", end_date: str = "",
+                                is_cancelled: Optional[Callable[[], bool]] = None) -> Optional[Dict[str, Any]]:
+        """Calcula todas as tabelas do dashboard no formato colunar numérico usado pelo State
+
+        Se is_cancelled for informado, ele é consultado entre as etapas e o cálculo
+        é interrompido (retornando None) assim que o resultado deixa de ser necessário.
+        """
+        cancelled = is_cancelled or (lambda: False)
+
+        biometry_metrics = MetricsService.calculate_biometry_metrics(biometry_df, start_date, end_date)
+        if cancelled():
+            return None
+
+        feed_metrics = MetricsService.calculate_feed_metrics(feed_df, start_date, end_date)
+        if cancelled():
+            return None
+
+        # Correlação temporal
+        correlation_data = MetricsService.calculate_temporal_correlation(
+            biometry_df, feed_df, start_date, end_date
+        ) if biometry_df is not None and feed_df is not None else {}
+        if cancelled():
+            return None
+
+        return MetricsService.assemble_dashboard_payload(biometry_metrics, feed_metrics, correlation_data)
+
+    @staticmethod
+    def assemble_dashboard_payload(biometry_metrics: Dict, feed_metrics: Dict, correlation_data: Dict) -> Dict[str, Any]:
+        """Monta o formato colunar do State a partir das métricas de biometria, ração e correlação"""
+        payload: Dict[str, Any] = {
+            'tank_ids': [],
+            'tank_metrics': {},
+            'general_metrics': {},
+            'correlation_tank_ids': [],
+            'correlation_tank_data': {},
+            'correlation_general_data': {},
+            'has_correlation_data': False
+        }
+
+        # Métricas por tanque (biometria combinada com ração)
+        if biometry_metrics.get('por_tanque') and feed_metrics.get('por_tanque'):
+            rows = {
+                tanque: {**bio_data, **feed_metrics['por_tanque'].get(tanque, {})}
+                for tanque, bio_data in biometry_metrics['por_tanque'].items()
+            }
+            payload['tank_ids'], payload['tank_metrics'] = MetricsService.to_columns(rows, MetricsService.TANK_FIELDS)
+
+        # Métricas gerais
+        if biometry_metrics.get('geral') and feed_metrics.get('geral'):
+            general = {**biometry_metrics['geral'], **feed_metrics['geral']}
+            payload['general_metrics'] = {
+                field: float(general.get(field, 0.0)) for field in MetricsService.GENERAL_FIELDS
+            }
+
+        # Correlação temporal
+        if correlation_data:
+            rows = {tanque: data for tanque, data in correlation_data.items() if tanque != 'geral'}
+            payload['correlation_tank_ids'], payload['correlation_tank_data'] = MetricsService.to_columns(
+                rows, MetricsService.CORRELATION_FIELDS
+            )
+            if 'geral' in correlation_data:
+                payload['correlation_general_data'] = {
+                    field: float(correlation_data['geral'].get(field, 0.0))
+                    for field in MetricsService.CORRELATION_GENERAL_FIELDS
+                }
+            payload['has_correlation_data'] = len(payload['correlation_tank_ids']) > 0
+
+        return payload
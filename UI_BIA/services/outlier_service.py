@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache_service import MetricsCache
+from .telemetry_service import TelemetryService
+
+
+class OutlierService:
+    """Detecção de medições implausíveis de biometria (ex.: vírgula deslocada na largura ou na altura)
+
+    Cada medição é comparada com as demais do mesmo tanque no mesmo dia por estatísticas
+    robustas: mediana e MAD (desvio absoluto mediano), calculados com transforms de
+    groupby sobre uma chave inteira (tanque, dia), em uma única passada para todos os
+    tanques. Uma medição é atípica quando:
+
+    * o escore z robusto, 0,6745·(x - mediana)/MAD, passa de Z_LIMIT em módulo
+      (só em grupos com pelo menos MIN_GROUP medições e MAD > 0) e a medição se afasta
+      da mediana mais que MIN_DEVIATION dela (com poucos peixes o MAD pode sair muito
+      pequeno, e diferenças normais entre peixes não são erros de digitação), ou
+    * a razão entre ela e a mediana do grupo passa de RATIO_LIMIT em qualquer sentido
+      (grupos com pelo menos MIN_RATIO_GROUP medições), o que cobre o erro de uma casa
+      decimal mesmo em grupos pequenos ou com MAD nulo.
+    """
+
+    # Limite do escore z robusto (Iglewicz e Hoaglin)
+    Z_LIMIT = 3.5
+    MIN_GROUP = 5
+    MIN_DEVIATION = 0.25
+
+    # Razão até a mediana do grupo a partir da qual a medição é atípica (uma casa decimal = 10x)
+    RATIO_LIMIT = 5.0
+    MIN_RATIO_GROUP = 3
+
+    # Medições verificadas e a coluna com a marca da linha no conjunto limpo e no tipado
+    COLUMNS = ["largura", "altura"]
+    FLAG_COLUMN = "atipica"
+
+    # Planilhas sem as medições atípicas, por versão do dataset (opção de excluí-las das métricas)
+    _filtered = MetricsCache(max_entries=4, name="sem_atipicas")
+
+    @staticmethod
+    def flag_names() -> List[str]:
+        """Colunas de marca por medição (``<coluna>_atipica``)"""
+        return [f"{column}_atipica" for column in OutlierService.COLUMNS]
+
+    @staticmethod
+    def group_keys(tanks: pd.Series, dates: pd.Series) -> np.ndarray:
+        """Chave inteira única de (tanque, dia) para cada linha"""
+        tank_codes, _ = pd.factorize(tanks, sort=False)
+        days = dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+        days = days - days.min() if len(days) else days
+        return tank_codes.astype(np.int64) * (int(days.max()) + 1 if len(days) else 1) + days
+
+    @staticmethod
+    def flag_column(values: pd.Series, keys: np.ndarray) -> pd.Series:
+        """Marca as medições atípicas de uma coluna dentro dos grupos (tanque, dia)"""
+        grouped = values.groupby(keys, sort=False)
+        median = grouped.transform("median")
+        size = grouped.transform("size")
+        deviation = (values - median).abs()
+        mad = deviation.groupby(keys, sort=False).transform("median")
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = 0.6745 * deviation / mad
+            ratio = values / median
+        by_z = (size >= OutlierService.MIN_GROUP) & (mad > 0) & (z > OutlierService.Z_LIMIT) & (
+            deviation > OutlierService.MIN_DEVIATION * median.abs()
+        )
+        by_ratio = (size >= OutlierService.MIN_RATIO_GROUP) & (median > 0) & (
+            (ratio >= OutlierService.RATIO_LIMIT) | (ratio <= 1 / OutlierService.RATIO_LIMIT)
+        )
+        return by_z | by_ratio
+
+    @staticmethod
+    @TelemetryService.timed("atipicas")
+    def flags(tanks: pd.Series, dates: pd.Series, numbers: Dict[str, pd.Series]) -> pd.DataFrame:
+        """Marcas por coluna (``<coluna>_atipica``) das medições informadas, em tempo linear"""
+        if len(tanks) == 0:
+            return pd.DataFrame({name: pd.Series(dtype=bool) for name in OutlierService.flag_names()})
+
+        keys = OutlierService.group_keys(tanks, dates)
+        return pd.DataFrame({
+            name: OutlierService.flag_column(numbers[column], keys)
+            for column, name in zip(OutlierService.COLUMNS, OutlierService.flag_names())
+        }, index=tanks.index)
+
+    @staticmethod
+    def metrics_version(version: str, excluded: bool) -> str:
+        """Versão das chaves dos caches de métricas: o cálculo sem as medições atípicas tem a sua"""
+        return f"{version}:sem_atipicas" if excluded else version
+
+    @staticmethod
+    def exclude(df: Optional[pd.DataFrame], version: str, name: str) -> Optional[pd.DataFrame]:
+        """Planilha sem as linhas marcadas como atípicas (mantida em cache por versão do dataset)"""
+        if df is None or OutlierService.FLAG_COLUMN not in df.columns:
+            return df
+
+        key = (version, name)
+        filtered = OutlierService._filtered.get(key)
+        if filtered is None:
+            filtered = df[~df[OutlierService.FLAG_COLUMN].to_numpy(dtype=bool)].reset_index(drop=True)
+            OutlierService._filtered.put(key, filtered)
+        return filtered
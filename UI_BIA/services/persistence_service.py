@@ -0,0 +1,308 @@
+import threading
+import datetime as dt
+import pandas as pd
+import reflex as rx
+import sqlalchemy
+from sqlalchemy import func, select, delete, insert, and_, bindparam
+from typing import Callable, Dict, Optional, Tuple
+
+from .lazy_import import LazyImport
+from .log_service import LogService
+from .source_registry import SourceRegistry
+from .telemetry_service import TelemetryService
+
+# O módulo é importado com o app (as tabelas precisam estar registradas para o reflex db);
+# os serviços de cálculo só são carregados na primeira gravação ou consulta
+DatasetService = LazyImport(".dataset_service", "DatasetService", __package__)
+MetricsService = LazyImport(".metrics_service", "MetricsService", __package__)
+
+logger = LogService.get_logger(__name__)
+
+
+class BiometriaRegistro(rx.Model, table=True):
+    """Medição de biometria persistida no SQLite configurado em rxconfig.db_url"""
+
+    # (tanque, data) atende às chaves da gravação; (data, tanque), ao filtro por período das métricas
+    __table_args__ = (
+        sqlalchemy.Index("ix_biometria_tanque_data", "tanque", "data"),
+        sqlalchemy.Index("ix_biometria_data_tanque", "data", "tanque"),
+    )
+
+    farm: str = ""
+    tanque: str
+    data: dt.date
+    largura: Optional[float] = None
+    altura: Optional[float] = None
+
+
+class RacaoRegistro(rx.Model, table=True):
+    """Registro de ração persistido no SQLite configurado em rxconfig.db_url"""
+
+    __table_args__ = (
+        sqlalchemy.Index("ix_racao_tanque_data", "tanque", "data"),
+        sqlalchemy.Index("ix_racao_data_tanque", "data", "tanque"),
+    )
+
+    farm: str = ""
+    tanque: str
+    data: dt.date
+    peso: Optional[float] = None
+
+
+class PersistenceService:
+    """Serviço para gravar o histórico das planilhas no banco e recarregá-lo após reinícios"""
+
+    _schema_ready = False
+    _schema_lock = threading.Lock()
+
+    @staticmethod
+    def ensure_schema() -> None:
+        """Cria as tabelas e índices na primeira utilização e migra as tabelas já existentes"""
+        if PersistenceService._schema_ready:
+            return
+        with PersistenceService._schema_lock:
+            if not PersistenceService._schema_ready:
+                rx.Model.create_all()
+                PersistenceService._add_farm_column()
+                PersistenceService._add_missing_indexes()
+                PersistenceService._schema_ready = True
+
+    @staticmethod
+    def _add_farm_column() -> None:
+        """Acrescenta a coluna farm às tabelas criadas antes das múltiplas fazendas
+
+        create_all não altera tabelas existentes. As linhas antigas vieram todas da
+        fonte padrão, então recebem a fazenda dela (a mesma chave das próximas cargas).
+        """
+        legacy_farm = SourceRegistry.DEFAULT_SOURCES[0].farm
+        with rx.Model.get_db_engine().begin() as connection:
+            inspector = sqlalchemy.inspect(connection)
+            for table in (BiometriaRegistro.__table__, RacaoRegistro.__table__):
+                if "farm" in {column["name"] for column in inspector.get_columns(table.name)}:
+                    continue
+                connection.execute(sqlalchemy.text(
+                    f"ALTER TABLE {table.name} ADD COLUMN farm VARCHAR NOT NULL DEFAULT ''"
+                ))
+                migrated = connection.execute(table.update().values(farm=legacy_farm)).rowcount
+                logger.info("Coluna farm adicionada", extra={"campos": {
+                    "tabela": table.name, "linhas": migrated, "fazenda": legacy_farm
+                }})
+
+    @staticmethod
+    def _add_missing_indexes() -> None:
+        """Cria nas tabelas já existentes os índices declarados depois da criação delas (create_all não os cria)"""
+        with rx.Model.get_db_engine().begin() as connection:
+            inspector = sqlalchemy.inspect(connection)
+            for table in (BiometriaRegistro.__table__, RacaoRegistro.__table__):
+                existing = {index["name"] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing:
+                        index.create(connection)
+                        logger.info("Índice criado", extra={"campos": {"tabela": table.name, "indice": index.name}})
+
+    @staticmethod
+    def _typed_rows(df: pd.DataFrame, value_columns: Tuple[str, ...]) -> pd.DataFrame:
+        """Prepara as linhas para gravação: tanque em texto, data convertida e valores numéricos"""
+        rows = pd.DataFrame({
+            "farm": df["farm"].astype(str) if "farm" in df.columns else "",
+            "tanque": df["tanque"].astype(str),
+            "data": DatasetService.sheet_dates(df).dt.date,
+        })
+        for column in value_columns:
+            rows[column] = pd.to_numeric(df[column], errors="coerce")
+
+        # Linhas sem data válida não podem ser indexadas por (farm, tanque, data)
+        rows = rows.dropna(subset=["data"])
+        return rows.astype(object).where(rows.notna(), None)
+
+    @staticmethod
+    def _upsert(table: sqlalchemy.Table, rows: pd.DataFrame) -> int:
+        """Substitui, em uma transação, todas as linhas das chaves (farm, tanque, data) presentes na carga
+
+        A fazenda faz parte da chave: fazendas diferentes podem ter tanques com o mesmo nome.
+        """
+        if rows.empty:
+            return 0
+
+        keys = rows[["farm", "tanque", "data"]].drop_duplicates()
+        key_params = [{"k_farm": f, "k_tanque": t, "k_data": d} for f, t, d in keys.itertuples(index=False)]
+
+        with rx.Model.get_db_engine().begin() as connection:
+            connection.execute(
+                delete(table).where(and_(table.c.farm == bindparam("k_farm"),
+                                         table.c.tanque == bindparam("k_tanque"),
+                                         table.c.data == bindparam("k_data"))),
+                key_params
+            )
+            connection.execute(insert(table), rows.to_dict("records"))
+
+        return len(rows)
+
+    @staticmethod
+    @TelemetryService.timed("persistencia")
+    def save_sheets(biometria_df: Optional[pd.DataFrame], racao_df: Optional[pd.DataFrame]) -> int:
+        """Grava as planilhas carregadas; a planilha é a fonte da verdade para cada (farm, tanque, data)"""
+        PersistenceService.ensure_schema()
+        saved = 0
+
+        if biometria_df is not None and not biometria_df.empty:
+            saved += PersistenceService._upsert(
+                BiometriaRegistro.__table__, PersistenceService._typed_rows(biometria_df, ("largura", "altura"))
+            )
+
+        if racao_df is not None and not racao_df.empty:
+            saved += PersistenceService._upsert(
+                RacaoRegistro.__table__, PersistenceService._typed_rows(racao_df, ("peso",))
+            )
+
+        return saved
+
+    @staticmethod
+    def load_sheets() -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """Recarrega o histórico persistido no mesmo formato das planilhas (datas dd/mm/aaaa)"""
+        PersistenceService.ensure_schema()
+        engine = rx.Model.get_db_engine()
+
+        frames = []
+        for table, columns in ((BiometriaRegistro.__table__, ("largura", "altura")),
+                               (RacaoRegistro.__table__, ("peso",))):
+            query = select(table.c.farm, table.c.data, table.c.tanque, *[table.c[col] for col in columns]).order_by(
+                table.c.data, table.c.tanque
+            )
+            with engine.connect() as connection:
+                df = pd.read_sql(query, connection)
+
+            if df.empty:
+                frames.append(None)
+                continue
+
+            df["data"] = pd.to_datetime(df["data"]).dt.strftime("%d/%m/%Y")
+            frames.append(df)
+
+        return frames[0], frames[1]
+
+
+class SqlMetricsBackend:
+    """Backend de métricas que executa o filtro por período e as agregações por tanque no SQLite"""
+
+    @staticmethod
+    def _range_filter(table: sqlalchemy.Table, start_date: str, end_date: str, farm: str = ""):
+        """Condição de período sobre a coluna indexada data e, opcionalmente, de fazenda"""
+        conditions = []
+
+        start_dt, end_dt = DatasetService.parse_range(start_date, end_date)
+        if start_dt is not None and end_dt is not None:
+            conditions.append(table.c.data.between(start_dt.date(), end_dt.date()))
+
+        if farm and farm != SourceRegistry.ALL_FARMS:
+            conditions.append(table.c.farm == farm)
+
+        return and_(sqlalchemy.true(), *conditions)
+
+    @staticmethod
+    def calculate_biometry_metrics(start_date: str = "", end_date: str = "", farm: str = "") -> Dict:
+        """Equivalente a MetricsService.calculate_biometry_metrics com GROUP BY tanque no banco"""
+        table = BiometriaRegistro.__table__
+        area = table.c.largura * table.c.altura
+        condition = SqlMetricsBackend._range_filter(table, start_date, end_date, farm)
+
+        with rx.Model.get_db_engine().connect() as connection:
+            by_tank = connection.execute(
+                select(table.c.tanque, func.count(), func.avg(area)).where(condition).group_by(table.c.tanque)
+            ).all()
+            total, mean_area = connection.execute(select(func.count(), func.avg(area)).where(condition)).one()
+
+        if not total:
+            return {}
+
+        return {
+            'por_tanque': {
+                str(tanque): {
+                    'peixes_medidos': count,
+                    'area_media': round(avg, 2) if avg is not None else 0.0
+                }
+                for tanque, count, avg in by_tank
+            },
+            'geral': {
+                'total_peixes_medidos': total,
+                'area_media_geral': round(mean_area, 2) if mean_area is not None else 0.0
+            }
+        }
+
+    @staticmethod
+    def calculate_feed_metrics(start_date: str = "", end_date: str = "", farm: str = "") -> Dict:
+        """Equivalente a MetricsService.calculate_feed_metrics com GROUP BY tanque no banco"""
+        table = RacaoRegistro.__table__
+        condition = SqlMetricsBackend._range_filter(table, start_date, end_date, farm)
+
+        with rx.Model.get_db_engine().connect() as connection:
+            by_tank = connection.execute(
+                select(table.c.tanque, func.sum(table.c.peso)).where(condition).group_by(table.c.tanque)
+            ).all()
+            total, feed_total = connection.execute(select(func.count(), func.sum(table.c.peso)).where(condition)).one()
+
+        if not total:
+            return {}
+
+        return {
+            'por_tanque': {
+                str(tanque): {'racao_utilizada': round(weight, 2) if weight is not None else 0.0}
+                for tanque, weight in by_tank
+            },
+            'geral': {
+                'total_racao_utilizada': round(feed_total, 2) if feed_total is not None else 0.0
+            }
+        }
+
+    @staticmethod
+    def calculate_temporal_correlation(start_date: str = "", end_date: str = "", farm: str = "") -> Dict:
+        """Correlação temporal sobre agregados diários (tanque, data) calculados no banco"""
+        bio = BiometriaRegistro.__table__
+        feed = RacaoRegistro.__table__
+        area = bio.c.largura * bio.c.altura
+
+        bio_query = select(bio.c.tanque, bio.c.data.label("data_parsed"), func.avg(area).label("area")).where(
+            SqlMetricsBackend._range_filter(bio, start_date, end_date, farm), area.isnot(None)
+        ).group_by(bio.c.tanque, bio.c.data)
+        feed_query = select(feed.c.tanque, feed.c.data.label("data_parsed"), func.sum(feed.c.peso).label("peso")).where(
+            SqlMetricsBackend._range_filter(feed, start_date, end_date, farm), feed.c.peso.isnot(None)
+        ).group_by(feed.c.tanque, feed.c.data)
+
+        try:
+            with rx.Model.get_db_engine().connect() as connection:
+                bio_daily = pd.read_sql(bio_query, connection)
+                feed_daily = pd.read_sql(feed_query, connection)
+
+            if bio_daily.empty or feed_daily.empty:
+                return {}
+
+            return MetricsService.correlation_from_frames(bio_daily, feed_daily)
+
+        except Exception as e:
+            logger.error("Erro ao calcular correlação temporal no banco", extra={"campos": {"erro": str(e)}})
+            return {}
+
+    @staticmethod
+    def build_dashboard_payload(start_date: str = "", end_date: str = "", farm: str = "",
+                                is_cancelled: Optional[Callable[[], bool]] = None) -> Optional[Dict]:
+        """Calcula as tabelas do dashboard inteiramente a partir do banco (opcionalmente de uma fazenda)
+
+        Como em MetricsService.build_dashboard_payload, is_cancelled é consultado entre as
+        consultas e o cálculo é interrompido (retornando None) quando deixa de ser necessário.
+        """
+        PersistenceService.ensure_schema()
+        cancelled = is_cancelled or (lambda: False)
+
+        biometry_metrics = SqlMetricsBackend.calculate_biometry_metrics(start_date, end_date, farm)
+        if cancelled():
+            return None
+
+        feed_metrics = SqlMetricsBackend.calculate_feed_metrics(start_date, end_date, farm)
+        if cancelled():
+            return None
+
+        correlation_data = SqlMetricsBackend.calculate_temporal_correlation(start_date, end_date, farm)
+        if cancelled():
+            return None
+
+        return MetricsService.assemble_dashboard_payload(biometry_metrics, feed_metrics, correlation_data)
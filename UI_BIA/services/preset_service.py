@@ -0,0 +1,160 @@
+import os
+import threading
+import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple, Optional
+
+from .cache_service import MetricsCache
+from .log_service import LogService
+from .metrics_service import MetricsService
+from .source_registry import SourceRegistry
+
+logger = LogService.get_logger(__name__)
+
+# Cálculo das métricas de um período: (biometria, ração, data inicial, data final, fazenda) -> payload
+PayloadFunction = Callable[[pd.DataFrame, pd.DataFrame, str, str, str], Optional[Dict[str, Any]]]
+
+
+class PresetService:
+    """Serviço para os períodos pré-definidos do dashboard, pré-calculados após cada carga"""
+
+    # Chave e rótulo dos períodos exibidos como botões no dashboard
+    PRESETS: List[Tuple[str, str]] = [
+        ("7d", "Últimos 7 dias"),
+        ("30d", "Últimos 30 dias"),
+        ("mes", "Mês atual"),
+        ("ciclo", "Ciclo atual"),
+        ("tudo", "Todo o período"),
+    ]
+
+    # Intervalo sem biometrias que marca o início de um novo ciclo de cultivo
+    CYCLE_GAP_DAYS = 30
+
+    # Versões do dataset cujos períodos ficam em cache ao mesmo tempo (a carga atual, a anterior
+    # e as variantes sem as medições atípicas); o cache comporta todos os períodos de todas as
+    # fazendas dessas versões e cresce quando as cargas trazem mais fazendas
+    CACHED_VERSIONS = int(os.environ.get("UI_BIA_PRESET_VERSIONS", "4"))
+
+    # Cache exclusivo dos períodos pré-definidos: recálculos de outros períodos e a API não o ocupam
+    _cache = MetricsCache(max_entries=len(PRESETS) * 2 * CACHED_VERSIONS, name="dashboard")
+
+    # Uma única thread para que o aquecimento não dispute CPU com as sessões interativas
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preset-warmup")
+    _warming: Dict[str, Future] = {}
+    _warming_lock = threading.Lock()
+
+    @staticmethod
+    def preset_ranges(biometry_typed: pd.DataFrame, feed_typed: pd.DataFrame) -> Dict[str, List[str]]:
+        """Calcula as datas (ISO) de cada período, ancoradas na data mais recente dos dados"""
+        dates = pd.concat([
+            biometry_typed["data_parsed"] if biometry_typed is not None else pd.Series(dtype="datetime64[ns]"),
+            feed_typed["data_parsed"] if feed_typed is not None else pd.Series(dtype="datetime64[ns]")
+        ]).dropna()
+
+        if dates.empty:
+            return {}
+
+        first = dates.min().normalize()
+        last = dates.max().normalize()
+
+        # Ciclo atual: começa na primeira biometria após o último intervalo longo sem medições
+        cycle_start = first
+        if biometry_typed is not None and not biometry_typed.empty:
+            bio_days = pd.Series(biometry_typed["data_parsed"].dt.normalize().unique()).sort_values()
+            gaps = bio_days.diff() > pd.Timedelta(days=PresetService.CYCLE_GAP_DAYS)
+            cycle_start = bio_days[gaps].iloc[-1] if gaps.any() else bio_days.iloc[0]
+
+        ranges = {
+            "7d": (max(last - pd.Timedelta(days=6), first), last),
+            "30d": (max(last - pd.Timedelta(days=29), first), last),
+            "mes": (max(last.replace(day=1), first), last),
+            "ciclo": (cycle_start, last),
+            "tudo": (first, last),
+        }
+        return {key: [start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")] for key, (start, end) in ranges.items()}
+
+    @staticmethod
+    def cache_key(version: str, start_date: str, end_date: str,
+                  farm: str = SourceRegistry.ALL_FARMS) -> Tuple[str, str, str, str, str]:
+        """Chave do cache de métricas para um período (e fazenda) de uma versão do dataset"""
+        return ("dashboard", version, farm, start_date, end_date)
+
+    @staticmethod
+    def get_cached(version: str, start_date: str, end_date: str,
+                   farm: str = SourceRegistry.ALL_FARMS) -> Optional[Dict]:
+        """Retorna as métricas pré-calculadas de um período, se existirem"""
+        return PresetService._cache.get(PresetService.cache_key(version, start_date, end_date, farm))
+
+    @staticmethod
+    def memory_payload(biometry_df: pd.DataFrame, feed_df: pd.DataFrame, start_date: str, end_date: str,
+                       farm: str = SourceRegistry.ALL_FARMS) -> Optional[Dict[str, Any]]:
+        """Cálculo padrão em memória (o app informa o do backend configurado, ver compute_dashboard_payload)"""
+        return MetricsService.build_dashboard_payload(
+            SourceRegistry.filter_farm(biometry_df, farm), SourceRegistry.filter_farm(feed_df, farm),
+            start_date, end_date
+        )
+
+    @staticmethod
+    def compute(version: str, biometry_df: pd.DataFrame, feed_df: pd.DataFrame,
+                start_date: str, end_date: str, farm: str = SourceRegistry.ALL_FARMS,
+                compute_payload: Optional[PayloadFunction] = None) -> Dict:
+        """Calcula as métricas de um período e guarda o resultado no cache
+
+        ``compute_payload`` é o cálculo do backend em uso, para que o período pré-definido
+        tenha os mesmos números do recálculo manual.
+        """
+        payload = (compute_payload or PresetService.memory_payload)(biometry_df, feed_df, start_date, end_date, farm)
+        PresetService.store(version, start_date, end_date, farm, payload)
+        return payload
+
+    @staticmethod
+    def store(version: str, start_date: str, end_date: str, farm: str, payload: Optional[Dict]) -> None:
+        """Guarda no cache as métricas de um período calculadas fora de compute (ex.: refinamento)"""
+        if payload is not None:
+            PresetService._cache.put(PresetService.cache_key(version, start_date, end_date, farm), payload)
+
+    @staticmethod
+    def reserve(ranges: int, farms: int) -> None:
+        """Garante espaço no cache para todos os períodos de todas as fazendas das versões mantidas"""
+        needed = max(ranges, 1) * max(farms, 1) * PresetService.CACHED_VERSIONS
+        if PresetService._cache.max_entries < needed:
+            PresetService._cache.max_entries = needed
+
+    @staticmethod
+    def warm(version: str, biometry_df: pd.DataFrame, feed_df: pd.DataFrame,
+             ranges: Dict[str, List[str]], farms: Optional[List[str]] = None,
+             compute_payload: Optional[PayloadFunction] = None) -> None:
+        """Pré-calcula em segundo plano todos os períodos (de cada fazenda) ainda ausentes do cache
+
+        Nada é agendado se a versão já está sendo aquecida ou se todos os períodos dela
+        já estão no cache (restaurações, sincronizações e trocas de versão repetem a carga).
+        """
+        farms = farms or [SourceRegistry.ALL_FARMS]
+        PresetService.reserve(len(ranges), len(farms))
+        keys = [
+            (farm, start_date, end_date) for farm in farms for start_date, end_date in ranges.values()
+        ]
+
+        def run():
+            try:
+                for farm, start_date, end_date in keys:
+                    if PresetService.cache_key(version, start_date, end_date, farm) in PresetService._cache:
+                        continue
+                    try:
+                        PresetService.compute(version, biometry_df, feed_df, start_date, end_date, farm,
+                                              compute_payload)
+                    except Exception as e:
+                        logger.error("Erro ao pré-calcular período", extra={"campos": {
+                            "inicio": start_date, "fim": end_date, "fazenda": farm, "erro": str(e)
+                        }})
+            finally:
+                with PresetService._warming_lock:
+                    PresetService._warming.pop(version, None)
+
+        with PresetService._warming_lock:
+            if version in PresetService._warming:
+                return
+            if all(PresetService.cache_key(version, start_date, end_date, farm) in PresetService._cache
+                   for farm, start_date, end_date in keys):
+                return
+            PresetService._warming[version] = PresetService._executor.submit(run)
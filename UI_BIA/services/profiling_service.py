@@ -0,0 +1,176 @@
+import cProfile
+import functools
+import hmac
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from .log_service import LogService
+
+logger = LogService.get_logger(__name__)
+
+
+class ProfilingService:
+    """Perfis (cProfile + tracemalloc) dos event handlers do State, ligados por configuração
+
+    UI_BIA_PROFILE define o modo, lido uma vez na importação:
+
+    * ``off`` (padrão): ``profiled`` devolve o handler original, sem nenhum custo
+    * ``on``: todas as chamadas dos handlers marcados são perfiladas
+    * ``sessao``: só as sessões que ligarem o perfil no dashboard (State.is_profiling);
+      a chave só aparece para quem abrir a página com ``?perfil=<UI_BIA_PROFILE_TOKEN>``
+      (sem token configurado, para ninguém)
+
+    Cada chamada perfilada grava em UI_BIA_PROFILE_DIR um ``.prof`` (pstats, abre no
+    snakeviz) e um ``.txt`` com as funções mais caras e as maiores alocações; só os
+    UI_BIA_PROFILE_KEEP perfis mais recentes são mantidos. UI_BIA_PROFILE_SAMPLE=N
+    perfila uma a cada N chamadas de cada handler.
+    """
+
+    MODE = os.environ.get("UI_BIA_PROFILE", "off").lower()
+    DIRECTORY = os.environ.get("UI_BIA_PROFILE_DIR", ".profiles")
+    KEEP = int(os.environ.get("UI_BIA_PROFILE_KEEP", "50"))
+    SAMPLE = max(int(os.environ.get("UI_BIA_PROFILE_SAMPLE", "1")), 1)
+
+    # Chave de administrador exigida no modo sessao, informada no parâmetro da URL
+    TOKEN = os.environ.get("UI_BIA_PROFILE_TOKEN", "")
+    QUERY_PARAM = "perfil"
+
+    # Linhas de cada seção do resumo em texto
+    TOP_FUNCTIONS = 25
+    TOP_ALLOCATIONS = 15
+
+    # Um perfil por vez no processo (o cProfile não admite perfis simultâneos)
+    _active = threading.Lock()
+    _rotation = threading.Lock()
+
+    # Contadores da amostragem das chamadas perfiladas fora dos handlers (por nome)
+    _call_counters: Dict[str, Iterator[int]] = {}
+
+    @staticmethod
+    def enabled() -> bool:
+        """Há algum modo de perfil ativo no processo"""
+        return ProfilingService.MODE in ("on", "sessao")
+
+    @staticmethod
+    def session_toggle() -> bool:
+        """O dashboard oferece a chave de perfil por sessão"""
+        return ProfilingService.MODE == "sessao"
+
+    @staticmethod
+    def authorized(key: str) -> bool:
+        """A chave informada na URL libera o perfil por sessão (comparação em tempo constante)"""
+        return ProfilingService.session_toggle() and bool(ProfilingService.TOKEN) and bool(key) and \
+            hmac.compare_digest(key.encode(), ProfilingService.TOKEN.encode())
+
+    @staticmethod
+    def wanted(state: Any) -> bool:
+        """As chamadas desta sessão devem ser perfiladas (modo on, ou sessao com a chave ligada e liberada)"""
+        if not ProfilingService.enabled():
+            return False
+        if ProfilingService.session_toggle():
+            return getattr(state, "is_profiling", False) and getattr(state, "_profiling_authorized", False)
+        return True
+
+    @staticmethod
+    def _sampled(name: str, calls: Iterator[int], call: Callable):
+        """Executa a chamada, sob perfil se ela cair na amostragem e nenhum outro perfil estiver em curso"""
+        if next(calls) % ProfilingService.SAMPLE or not ProfilingService._active.acquire(blocking=False):
+            return call()
+        try:
+            return ProfilingService._run(name, call)
+        finally:
+            ProfilingService._active.release()
+
+    @staticmethod
+    def profiled(func: Callable) -> Callable:
+        """Decorador dos event handlers do State; identidade quando o perfil está desligado"""
+        if not ProfilingService.enabled():
+            return func
+
+        calls = itertools.count()
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not ProfilingService.wanted(self):
+                return func(self, *args, **kwargs)
+            return ProfilingService._sampled(func.__name__, calls, lambda: func(self, *args, **kwargs))
+
+        return wrapper
+
+    @staticmethod
+    def call(name: str, wanted: bool, func: Callable, *args, **kwargs):
+        """Executa ``func`` sob perfil (gravado como ``name``) com as regras de ``profiled``
+
+        Para o cálculo pesado dos eventos em segundo plano, que roda em uma thread
+        fora do handler: ``wanted`` é ProfilingService.wanted(state), lido com o State
+        travado, e o perfil é feito na própria thread do cálculo.
+        """
+        if not wanted:
+            return func(*args, **kwargs)
+        calls = ProfilingService._call_counters.setdefault(name, itertools.count())
+        return ProfilingService._sampled(name, calls, lambda: func(*args, **kwargs))
+
+    @staticmethod
+    def _run(name: str, call: Callable):
+        """Executa a chamada sob cProfile e tracemalloc e grava os artefatos, mesmo se ela falhar"""
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.take_snapshot()
+
+        profiler = cProfile.Profile()
+        began = time.perf_counter()
+        profiler.enable()
+        try:
+            return call()
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - began
+            _, peak = tracemalloc.get_traced_memory()
+            allocations = tracemalloc.take_snapshot().compare_to(baseline, "lineno")
+            if not was_tracing:
+                tracemalloc.stop()
+            try:
+                ProfilingService._write(name, profiler, elapsed, peak, allocations)
+            except OSError as e:
+                logger.error("Erro ao gravar o perfil", extra={"campos": {"handler": name, "erro": str(e)}})
+
+    @staticmethod
+    def _write(name: str, profiler: cProfile.Profile, elapsed: float, peak: int, allocations: List) -> None:
+        """Grava o .prof e o resumo em texto e descarta os perfis mais antigos além do limite"""
+        directory = Path(ProfilingService.DIRECTORY)
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000:06d}-{name}"
+
+        profiler.dump_stats(f"{stem}.prof")
+
+        summary = io.StringIO()
+        summary.write(f"{name}: {elapsed * 1000:.1f} ms, pico de memória {peak / 1_048_576:.1f} MB\n\n")
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(ProfilingService.TOP_FUNCTIONS)
+        summary.write("Maiores alocações durante a chamada:\n")
+        for stat in allocations[:ProfilingService.TOP_ALLOCATIONS]:
+            summary.write(f"  {stat}\n")
+        Path(f"{stem}.txt").write_text(summary.getvalue(), encoding="utf-8")
+
+        logger.info("Perfil gravado", extra={"campos": {
+            "handler": name, "arquivo": f"{stem}.prof", "ms": round(elapsed * 1000, 1),
+            "pico_mb": round(peak / 1_048_576, 1)
+        }})
+        ProfilingService._rotate(directory)
+
+    @staticmethod
+    def _rotate(directory: Path) -> None:
+        """Mantém apenas os KEEP perfis mais recentes (cada perfil é um .prof e um .txt)"""
+        with ProfilingService._rotation:
+            profiles = sorted(directory.glob("*.prof"))
+            for old in profiles[:max(len(profiles) - ProfilingService.KEEP, 0)]:
+                old.unlink(missing_ok=True)
+                old.with_suffix(".txt").unlink(missing_ok=True)
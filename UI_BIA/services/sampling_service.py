@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from .cache_service import MetricsCache
+from .dataset_service import DatasetService
+from .log_service import LogService
+from .metrics_service import MetricsService
+from .source_registry import SourceRegistry
+
+logger = LogService.get_logger(__name__)
+
+
+class SamplingService:
+    """Métricas aproximadas sobre uma amostra estratificada por tanque e dia, com margens de erro
+
+    A amostra é sorteada uma vez por versão do dataset (em segundo plano, após a carga) e
+    resumida em uma tabela de estratos (tanque, dia) com o tamanho real do estrato, o tamanho
+    da amostra, a média e a variância da área. As métricas aproximadas de qualquer período
+    saem dessa tabela em milissegundos; o resultado exato é calculado depois pelo caminho normal.
+
+    As contagens de peixes medidos (coluna "medidos") vêm das mesmas planilhas usadas no
+    cálculo exato, inclusive as medições sem área, e não apenas das linhas do conjunto tipado.
+    """
+
+    # Tamanho aproximado da amostra (cada estrato mantém ao menos MIN_PER_STRATUM medições)
+    TARGET_ROWS = 200_000
+    MIN_PER_STRATUM = 2
+
+    # Quantil normal do intervalo de 95% exibido como margem de erro
+    Z_95 = 1.96
+
+    # Tabelas de estratos por versão do dataset, compartilhadas por todas as sessões
+    _strata = MetricsCache(max_entries=4, name="amostra")
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sampling")
+
+    @staticmethod
+    def build_strata(biometry_typed: pd.DataFrame, target_rows: int = TARGET_ROWS, seed: int = 0,
+                     biometry_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Sorteia a amostra estratificada e devolve a tabela de estratos (tanque, dia, N, n, média, variância)
+
+        A coluna "primeira" guarda a posição da primeira medição do estrato, para que os
+        tanques saiam na mesma ordem do cálculo exato (ordem de aparição nos dados).
+
+        Cada medição recebe um número aleatório u; o estrato mantém as que têm u < f e, no
+        mínimo, as MIN_PER_STRATUM de menor u, o que é uma amostra aleatória simples do estrato.
+
+        Com ``biometry_df`` (as planilhas do cálculo exato), "medidos" e "primeira" vêm dele
+        e os estratos sem nenhuma área válida entram com n = 0 (só contam como medidos).
+        """
+        if biometry_typed is None or biometry_typed.empty:
+            return pd.DataFrame(columns=["tanque", "data_parsed", "primeira", "N", "n", "media", "variancia", "medidos"])
+
+        days = biometry_typed["data_parsed"].dt.normalize()
+        first_day = days.min()
+        day_index = ((days - first_day) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+        codes, names = pd.factorize(biometry_typed["tanque"], sort=False)
+
+        keys = codes.astype(np.int64) * (int(day_index.max()) + 1) + day_index
+        strata, first_row, stratum_of, sizes = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+
+        rng = np.random.default_rng(seed)
+        u = rng.random(len(keys))
+        fraction = min(1.0, target_rows / len(keys))
+
+        # Ordena por estrato e por u: a posição no estrato dá as medições de menor u
+        order = np.lexsort((u, stratum_of))
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        position = np.arange(len(order)) - starts[stratum_of[order]]
+        sampled = order[(u[order] < fraction) | (position < SamplingService.MIN_PER_STRATUM)]
+
+        area = biometry_typed["area"].to_numpy(dtype=float)[sampled]
+        sample_stratum = stratum_of[sampled]
+        n = np.bincount(sample_stratum, minlength=len(strata))
+        total = np.bincount(sample_stratum, weights=area, minlength=len(strata))
+        squares = np.bincount(sample_stratum, weights=area * area, minlength=len(strata))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / n
+            variance = np.where(n > 1, (squares - n * mean * mean) / (n - 1), 0.0)
+
+        # Uma medição representante por estrato fornece tanque, dia e fazenda
+        representative = order[starts]
+        table = pd.DataFrame({
+            "tanque": biometry_typed["tanque"].to_numpy()[representative],
+            "data_parsed": days.to_numpy()[representative],
+            "primeira": first_row,
+            "N": sizes.astype(float),
+            "n": n.astype(float),
+            "media": mean,
+            "variancia": np.maximum(variance, 0.0),
+        })
+        if "farm" in biometry_typed.columns:
+            table["farm"] = biometry_typed["farm"].to_numpy()[representative]
+
+        if biometry_df is None:
+            return table.assign(medidos=table["N"])
+
+        # Contagens e ordem do cálculo exato; os tanques com área já são texto para a junção
+        counts = SamplingService._row_counts(biometry_df)
+        table = table.assign(tanque=table["tanque"].astype(str)).drop(columns=["primeira", "farm"], errors="ignore")
+        table = counts.merge(table, on=["tanque", "data_parsed"], how="left", sort=False)
+        return table.fillna({"N": 0.0, "n": 0.0, "variancia": 0.0})
+
+    @staticmethod
+    def _row_counts(biometry_df: pd.DataFrame) -> pd.DataFrame:
+        """Linhas por (tanque, dia) das planilhas, com a posição da primeira (dias inválidos ficam em NaT)"""
+        keys = pd.DataFrame({
+            "tanque": biometry_df["tanque"].astype(str).to_numpy(),
+            "data_parsed": DatasetService.sheet_dates(biometry_df).dt.normalize().to_numpy(),
+            "primeira": np.arange(len(biometry_df)),
+        })
+        if "farm" in biometry_df.columns:
+            keys["farm"] = biometry_df["farm"].to_numpy()
+
+        grouped = keys.groupby(["tanque", "data_parsed"], sort=False, dropna=False)
+        counts = grouped.agg(primeira=("primeira", "min"), medidos=("primeira", "size"))
+        if "farm" in keys.columns:
+            counts["farm"] = grouped["farm"].first()
+        return counts.reset_index().assign(medidos=lambda df: df["medidos"].astype(float))
+
+    @staticmethod
+    def warm(version: str, biometry_typed: Optional[pd.DataFrame], biometry_df: Optional[pd.DataFrame] = None) -> None:
+        """Prepara em segundo plano a tabela de estratos de uma versão do dataset
+
+        ``biometry_df`` são as planilhas usadas no cálculo exato (fonte das contagens).
+        """
+        if version in SamplingService._strata or biometry_typed is None:
+            return
+
+        def run():
+            try:
+                SamplingService._strata.put(
+                    version, SamplingService.build_strata(biometry_typed, biometry_df=biometry_df)
+                )
+            except Exception as e:
+                logger.error("Erro ao preparar a amostra estratificada",
+                             extra={"campos": {"versao": version, "erro": str(e)}})
+
+        SamplingService._executor.submit(run)
+
+    @staticmethod
+    def get_strata(version: str) -> Optional[pd.DataFrame]:
+        """Tabela de estratos da versão, ou None se ainda não estiver pronta"""
+        return SamplingService._strata.get(version)
+
+    @staticmethod
+    def _stratified_means(strata: pd.DataFrame, by: Optional[str] = None) -> pd.DataFrame:
+        """Média estratificada, população e margem de erro (95%) por grupo de estratos (ou no total)"""
+        parts = pd.DataFrame({
+            "N": strata["N"],
+            "soma": strata["N"] * strata["media"],
+            "var": strata["N"] ** 2 * (1 - strata["n"] / strata["N"]) * strata["variancia"] / strata["n"],
+        })
+        totals = parts.groupby(strata[by], sort=False).sum() if by else parts.sum().to_frame().T
+        return pd.DataFrame({
+            "N": totals["N"],
+            "media": totals["soma"] / totals["N"],
+            "erro": SamplingService.Z_95 * np.sqrt(totals["var"]) / totals["N"],
+        })
+
+    @staticmethod
+    def _correlation(strata: pd.DataFrame, feed: pd.DataFrame) -> Dict[str, Dict]:
+        """Mesmas regras de MetricsService.correlation_from_frames, vetorizadas sobre a tabela de estratos"""
+        ordered = strata.sort_values("data_parsed", kind="stable").groupby("tanque", sort=False)
+        bio = pd.DataFrame({
+            "area_inicial": ordered["media"].first(),
+            "area_final": ordered["media"].last(),
+            "dias_periodo": ordered["data_parsed"].nunique(),
+        })
+        feed_by_tank = feed.groupby("tanque", sort=False).agg(
+            racao_total=("peso", "sum"), dias_racao=("data_parsed", "nunique")
+        )
+        # Ordem de aparição dos tanques (a tabela já chega ordenada pela primeira medição)
+        bio = bio.reindex(pd.unique(strata["tanque"]))
+        tanks = bio.join(feed_by_tank, how="inner")
+        tanks = tanks[(tanks["dias_periodo"] >= 2) & (tanks["dias_racao"] >= 2)]
+
+        correlation_data = {}
+        for tanque, row in tanks.iterrows():
+            variacao = row["area_final"] - row["area_inicial"]
+            correlation_data[str(tanque)] = {
+                "area_inicial": round(row["area_inicial"], 2),
+                "area_final": round(row["area_final"], 2),
+                "variacao_area": round(variacao, 2),
+                "percentual_crescimento": round(variacao / row["area_inicial"] * 100, 2) if row["area_inicial"] > 0 else 0,
+                "racao_total": round(row["racao_total"], 2),
+                "racao_media_diaria": round(row["racao_total"] / row["dias_racao"], 2),
+                "eficiencia_crescimento": round(variacao / row["racao_total"], 4) if row["racao_total"] > 0 else 0,
+                "dias_periodo": int(row["dias_periodo"]),
+            }
+
+        if correlation_data:
+            total_variacao_area = sum(data["variacao_area"] for data in correlation_data.values())
+            total_racao = sum(data["racao_total"] for data in correlation_data.values())
+            correlation_data["geral"] = {
+                "total_variacao_area": round(total_variacao_area, 2),
+                "total_racao": round(total_racao, 2),
+                "media_crescimento_percentual": round(
+                    sum(data["percentual_crescimento"] for data in correlation_data.values()) / len(correlation_data), 2
+                ),
+                "eficiencia_geral": round(total_variacao_area / total_racao, 4) if total_racao > 0 else 0,
+                "tanques_analisados": len(correlation_data),
+            }
+
+        return correlation_data
+
+    @staticmethod
+    def approximate_payload(strata: pd.DataFrame, feed_typed: Optional[pd.DataFrame], start_date: str = "",
+                            end_date: str = "", farm: str = SourceRegistry.ALL_FARMS) -> Dict[str, Any]:
+        """Métricas do dashboard estimadas pela amostra, no mesmo formato de MetricsService
+
+        Inclui as margens de erro como colunas extras: area_media_erro (por tanque),
+        area_media_geral_erro (geral) e area_inicial_erro / area_final_erro (correlação).
+        A ração não é amostrada e sai exata do conjunto tipado.
+        """
+        strata = DatasetService.filter_range(SourceRegistry.filter_farm(strata, farm), start_date, end_date)
+        feed = DatasetService.filter_range(SourceRegistry.filter_farm(feed_typed, farm), start_date, end_date)
+        if strata is None or strata.empty:
+            return MetricsService.assemble_dashboard_payload({}, {}, {})
+
+        strata = strata.assign(tanque=strata["tanque"].astype(str)).sort_values("primeira", kind="stable")
+        measured = strata.groupby("tanque", sort=False)["medidos"].sum()
+
+        # Médias e margens só dos estratos com alguma área amostrada
+        strata = strata[strata["n"] > 0]
+        by_tank = SamplingService._stratified_means(strata, "tanque")
+        overall = SamplingService._stratified_means(strata).iloc[0]
+
+        def area(mean: float) -> float:
+            # Mesma convenção do cálculo exato: 0.0 quando não há nenhuma área
+            return round(float(mean), 2) if np.isfinite(mean) else 0.0
+
+        biometry_metrics = {
+            "por_tanque": {
+                tanque: {"peixes_medidos": int(count), "area_media": area(by_tank["media"].get(tanque, np.nan))}
+                for tanque, count in measured.items()
+            },
+            "geral": {"total_peixes_medidos": int(measured.sum()), "area_media_geral": area(overall["media"])},
+        }
+
+        feed_metrics: Dict[str, Any] = {}
+        correlation: Dict[str, Dict] = {}
+        if feed is not None and not feed.empty:
+            feed = feed.assign(tanque=feed["tanque"].astype(str))
+            feed_by_tank = feed.groupby("tanque", sort=False)["peso"].sum()
+            feed_metrics = {
+                "por_tanque": {tanque: {"racao_utilizada": round(total, 2)} for tanque, total in feed_by_tank.items()},
+                "geral": {"total_racao_utilizada": round(feed["peso"].sum(), 2)},
+            }
+            correlation = SamplingService._correlation(strata, feed) if not strata.empty else {}
+
+        payload = MetricsService.assemble_dashboard_payload(biometry_metrics, feed_metrics, correlation)
+
+        # Margens de erro alinhadas às tabelas do payload
+        errors = by_tank["erro"]
+        payload["tank_metrics"]["area_media_erro"] = [
+            round(float(errors.get(tanque, 0.0)), 2) for tanque in payload["tank_ids"]
+        ]
+        if payload["general_metrics"]:
+            payload["general_metrics"]["area_media_geral_erro"] = area(overall["erro"])
+
+        if payload["correlation_tank_ids"]:
+            daily_error = strata.assign(
+                erro=SamplingService.Z_95 * np.sqrt((1 - strata["n"] / strata["N"]) * strata["variancia"] / strata["n"])
+            ).sort_values("data_parsed", kind="stable").groupby("tanque", sort=False)["erro"]
+            first_error, last_error = daily_error.first(), daily_error.last()
+            payload["correlation_tank_data"]["area_inicial_erro"] = [
+                round(float(first_error.get(tanque, 0.0)), 2) for tanque in payload["correlation_tank_ids"]
+            ]
+            payload["correlation_tank_data"]["area_final_erro"] = [
+                round(float(last_error.get(tanque, 0.0)), 2) for tanque in payload["correlation_tank_ids"]
+            ]
+
+        return payload
@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .dataset_service import DatasetService
+from .log_service import LogService
+from .telemetry_service import TelemetryService
+
+logger = LogService.get_logger(__name__)
+
+
+@dataclass
+class SharedDataset:
+    """Versão publicada do dataset: DataFrames somente leitura sobre os arquivos mapeados em memória"""
+
+    version: str
+    frames: Dict[str, Optional[pd.DataFrame]] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class SharedDatasetService:
+    """Dataset compartilhado entre os workers do backend por arquivos .npy mapeados em memória
+
+    Um worker publica as colunas tipadas (datas, códigos de tanque e medições) em
+    ``<dir>/<versão>/``; os demais fazem o attach somente leitura com np.load(mmap_mode="r"),
+    de modo que todos leem as mesmas páginas do cache do sistema operacional. A troca
+    de versão é atômica: o diretório da versão é criado por rename e o manifesto
+    current.json é substituído com os.replace.
+    """
+
+    # Diretório compartilhado; sem ele cada worker mantém sua própria cópia das planilhas
+    DIR_ENV = "UI_BIA_SHARED_DATASET_DIR"
+
+    MANIFEST = "current.json"
+    SCHEMA = "schema.json"
+
+    # Versões mantidas em disco (a atual e a anterior, ainda usada por sessões em andamento)
+    KEEP_VERSIONS = 2
+
+    # Colunas de medição convertidas para float na publicação (os demais textos viram categorias)
+    NUMERIC_COLUMNS = ("largura", "altura", "peso", "area")
+
+    # Attach por processo: todas as sessões do worker compartilham os mesmos DataFrames
+    _attached: "OrderedDict[str, SharedDataset]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def directory() -> Optional[Path]:
+        """Diretório configurado em UI_BIA_SHARED_DATASET_DIR, ou None quando o modo está desligado"""
+        path = os.environ.get(SharedDatasetService.DIR_ENV, "")
+        return Path(path) if path else None
+
+    @staticmethod
+    def enabled() -> bool:
+        return SharedDatasetService.directory() is not None
+
+    @staticmethod
+    def columnar(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Converte uma planilha para colunas de tamanho fixo: medições em float e textos em categorias"""
+        if df is None:
+            return None
+
+        columns = {}
+        for name in df.columns:
+            column = df[name]
+            if isinstance(column.dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(column) \
+                    or pd.api.types.is_datetime64_dtype(column):
+                columns[name] = column
+            elif name in SharedDatasetService.NUMERIC_COLUMNS:
+                columns[name] = pd.to_numeric(column, errors="coerce").astype("float64")
+            else:
+                columns[name] = column.astype("category")
+
+        return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+    @staticmethod
+    def _write_frame(target: Path, name: str, df: pd.DataFrame) -> List[Dict]:
+        """Grava cada coluna em um .npy e retorna a descrição das colunas para o schema"""
+        schema = []
+        for position, column_name in enumerate(df.columns):
+            column = df[column_name]
+            path = f"{name}.{position}.npy"
+            entry = {"name": str(column_name), "file": path}
+
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                entry["kind"] = "category"
+                entry["categories"] = [str(category) for category in column.cat.categories]
+                values = column.cat.codes.to_numpy()
+            elif pd.api.types.is_datetime64_dtype(column):
+                entry["kind"] = "datetime"
+                values = column.to_numpy(dtype="datetime64[ns]")
+            else:
+                entry["kind"] = "numeric"
+                values = column.to_numpy()
+
+            np.save(target / path, np.ascontiguousarray(values), allow_pickle=False)
+            schema.append(entry)
+
+        return schema
+
+    @staticmethod
+    def publish(biometria_df: Optional[pd.DataFrame], racao_df: Optional[pd.DataFrame],
+                extra_frames: Optional[Dict[str, Optional[pd.DataFrame]]] = None,
+                metadata: Optional[Dict[str, Any]] = None) -> Optional[SharedDataset]:
+        """Publica uma nova versão (planilhas e conjunto tipado) e a torna a versão atual
+
+        ``extra_frames`` (ex.: linhas em quarentena) são publicados junto, e ``metadata``
+        (serializável em JSON) fica no schema da versão para os demais workers.
+        """
+        root = SharedDatasetService.directory()
+        if root is None:
+            return None
+        root.mkdir(parents=True, exist_ok=True)
+
+        biometria = SharedDatasetService.columnar(biometria_df)
+        racao = SharedDatasetService.columnar(racao_df)
+        version = DatasetService.dataset_version(biometria, racao)
+
+        frames = {
+            "biometria": biometria,
+            "racao": racao,
+            "biometria_typed": SharedDatasetService.columnar(DatasetService.prepare_biometry(biometria))
+            if biometria is not None else None,
+            "racao_typed": SharedDatasetService.columnar(DatasetService.prepare_feed(racao))
+            if racao is not None else None,
+        }
+        for name, df in (extra_frames or {}).items():
+            frames[name] = SharedDatasetService.columnar(df)
+
+        target = root / version
+        if not target.exists():
+            # Grava em um diretório temporário e publica com rename: quem lê nunca vê uma versão incompleta
+            staging = root / f".staging-{version}-{os.getpid()}"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+
+            schema = {"version": version, "frames": {}, "metadata": metadata or {}}
+            for name, df in frames.items():
+                if df is not None:
+                    schema["frames"][name] = {
+                        "rows": len(df), "columns": SharedDatasetService._write_frame(staging, name, df)
+                    }
+            (staging / SharedDatasetService.SCHEMA).write_text(json.dumps(schema), encoding="utf-8")
+
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Outro worker publicou a mesma versão ao mesmo tempo
+                shutil.rmtree(staging, ignore_errors=True)
+
+        SharedDatasetService._swap_manifest(root, version)
+        SharedDatasetService._prune(root, version)
+        return SharedDatasetService.attach(version)
+
+    @staticmethod
+    def _swap_manifest(root: Path, version: str) -> None:
+        """Aponta current.json para a versão publicada com uma substituição atômica"""
+        temporary = root / f".{SharedDatasetService.MANIFEST}.{os.getpid()}"
+        temporary.write_text(json.dumps({"version": version}), encoding="utf-8")
+        os.replace(temporary, root / SharedDatasetService.MANIFEST)
+
+    @staticmethod
+    def _prune(root: Path, current: str) -> None:
+        """Remove as versões antigas; workers que ainda as mapeiam continuam lendo até soltá-las"""
+        versions = sorted(
+            (path for path in root.iterdir()
+             if path.is_dir() and not path.name.startswith(".") and path.name != current),
+            key=lambda path: path.stat().st_mtime, reverse=True
+        )
+        for path in versions[SharedDatasetService.KEEP_VERSIONS - 1:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def current_version() -> str:
+        """Versão apontada pelo manifesto (string vazia se nada foi publicado)"""
+        root = SharedDatasetService.directory()
+        if root is None:
+            return ""
+        try:
+            manifest = json.loads((root / SharedDatasetService.MANIFEST).read_text(encoding="utf-8"))
+            return str(manifest.get("version", ""))
+        except (OSError, ValueError):
+            return ""
+
+    @staticmethod
+    def attach(version: str = "") -> Optional[SharedDataset]:
+        """Mapeia uma versão (por padrão a atual) sem copiar os dados; None se ela não existir mais"""
+        version = version or SharedDatasetService.current_version()
+        root = SharedDatasetService.directory()
+        if not version or root is None:
+            return None
+
+        with SharedDatasetService._lock:
+            attached = SharedDatasetService._attached.get(version)
+            if attached is not None:
+                SharedDatasetService._attached.move_to_end(version)
+        TelemetryService.cache("dataset_compartilhado", attached is not None)
+        if attached is not None:
+            return attached
+
+        try:
+            schema = json.loads((root / version / SharedDatasetService.SCHEMA).read_text(encoding="utf-8"))
+            frames = {
+                name: SharedDatasetService._read_frame(root / version, spec)
+                for name, spec in schema["frames"].items()
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Erro ao mapear o dataset compartilhado",
+                         extra={"campos": {"versao": version, "erro": str(e)}})
+            return None
+
+        shared = SharedDataset(version=version, frames=frames, metadata=schema.get("metadata", {}))
+        with SharedDatasetService._lock:
+            SharedDatasetService._attached[version] = shared
+            SharedDatasetService._attached.move_to_end(version)
+            while len(SharedDatasetService._attached) > SharedDatasetService.KEEP_VERSIONS:
+                SharedDatasetService._attached.popitem(last=False)
+        return shared
+
+    @staticmethod
+    def _read_frame(directory: Path, spec: Dict) -> pd.DataFrame:
+        """Monta o DataFrame sobre os arrays mapeados, sem cópia (categorias a partir dos códigos)"""
+        columns = {}
+        for entry in spec["columns"]:
+            values = np.load(directory / entry["file"], mmap_mode="r", allow_pickle=False)
+            if entry["kind"] == "category":
+                values = pd.Categorical.from_codes(values, categories=entry["categories"], validate=False)
+            columns[entry["name"]] = pd.Series(values, copy=False)
+
+        return pd.DataFrame(columns, index=pd.RangeIndex(spec["rows"]), copy=False)
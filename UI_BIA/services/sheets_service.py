@@ -1,45 +1,499 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from io import StringIO
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import quote
+
 import pandas as pd
 import requests
-from io import StringIO
-from typing import Optional, Tuple
+
+from .cache_service import MetricsCache
+from .local_source_service import LocalSourceService
+from .log_service import LogService
+from .metrics_service import MetricsService
+from .source_registry import FarmSource, SourceRegistry
+from .telemetry_service import TelemetryService
+
+logger = LogService.get_logger(__name__)
 
 
 class SheetsService:
-    """Serviço para carregar dados do Google Sheets"""
+    """Serviço para carregar dados do Google Sheets
+
+    Cada requisição tem até MAX_ATTEMPTS tentativas com espera exponencial (com jitter)
+    entre elas, todas dentro de um prazo total (DEADLINE) que vale para a carga inteira de
+    uma planilha (na carga por período: cabeçalho, consulta e exportação completa). Quando
+    uma tentativa passa do percentil HEDGE_PERCENTILE das latências recentes, uma segunda
+    requisição igual é disparada e vale a primeira resposta (hedge).
+
+    Cada planilha carregada vira uma cópia em memória (stale-while-revalidate): até
+    FRESH_SECONDS ela é servida sem ir ao Sheets; até STALE_SECONDS é servida na hora e
+    atualizada em segundo plano; depois disso a busca volta a ser síncrona, e a cópia só
+    é usada se a origem falhar, para que uma falha temporária não deixe o dashboard vazio.
+    Cargas pedidas pelo usuário (``revalidate``) sempre atualizam a cópia, mesmo recente.
+    """
+
+    # Colunas usadas pelas métricas, pedidas no modo de consulta por período
+    BIOMETRIA_COLUMNS = ["data", "tanque", "largura", "altura"]
+    RACAO_COLUMNS = ["data", "tanque", "peso"]
+
+    # Tentativas: prazo de cada uma, quantidade, espera inicial e máxima entre elas e prazo total
+    ATTEMPT_TIMEOUT = float(os.environ.get("UI_BIA_SHEETS_TIMEOUT", "10"))
+    MAX_ATTEMPTS = max(int(os.environ.get("UI_BIA_SHEETS_ATTEMPTS", "3")), 1)
+    BACKOFF_SECONDS = float(os.environ.get("UI_BIA_SHEETS_BACKOFF", "0.5"))
+    BACKOFF_MAX_SECONDS = 4.0
+    DEADLINE = float(os.environ.get("UI_BIA_SHEETS_DEADLINE", "20"))
+
+    # Respostas HTTP que indicam falha temporária (as demais não são repetidas)
+    RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+    # Hedge: percentil das últimas latências (0 desliga), amostras mínimas e espera enquanto não há amostras
+    HEDGE_PERCENTILE = float(os.environ.get("UI_BIA_SHEETS_HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_DEFAULT_DELAY = 2.0
+    HEDGE_MIN_DELAY = 0.05
+
+    # Cópias das planilhas: idade até a qual são servidas sem revalidar e até a qual são servidas revalidando
+    FRESH_SECONDS = float(os.environ.get("UI_BIA_SHEETS_FRESH", "30"))
+    STALE_SECONDS = float(os.environ.get("UI_BIA_SHEETS_STALE", "3600"))
+
+    _latencies: Dict[str, Deque[float]] = {}
+    _latency_lock = threading.Lock()
+    _hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sheets-hedge")
+
+    # Cópias das planilhas inteiras: uma por planilha configurada, nunca descartadas pelas cargas
+    # por período (são o último recurso quando o Sheets falha); as cópias por período são um LRU
+    _snapshots: Dict[Hashable, Tuple[float, pd.DataFrame, float]] = {}
+    _snapshot_lock = threading.Lock()
+    _range_snapshots = MetricsCache(max_entries=16, name="planilhas_periodo")
+    _revalidations: Dict[Hashable, Future] = {}
+    _revalidation_lock = threading.Lock()
+    _revalidation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sheets-refresh")
+
+    @staticmethod
+    def sheet_base_url(sheets_url: str) -> str:
+        """Remove o sufixo /edit (e parâmetros) da URL da planilha"""
+        if "/edit" in sheets_url:
+            return sheets_url.split("/edit")[0]
+        return sheets_url
 
     @staticmethod
     def convert_sheets_url_to_csv(sheets_url: str) -> str:
         """Converte URL do Google Sheets para formato CSV"""
-        if "/edit" in sheets_url:
-            base_url = sheets_url.split("/edit")[0]
-        else:
-            base_url = sheets_url
+        return f"{SheetsService.sheet_base_url(sheets_url)}/export?format=csv"
+
+    @staticmethod
+    def build_query_url(sheets_url: str, query: str) -> str:
+        """Monta a URL da interface de consulta gviz (tq) com saída em CSV"""
+        return f"{SheetsService.sheet_base_url(sheets_url)}/gviz/tq?tqx=out:csv&tq={quote(query)}"
+
+    @staticmethod
+    def column_letter(index: int) -> str:
+        """Converte o índice da coluna (0 = A) para a letra usada na linguagem de consulta"""
+        letters = ""
+        index += 1
+        while index > 0:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(65 + remainder) + letters
+        return letters
+
+    @staticmethod
+    def build_range_query(headers: List[str], columns: List[str], date_column: str,
+                          start_date: str, end_date: str) -> Optional[str]:
+        """Monta a consulta SELECT ... WHERE para o período e o subconjunto de colunas"""
+        positions = {str(header).strip().lower(): i for i, header in enumerate(headers)}
+        start_dt = MetricsService.parse_date(start_date)
+        end_dt = MetricsService.parse_date(end_date)
+
+        if date_column not in positions or start_dt is None or end_dt is None:
+            return None
+        if any(column not in positions for column in columns):
+            return None
+
+        selected = ", ".join(SheetsService.column_letter(positions[column]) for column in columns)
+        date_letter = SheetsService.column_letter(positions[date_column])
+
+        return (
+            f"SELECT {selected} "
+            f"WHERE {date_letter} >= date '{start_dt:%Y-%m-%d}' AND {date_letter} <= date '{end_dt:%Y-%m-%d}'"
+        )
+
+    @staticmethod
+    def _latency_kind(url: str) -> str:
+        """Consultas gviz e exportações completas têm latências bem diferentes: amostras separadas"""
+        return "consulta" if "/gviz/" in url else "exportacao"
+
+    @staticmethod
+    def hedge_delay(url: str) -> Optional[float]:
+        """Espera antes do hedge: o percentil configurado das latências recentes (None = sem hedge)"""
+        if SheetsService.HEDGE_PERCENTILE <= 0:
+            return None
+
+        with SheetsService._latency_lock:
+            samples = sorted(SheetsService._latencies.get(SheetsService._latency_kind(url), ()))
+        if len(samples) < SheetsService.HEDGE_MIN_SAMPLES:
+            return SheetsService.HEDGE_DEFAULT_DELAY
+
+        position = min(int(len(samples) * SheetsService.HEDGE_PERCENTILE / 100), len(samples) - 1)
+        return max(samples[position], SheetsService.HEDGE_MIN_DELAY)
+
+    @staticmethod
+    def _get(url: str, deadline: float) -> requests.Response:
+        """Uma tentativa, limitada pelo que resta do prazo total; registra a latência das respostas válidas"""
+        timeout = min(SheetsService.ATTEMPT_TIMEOUT, deadline - time.monotonic())
+        if timeout <= 0:
+            raise requests.Timeout("Prazo total da busca esgotado")
+
+        began = time.perf_counter()
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+
+        with SheetsService._latency_lock:
+            samples = SheetsService._latencies.setdefault(SheetsService._latency_kind(url), deque(maxlen=200))
+            samples.append(time.perf_counter() - began)
+        return response
+
+    @staticmethod
+    def _hedged_get(url: str, deadline: float) -> requests.Response:
+        """Tentativa com hedge: se a primeira requisição demorar além do percentil, dispara uma segunda"""
+        delay = SheetsService.hedge_delay(url)
+        if delay is None:
+            return SheetsService._get(url, deadline)
+
+        first = SheetsService._hedge_executor.submit(SheetsService._get, url, deadline)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        TelemetryService.count("ui_bia_sheets_fetch_total", evento="hedge")
+        pending = {first, SheetsService._hedge_executor.submit(SheetsService._get, url, deadline)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        TelemetryService.count("ui_bia_sheets_fetch_total", evento="hedge_venceu")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        """Falhas temporárias: tempo esgotado, conexão recusada ou resposta 408/429/5xx"""
+        if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+            return True
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code in SheetsService.RETRY_STATUS
+        return False
+
+    @staticmethod
+    def new_deadline() -> float:
+        """Prazo total (time.monotonic) de uma carga que começa agora"""
+        return time.monotonic() + SheetsService.DEADLINE
+
+    @staticmethod
+    def download(url: str, deadline: Optional[float] = None) -> requests.Response:
+        """Requisição HTTP à planilha com tentativas e hedge, dentro do prazo total (etapa "download")
+
+        ``deadline`` é o prazo da carga da qual a requisição faz parte; sem ele, um prazo novo.
+        """
+        with TelemetryService.span("download"):
+            deadline = SheetsService.new_deadline() if deadline is None else deadline
+            for attempt in range(1, SheetsService.MAX_ATTEMPTS + 1):
+                try:
+                    return SheetsService._hedged_get(url, deadline)
+                except Exception as e:
+                    delay = min(SheetsService.BACKOFF_SECONDS * 2 ** (attempt - 1), SheetsService.BACKOFF_MAX_SECONDS)
+                    delay *= random.uniform(0.5, 1.0)
+                    if attempt == SheetsService.MAX_ATTEMPTS or not SheetsService._retryable(e) \
+                            or time.monotonic() + delay >= deadline:
+                        raise
+
+                    TelemetryService.count("ui_bia_sheets_fetch_total", evento="nova_tentativa")
+                    logger.warning("Falha temporária ao baixar planilha, nova tentativa", extra={"campos": {
+                        "tentativa": attempt, "espera_s": round(delay, 2), "erro": str(e)
+                    }})
+                    time.sleep(delay)
+
+    @staticmethod
+    def parse_csv(text: str) -> pd.DataFrame:
+        """Lê o CSV baixado (etapa "leitura_csv" da telemetria)"""
+        with TelemetryService.span("leitura_csv"):
+            df = pd.read_csv(StringIO(text))
+        TelemetryService.rows("leitura_csv", len(df))
+        return df
 
-        return f"{base_url}/export?format=csv"
+    @staticmethod
+    def fetch_query(sheets_url: str, query: str, deadline: Optional[float] = None) -> pd.DataFrame:
+        """Executa uma consulta gviz e retorna o CSV como DataFrame (exceção em caso de falha)"""
+        response = SheetsService.download(SheetsService.build_query_url(sheets_url, query), deadline)
+        if "text/html" in response.headers.get("Content-Type", ""):
+            raise ValueError("A consulta retornou uma página de erro em vez de CSV")
+        return SheetsService.parse_csv(response.text)
 
     @staticmethod
-    def load_sheet_data(sheets_url: str) -> Optional[pd.DataFrame]:
+    def load_sheet_data(sheets_url: str, deadline: Optional[float] = None) -> Optional[pd.DataFrame]:
         """Carrega dados de uma planilha do Google Sheets"""
         try:
             csv_url = SheetsService.convert_sheets_url_to_csv(sheets_url)
-            response = requests.get(csv_url, timeout=10)
-            response.raise_for_status()
+            response = SheetsService.download(csv_url, deadline)
 
             # Lê o CSV em um DataFrame
-            df = pd.read_csv(StringIO(response.text))
+            return SheetsService.parse_csv(response.text)
+
+        except Exception as e:
+            logger.error("Erro ao carregar planilha", extra={"campos": {"erro": str(e)}})
+            return None
+
+    @staticmethod
+    def load_sheet_range(sheets_url: str, start_date: str, end_date: str, columns: List[str],
+                         date_column: str = "data", deadline: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """Carrega apenas as linhas do período e as colunas pedidas, filtrando no servidor do Sheets
+
+        Se a consulta falhar (ex.: coluna de data armazenada como texto), usa a
+        exportação completa e aplica o mesmo filtro localmente. As três requisições
+        dividem o mesmo prazo total.
+        """
+        deadline = SheetsService.new_deadline() if deadline is None else deadline
+        try:
+            # Cabeçalho da planilha, sem nenhuma linha de dados
+            headers = list(SheetsService.fetch_query(sheets_url, "SELECT * LIMIT 0", deadline).columns)
+            query = SheetsService.build_range_query(headers, columns, date_column, start_date, end_date)
+            if query is None:
+                raise ValueError("Colunas ou datas não encontradas para a consulta")
+
+            df = SheetsService.fetch_query(sheets_url, query, deadline)
+            if len(df.columns) != len(columns):
+                raise ValueError("Resposta da consulta com colunas inesperadas")
+
+            # A consulta devolve os rótulos originais; padroniza para os nomes usados nas métricas
+            df.columns = columns
             return df
 
         except Exception as e:
-            print(f"Erro ao carregar planilha: {e}")
+            logger.warning("Consulta por período indisponível, usando exportação completa",
+                           extra={"campos": {"erro": str(e)}})
+
+        return SheetsService.filter_range(
+            SheetsService.load_sheet_data(sheets_url, deadline), start_date, end_date, columns
+        )
+
+    @staticmethod
+    def filter_range(df: Optional[pd.DataFrame], start_date: str, end_date: str,
+                     columns: List[str]) -> Optional[pd.DataFrame]:
+        """Aplica localmente o filtro da consulta por período: linhas do período e colunas pedidas"""
+        if df is None:
             return None
 
+        # Mesmo casamento de nomes de coluna usado na consulta (sem diferenciar maiúsculas)
+        lookup = {str(header).strip().lower(): header for header in df.columns}
+        df = df.rename(columns={lookup[column]: column for column in columns if column in lookup})
+
+        df = MetricsService.filter_data_by_date(df, start_date, end_date)
+        available = [column for column in columns if column in df.columns]
+        return df[available] if available else df
+
+    @staticmethod
+    def _is_range_key(key: Hashable) -> bool:
+        """Chaves (url, planilha, início, fim) com período são de cargas por período"""
+        return isinstance(key, tuple) and len(key) == 4 and bool(key[2] or key[3])
+
+    @staticmethod
+    def _get_snapshot(key: Hashable) -> Optional[Tuple[float, pd.DataFrame, float]]:
+        """Cópia guardada para a chave (planilha inteira ou período)"""
+        if SheetsService._is_range_key(key):
+            return SheetsService._range_snapshots.get(key)
+        with SheetsService._snapshot_lock:
+            return SheetsService._snapshots.get(key)
+
+    @staticmethod
+    def _put_snapshot(key: Hashable, snapshot: Tuple[float, pd.DataFrame, float]) -> None:
+        """Guarda a cópia no cache da planilha inteira ou no LRU das cargas por período"""
+        if SheetsService._is_range_key(key):
+            SheetsService._range_snapshots.put(key, snapshot)
+            return
+        with SheetsService._snapshot_lock:
+            SheetsService._snapshots[key] = snapshot
+
+    @staticmethod
+    def _store_snapshot(key: Hashable, df: pd.DataFrame) -> None:
+        """Guarda a cópia como (verificada em, planilha, alterada em)
+
+        Se a planilha não mudou desde a última cópia, só a hora da verificação avança.
+        """
+        now = time.time()
+        previous = SheetsService._get_snapshot(key)
+        if previous is not None and previous[1].equals(df):
+            SheetsService._put_snapshot(key, (now, previous[1], previous[2]))
+        else:
+            SheetsService._put_snapshot(key, (now, df, now))
+
+    @staticmethod
+    def _revalidate(key: Hashable, fetch: Callable[[], Optional[pd.DataFrame]]) -> None:
+        """Atualiza a cópia em segundo plano (no máximo uma atualização por cópia ao mesmo tempo)"""
+        def run() -> None:
+            try:
+                df = fetch()
+                if df is not None:
+                    SheetsService._store_snapshot(key, df)
+            finally:
+                with SheetsService._revalidation_lock:
+                    SheetsService._revalidations.pop(key, None)
+
+        with SheetsService._revalidation_lock:
+            if key not in SheetsService._revalidations:
+                SheetsService._revalidations[key] = SheetsService._revalidation_executor.submit(run)
+
     @staticmethod
-    def load_all_sheets() -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
-        """Carrega ambas as planilhas"""
-        biometria_url = "https://docs.google.com/spreadsheets/d/1zoO2Eq-h2mx4i6p6i6bUhGCEXtVWXEZGSRYjnDa13dA"
-        racao_url = "https://docs.google.com/spreadsheets/d/1i-QwgMjC9ZgWymtS_0h0amlAsu9Vu8JvEGpSzTUs_WE"
+    def wait_revalidation(served: List[Dict[str, Any]], timeout: Optional[float] = None) -> bool:
+        """Espera a atualização das cópias servidas (entradas do ``report``); True se alguma planilha mudou"""
+        keys = [entry["chave"] for entry in served if entry["revalidando"]]
+        with SheetsService._revalidation_lock:
+            pending = [SheetsService._revalidations[key] for key in keys if key in SheetsService._revalidations]
+        if pending:
+            wait(pending, timeout=SheetsService.DEADLINE if timeout is None else timeout)
+
+        for entry in served:
+            snapshot = SheetsService._get_snapshot(entry["chave"])
+            if entry["revalidando"] and snapshot is not None and snapshot[2] > entry["versao"]:
+                return True
+        return False
+
+    @staticmethod
+    def cached_fetch(key: Hashable, fetch: Callable[[], Optional[pd.DataFrame]], label: str = "",
+                     report: Optional[List[Dict[str, Any]]] = None,
+                     revalidate: bool = False) -> Optional[pd.DataFrame]:
+        """Busca com a cópia da última carga válida (stale-while-revalidate e stale-if-error)
+
+        As cópias servidas no lugar de uma busca são anotadas em ``report``: chave e versão
+        (hora da última alteração) da cópia, planilha, idade em segundos e se ela está
+        sendo atualizada em segundo plano. Com ``revalidate`` (carga pedida pelo usuário),
+        uma cópia recente também é atualizada e anotada, em vez de servida em silêncio.
+        """
+        snapshot = SheetsService._get_snapshot(key)
+        if snapshot is not None:
+            checked_at, df, changed_at = snapshot
+            age = time.time() - checked_at
+            if age <= SheetsService.FRESH_SECONDS and not revalidate:
+                return df
+            if age <= SheetsService.STALE_SECONDS:
+                SheetsService._revalidate(key, fetch)
+                TelemetryService.count("ui_bia_sheets_fetch_total", evento="copia_revalidando")
+                if report is not None:
+                    report.append({"chave": key, "versao": changed_at, "planilha": label, "idade_s": age,
+                                   "revalidando": True})
+                return df
+
+        df = fetch()
+        if df is not None:
+            SheetsService._store_snapshot(key, df)
+            return df
+
+        if snapshot is None:
+            return None
+
+        # Origem indisponível: a última cópia válida, mesmo antiga, é melhor que um dashboard vazio
+        age = time.time() - snapshot[0]
+        TelemetryService.count("ui_bia_sheets_fetch_total", evento="copia_por_falha")
+        logger.warning("Planilha indisponível, usando a última cópia válida",
+                       extra={"campos": {"planilha": label, "idade_s": round(age)}})
+        if report is not None:
+            report.append({"chave": key, "versao": snapshot[2], "planilha": label, "idade_s": age,
+                           "revalidando": False})
+        return snapshot[1]
+
+    @staticmethod
+    def describe_snapshots(report: List[Dict[str, Any]]) -> str:
+        """Aviso para o dashboard sobre as cópias servidas no lugar de uma busca"""
+        if not report:
+            return ""
+
+        oldest = max(entry["idade_s"] for entry in report)
+        age = f"{oldest / 60:.0f} min" if oldest >= 60 else f"{oldest:.0f} s"
+        if all(entry["revalidando"] for entry in report):
+            return f" (cópia de {age} atrás; atualizando em segundo plano)"
+        return f" (Sheets indisponível; exibindo a última cópia válida, de {age} atrás)"
+
+    @staticmethod
+    def load_source_sheet(source: FarmSource, kind: str, start_date: str = "", end_date: str = "",
+                          report: Optional[List[Dict[str, Any]]] = None,
+                          revalidate: bool = False) -> Optional[pd.DataFrame]:
+        """Carrega a planilha de biometria ou de ração de uma fazenda, já no esquema padrão"""
+        url = source.biometria_url if kind == "biometria" else source.racao_url
+        if not url:
+            return None
+
+        # Fontes locais têm o próprio cache por arquivo (mtime e tamanho) e não usam as cópias
+        if LocalSourceService.is_local(url):
+            return SheetsService._fetch_source_sheet(source, kind, url, start_date, end_date)
+
+        return SheetsService.cached_fetch(
+            (url, kind, start_date, end_date),
+            lambda: SheetsService._fetch_source_sheet(source, kind, url, start_date, end_date),
+            label=f"{source.farm}/{kind}", report=report, revalidate=revalidate
+        )
+
+    @staticmethod
+    def _fetch_source_sheet(source: FarmSource, kind: str, url: str, start_date: str,
+                            end_date: str) -> Optional[pd.DataFrame]:
+        """Busca a planilha na origem, no Sheets ou em arquivos locais (None se falhar ou vier vazia)
+
+        Todas as requisições da busca dividem um único prazo total (DEADLINE).
+        """
+        local = LocalSourceService.is_local(url)
+        deadline = SheetsService.new_deadline()
+        if start_date and end_date:
+            standard = SheetsService.BIOMETRIA_COLUMNS if kind == "biometria" else SheetsService.RACAO_COLUMNS
+            columns = [column.strip().lower() for column in source.sheet_columns(standard)]
+            date_column = source.sheet_columns(["data"])[0].strip().lower()
+            if local:
+                df = SheetsService.filter_range(LocalSourceService.load(url), start_date, end_date, columns)
+            else:
+                df = SheetsService.load_sheet_range(url, start_date, end_date, columns, date_column, deadline)
+        else:
+            df = LocalSourceService.load(url) if local else SheetsService.load_sheet_data(url, deadline)
+
+        if df is None or df.empty:
+            return None
+        return source.standardize(df)
+
+    @staticmethod
+    def load_all_sheets(start_date: str = "", end_date: str = "", sources: Optional[List[FarmSource]] = None,
+                        report: Optional[List[Dict[str, Any]]] = None,
+                        revalidate: bool = False) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """Carrega as planilhas de todas as fazendas em paralelo (somente o período informado, se houver)
+
+        Todas as requisições são disparadas ao mesmo tempo, então o tempo total é o
+        da fonte mais lenta. O resultado junta as fazendas com a coluna farm.
+        ``report`` recebe as cópias servidas no lugar de uma busca e ``revalidate``
+        atualiza até as cópias recentes (ver cached_fetch).
+        """
+        sources = sources if sources is not None else SourceRegistry.load_sources()
+        if not sources:
+            return None, None
+
+        kinds = ("biometria", "racao")
+        with ThreadPoolExecutor(max_workers=len(sources) * len(kinds), thread_name_prefix="sheets") as executor:
+            futures = {
+                kind: [
+                    executor.submit(SheetsService.load_source_sheet, source, kind, start_date, end_date, report,
+                                    revalidate)
+                    for source in sources
+                ]
+                for kind in kinds
+            }
 
-        biometria_df = SheetsService.load_sheet_data(biometria_url)
-        racao_df = SheetsService.load_sheet_data(racao_url)
+        merged = []
+        for kind in kinds:
+            frames = [future.result() for future in futures[kind]]
+            frames = [df for df in frames if df is not None]
+            merged.append(
+                SourceRegistry.qualify_tanks(pd.concat(frames, ignore_index=True), sources) if frames else None
+            )
 
-        return biometria_df, racao_df
\ No newline at end of file
+        return merged[0], merged[1]
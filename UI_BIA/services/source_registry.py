@@ -0,0 +1,107 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .log_service import LogService
+
+logger = LogService.get_logger(__name__)
+
+
+@dataclass
+class FarmSource:
+    """Fonte de dados de uma fazenda: planilhas de biometria e ração e o mapeamento das colunas
+
+    As URLs podem ser do Google Sheets ou locais (caminho ou ``file://`` de um CSV ou de um
+    diretório de CSVs, lidos pelo LocalSourceService).
+    """
+
+    farm: str
+    biometria_url: str
+    racao_url: str
+    # Nome da coluna na planilha -> nome padrão usado nas métricas (data, tanque, largura, altura, peso)
+    columns: Dict[str, str] = field(default_factory=dict)
+
+    def sheet_columns(self, standard_columns: List[str]) -> List[str]:
+        """Traduz os nomes padrão para os nomes usados nas planilhas desta fazenda"""
+        reverse = {standard: sheet for sheet, standard in self.columns.items()}
+        return [reverse.get(column, column) for column in standard_columns]
+
+    def standardize(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Renomeia as colunas para o esquema padrão e adiciona a dimensão farm"""
+        if df is None:
+            return None
+
+        mapping = {sheet.strip().lower(): standard for sheet, standard in self.columns.items()}
+        df = df.rename(columns={
+            header: mapping[str(header).strip().lower()]
+            for header in df.columns if str(header).strip().lower() in mapping
+        })
+        df.insert(0, "farm", self.farm)
+        return df
+
+
+class SourceRegistry:
+    """Registro configurável das fazendas e de suas planilhas"""
+
+    # Valor do filtro de fazenda que seleciona todas as fontes
+    ALL_FARMS = "Todas as fazendas"
+
+    # Arquivo JSON com a lista de fontes: [{"farm": ..., "biometria_url": ..., "racao_url": ..., "columns": {...}}]
+    CONFIG_ENV = "UI_BIA_SOURCES"
+
+    DEFAULT_SOURCES = [
+        FarmSource(
+            farm="principal",
+            biometria_url="https://docs.google.com/spreadsheets/d/1zoO2Eq-h2mx4i6p6i6bUhGCEXtVWXEZGSRYjnDa13dA",
+            racao_url="https://docs.google.com/spreadsheets/d/1i-QwgMjC9ZgWymtS_0h0amlAsu9Vu8JvEGpSzTUs_WE"
+        )
+    ]
+
+    @staticmethod
+    def load_sources(path: Optional[str] = None) -> List[FarmSource]:
+        """Lê as fontes do arquivo configurado (UI_BIA_SOURCES) ou usa a fonte padrão"""
+        path = path or os.environ.get(SourceRegistry.CONFIG_ENV, "")
+        if not path:
+            return list(SourceRegistry.DEFAULT_SOURCES)
+
+        try:
+            with open(path, encoding="utf-8") as config_file:
+                entries = json.load(config_file)
+            return [FarmSource(**entry) for entry in entries]
+        except Exception as e:
+            logger.error("Erro ao ler o registro de fontes", extra={"campos": {"arquivo": path, "erro": str(e)}})
+            return list(SourceRegistry.DEFAULT_SOURCES)
+
+    @staticmethod
+    def qualify_tanks(df: Optional[pd.DataFrame], sources: List[FarmSource]) -> Optional[pd.DataFrame]:
+        """Prefixa o tanque com a fazenda quando há mais de uma fonte, evitando juntar tanques homônimos
+
+        A decisão vem das fontes configuradas, não das fazendas presentes no DataFrame:
+        se a planilha de uma fazenda falhar, biometria e ração continuam com os mesmos
+        identificadores de tanque e a correlação entre elas continua casando.
+        """
+        if df is None or "farm" not in df.columns or len({source.farm for source in sources}) <= 1:
+            return df
+
+        df = df.copy()
+        df["tanque"] = df["farm"].astype(str) + ":" + df["tanque"].astype(str)
+        return df
+
+    @staticmethod
+    def farms(*frames: Optional[pd.DataFrame]) -> List[str]:
+        """Lista as fazendas presentes nos dados, precedidas da opção de todas"""
+        names = set()
+        for df in frames:
+            if df is not None and "farm" in df.columns:
+                names.update(name for name in df["farm"].dropna().astype(str).unique() if name)
+        return [SourceRegistry.ALL_FARMS] + sorted(names)
+
+    @staticmethod
+    def filter_farm(df: Optional[pd.DataFrame], farm: str) -> Optional[pd.DataFrame]:
+        """Restringe um DataFrame a uma fazenda (sem filtro para a opção de todas)"""
+        if df is None or not farm or farm == SourceRegistry.ALL_FARMS or "farm" not in df.columns:
+            return df
+        return df[df["farm"] == farm]
@@ -0,0 +1,46 @@
+import pandas as pd
+from typing import List
+
+from .dataset_service import DatasetService
+
+
+class TableService:
+    """Serviço para paginação de tabelas grandes exibidas no navegador"""
+
+    @staticmethod
+    def truncate_values(df: pd.DataFrame, max_length: int = 20) -> List[List[str]]:
+        """Converte as células para texto e trunca todas em uma única passagem vetorizada"""
+        if df is None or df.empty:
+            return []
+
+        # Achata a janela em uma única série para aplicar as operações de texto de uma vez
+        values = pd.Series(df.to_numpy(dtype=object).ravel())
+        text = values.where(values.notna(), "").astype(str)
+        too_long = text.str.len() > max_length
+        text = text.where(~too_long, text.str.slice(0, max_length) + "...")
+
+        return text.to_numpy().reshape(df.shape).tolist()
+
+    @staticmethod
+    def headers(df: pd.DataFrame) -> List[str]:
+        """Cabeçalhos exibidos da tabela (sem as colunas derivadas na validação da carga)"""
+        if df is None:
+            return []
+        return [str(col) for col in df.columns if col not in DatasetService.DERIVED_COLUMNS]
+
+    @staticmethod
+    def page_count(df: pd.DataFrame, page_size: int) -> int:
+        """Retorna o número de páginas de um DataFrame"""
+        if df is None or df.empty or page_size <= 0:
+            return 0
+        return (len(df) + page_size - 1) // page_size
+
+    @staticmethod
+    def get_page(df: pd.DataFrame, page: int, page_size: int, max_length: int = 20) -> List[List[str]]:
+        """Retorna apenas as linhas visíveis de uma página, já truncadas"""
+        if df is None or df.empty or page_size <= 0:
+            return []
+
+        start = max(page, 0) * page_size
+        window = df.iloc[start:start + page_size].drop(columns=DatasetService.DERIVED_COLUMNS, errors="ignore")
+        return TableService.truncate_values(window, max_length)
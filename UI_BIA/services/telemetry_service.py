@@ -0,0 +1,163 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Rótulos de uma série, em ordem fixa: (("stage", "filtro"),)
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus (contagem por faixa, soma e total)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Contagem acumulada até cada limite (le), terminando em +Inf"""
+        total, rows = 0, []
+        for bound, count in zip([*map(_format_number, self.buckets), "+Inf"], self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _render_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [*labels, extra] if extra else list(labels)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class TelemetryService:
+    """Métricas de latência e volume do backend, expostas em texto do Prometheus em /metrics
+
+    Cada etapa da carga e do cálculo das métricas é medida com ``span``; as contagens
+    (acertos de cache, linhas processadas, erros) usam ``count``. Os valores ficam em
+    memória no processo (um worker), protegidos por um único lock.
+    """
+
+    # Faixas de duração das etapas, em segundos
+    STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    # Métricas conhecidas: tipo e descrição exibidos no /metrics
+    METRICS = {
+        "ui_bia_stage_seconds": ("histogram", "Duração de cada etapa da carga e do cálculo das métricas"),
+        "ui_bia_stage_errors_total": ("counter", "Etapas interrompidas por exceção"),
+        "ui_bia_rows_processed_total": ("counter", "Linhas processadas por etapa"),
+        "ui_bia_cache_requests_total": ("counter", "Consultas aos caches, por resultado (hit ou miss)"),
+        "ui_bia_log_suppressed_total": ("counter", "Mensagens de log descartadas pelo limite de frequência"),
+        "ui_bia_sheets_fetch_total": ("counter", "Novas tentativas, hedges e cópias servidas na busca das planilhas"),
+    }
+
+    _lock = threading.Lock()
+    _histograms: Dict[str, Dict[Labels, Histogram]] = {}
+    _counters: Dict[str, Dict[Labels, float]] = {}
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    @staticmethod
+    def observe(name: str, value: float, **labels: str) -> None:
+        """Registra uma observação em um histograma"""
+        key = TelemetryService._labels(labels)
+        with TelemetryService._lock:
+            series = TelemetryService._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(TelemetryService.STAGE_BUCKETS)
+            histogram.observe(value)
+
+    @staticmethod
+    def count(name: str, value: float = 1, **labels: str) -> None:
+        """Incrementa um contador"""
+        key = TelemetryService._labels(labels)
+        with TelemetryService._lock:
+            series = TelemetryService._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    @staticmethod
+    @contextmanager
+    def span(stage: str) -> Iterator[None]:
+        """Mede a duração de uma etapa (registrada também quando a etapa termina em exceção)"""
+        began = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            TelemetryService.count("ui_bia_stage_errors_total", stage=stage)
+            raise
+        finally:
+            TelemetryService.observe("ui_bia_stage_seconds", time.perf_counter() - began, stage=stage)
+
+    @staticmethod
+    def timed(stage: str) -> Callable:
+        """Decorador: mede cada chamada da função como a etapa ``stage``"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with TelemetryService.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def rows(stage: str, count: int) -> None:
+        """Soma as linhas processadas por uma etapa"""
+        TelemetryService.count("ui_bia_rows_processed_total", count, stage=stage)
+
+    @staticmethod
+    def cache(name: str, hit: bool) -> None:
+        """Registra uma consulta a um cache"""
+        TelemetryService.count("ui_bia_cache_requests_total", cache=name, result="hit" if hit else "miss")
+
+    @staticmethod
+    def render() -> str:
+        """Todas as métricas no formato de texto do Prometheus (versão 0.0.4)"""
+        with TelemetryService._lock:
+            histograms = {
+                name: {key: (h.cumulative(), h.sum, h.count) for key, h in series.items()}
+                for name, series in TelemetryService._histograms.items()
+            }
+            counters = {name: dict(series) for name, series in TelemetryService._counters.items()}
+
+        lines = []
+        for name in sorted({*histograms, *counters}):
+            kind, description = TelemetryService.METRICS.get(
+                name, ("histogram" if name in histograms else "counter", name)
+            )
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, (buckets, total, count) in sorted(histograms.get(name, {}).items()):
+                for bound, cumulative in buckets:
+                    lines.append(f"{name}_bucket{_render_labels(key, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{_render_labels(key)} {total!r}")
+                lines.append(f"{name}_count{_render_labels(key)} {count}")
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f"{name}{_render_labels(key)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def reset() -> None:
+        """Zera todas as métricas"""
+        with TelemetryService._lock:
+            TelemetryService._histograms.clear()
+            TelemetryService._counters.clear()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Tuple
+
+
+class TimeSeriesService:
+    """Serviço para séries temporais por tanque com redução de pontos no servidor"""
+
+    # Limite de pontos enviados ao navegador por série, independente do período
+    MAX_POINTS = 300
+
+    @staticmethod
+    def downsample_minmax(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+        """Reduz uma série mantendo o mínimo e o máximo de cada intervalo (min/max bucketing)
+
+        Os intervalos são montados como uma matriz preenchida, então todos os
+        mínimos e máximos saem de uma única chamada a argmin/argmax. O primeiro e
+        o último ponto são sempre preservados.
+        """
+        n = len(y)
+        if n <= max_points or max_points < 4:
+            return x, y
+
+        bucket_count = (max_points - 2) // 2
+        bucket_len = -(-n // bucket_count)
+        bucket_count = -(-n // bucket_len)
+
+        values = np.asarray(y, dtype=float)
+        low = np.full(bucket_count * bucket_len, np.inf)
+        high = np.full(bucket_count * bucket_len, -np.inf)
+        low[:n] = values
+        high[:n] = values
+
+        offsets = np.arange(bucket_count) * bucket_len
+        idx_min = low.reshape(bucket_count, bucket_len).argmin(axis=1) + offsets
+        idx_max = high.reshape(bucket_count, bucket_len).argmax(axis=1) + offsets
+
+        keep = np.unique(np.concatenate(([0, n - 1], idx_min, idx_max)))
+        return np.asarray(x)[keep], values[keep]
+
+    @staticmethod
+    def daily_series(typed_df: pd.DataFrame, value_column: str, how: str) -> pd.DataFrame:
+        """Agrega o conjunto tipado por tanque e dia em uma única operação de groupby"""
+        if typed_df is None or typed_df.empty:
+            return pd.DataFrame(columns=["tanque", "data_parsed", value_column])
+
+        return (
+            typed_df.groupby(["tanque", "data_parsed"], observed=True)[value_column]
+            .agg(how)
+            .reset_index()
+            .sort_values(["tanque", "data_parsed"])
+        )
+
+    @staticmethod
+    def chart_points(daily_df: pd.DataFrame, tanque: str, value_column: str,
+                     max_points: int = MAX_POINTS) -> List[Dict[str, Any]]:
+        """Monta os pontos do gráfico de um tanque, limitados a max_points"""
+        if daily_df is None or daily_df.empty or not tanque:
+            return []
+
+        tank_df = daily_df[daily_df["tanque"] == tanque]
+        if tank_df.empty:
+            return []
+
+        dates, values = TimeSeriesService.downsample_minmax(
+            tank_df["data_parsed"].to_numpy(), tank_df[value_column].to_numpy(), max_points
+        )
+        labels = pd.DatetimeIndex(dates).strftime("%d/%m/%Y")
+
+        return [
+            {"data": label, "valor": round(float(value), 2)}
+            for label, value in zip(labels, values)
+        ]
@@ -0,0 +1,207 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .dataset_service import DatasetService
+from .outlier_service import OutlierService
+from .telemetry_service import TelemetryService
+
+
+@dataclass
+class ValidationResult:
+    """Planilha validada: linhas limpas, linhas em quarentena (com o motivo) e relatório por tanque"""
+
+    clean: Optional[pd.DataFrame]
+    quarantine: Optional[pd.DataFrame]
+    report: Optional[pd.DataFrame] = None
+    totals: Dict[str, int] = field(default_factory=dict)
+
+
+class ValidationService:
+    """Validação das planilhas na carga, em uma única passada vetorizada por planilha
+
+    Cada linha é marcada por regra (data inválida, tanque ausente, valor não numérico,
+    valor fora da faixa e linha duplicada); as marcadas vão para a quarentena uma única
+    vez e as métricas recebem apenas linhas limpas, com as medições já em float e as
+    datas já convertidas na coluna ``data_parsed`` (datetime64).
+
+    Nas linhas limpas de biometria, as medições atípicas do tanque no dia (OutlierService)
+    não vão para a quarentena: ficam marcadas na coluna ``atipica`` e as métricas podem
+    excluí-las sob demanda.
+    """
+
+    # Colunas numéricas de cada planilha
+    NUMERIC_COLUMNS = {
+        "biometria": ["largura", "altura"],
+        "racao": ["peso"],
+    }
+
+    # Faixa aceita para cada medição: mínimo (exclusivo) e máximo (inclusivo)
+    RANGES = {
+        "largura": (0.0, 1_000.0),
+        "altura": (0.0, 1_000.0),
+        "peso": (0.0, 100_000.0),
+    }
+
+    # Linhas idênticas de ração são lançamentos repetidos; na biometria dois peixes podem
+    # ter as mesmas medidas no mesmo dia, então as duplicadas só aparecem no relatório
+    QUARANTINE_DUPLICATES = {
+        "biometria": False,
+        "racao": True,
+    }
+
+    # Rótulo do grupo de linhas sem tanque no relatório
+    MISSING_TANK = "(sem tanque)"
+
+    # Colunas do relatório no State (as regras das duas planilhas, zero quando não se aplicam)
+    REPORT_COLUMNS = [
+        "total", "quarentena", "data_invalida", "tanque_ausente",
+        "largura_nao_numerico", "largura_fora_faixa", "altura_nao_numerico", "altura_fora_faixa",
+        "peso_nao_numerico", "peso_fora_faixa", "duplicada",
+        "largura_atipica", "altura_atipica", "atipica"
+    ]
+
+    SHEET_LABELS = {"biometria": "Biometria", "racao": "Ração"}
+
+    @staticmethod
+    def _numeric(series: pd.Series) -> pd.Series:
+        """Converte uma coluna para float (textos não numéricos viram NaN), convertendo só os valores distintos"""
+        if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            return series.astype("float64")
+
+        codes, uniques = pd.factorize(series)
+        values = pd.to_numeric(pd.Series(np.asarray(uniques, dtype=object)), errors="coerce").to_numpy(dtype=float)
+        return pd.Series(np.append(values, np.nan)[codes], index=series.index)
+
+    @staticmethod
+    def _tanks(df: pd.DataFrame) -> pd.Series:
+        """Código do tanque em texto, sem espaços nas pontas (tratado só nos valores distintos)"""
+        if "tanque" not in df.columns:
+            return pd.Series("", index=df.index)
+        codes, uniques = pd.factorize(df["tanque"])
+        labels = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.strip().to_numpy(dtype=object)
+        return pd.Series(np.append(labels, "")[codes], index=df.index)
+
+    @staticmethod
+    def flags(df: pd.DataFrame, sheet: str) -> Tuple[pd.DataFrame, Dict[str, pd.Series]]:
+        """Marca as linhas de cada regra; devolve as marcas e as colunas convertidas (medições, datas e tanques)"""
+        flags = {}
+        dates = DatasetService.parse_dates(df["data"]) if "data" in df.columns \
+            else pd.Series(pd.NaT, index=df.index)
+        flags["data_invalida"] = dates.isna()
+
+        tanks = ValidationService._tanks(df)
+        flags["tanque_ausente"] = tanks.isin(["", "nan", "None"])
+
+        numbers = {}
+        for column in ValidationService.NUMERIC_COLUMNS[sheet]:
+            values = ValidationService._numeric(df[column]) if column in df.columns \
+                else pd.Series(np.nan, index=df.index)
+            low, high = ValidationService.RANGES[column]
+            flags[f"{column}_nao_numerico"] = values.isna()
+            flags[f"{column}_fora_faixa"] = values.notna() & ((values <= low) | (values > high))
+            numbers[column] = values
+
+        flags["duplicada"] = df.duplicated(keep="first")
+        numbers["data_parsed"] = dates
+        numbers["tanque"] = tanks
+        return pd.DataFrame(flags, index=df.index), numbers
+
+    @staticmethod
+    @TelemetryService.timed("validacao")
+    def validate(df: Optional[pd.DataFrame], sheet: str) -> ValidationResult:
+        """Separa as linhas válidas da quarentena e monta o relatório por tanque da planilha"""
+        if df is None or df.empty:
+            return ValidationResult(clean=df, quarantine=None)
+
+        TelemetryService.rows("validacao", len(df))
+        flags, numbers = ValidationService.flags(df, sheet)
+        quarantined = flags.drop(columns="duplicada").any(axis=1)
+        if ValidationService.QUARANTINE_DUPLICATES[sheet]:
+            quarantined |= flags["duplicada"]
+
+        dates, tanks = numbers["data_parsed"], numbers.pop("tanque")
+        counts = pd.DataFrame({"total": True, "quarentena": quarantined}, index=df.index)
+
+        # Medições atípicas entre as linhas que seguem para as métricas (marcadas, não removidas)
+        if sheet == "biometria":
+            kept = ~quarantined
+            outliers = OutlierService.flags(tanks[kept], dates[kept], {
+                column: numbers[column][kept] for column in ValidationService.NUMERIC_COLUMNS[sheet]
+            }).reindex(df.index, fill_value=False)
+            flags = flags.join(outliers)
+            counts[OutlierService.FLAG_COLUMN] = outliers.any(axis=1)
+            numbers[OutlierService.FLAG_COLUMN] = counts[OutlierService.FLAG_COLUMN]
+
+        # Linhas limpas com as medições já numéricas e as datas convertidas: as métricas não as reconvertem
+        clean = df.assign(**numbers)[~quarantined.to_numpy()].reset_index(drop=True)
+
+        quarantine = df[quarantined.to_numpy()].copy()
+        if not quarantine.empty:
+            reasons = flags[quarantined.to_numpy()].drop(columns=OutlierService.flag_names(), errors="ignore")
+            motivo = pd.Series("", index=quarantine.index)
+            for name in reasons.columns:
+                motivo = motivo.where(~reasons[name], motivo + np.where(motivo == "", "", ", ") + name)
+            quarantine["motivo"] = motivo
+        quarantine = quarantine.reset_index(drop=True)
+
+        # Relatório por tanque: contagem de cada regra, total de linhas, quarentena e atípicas
+        tanks = tanks.where(~flags["tanque_ausente"], ValidationService.MISSING_TANK)
+        counts = flags.join(counts).astype(int)
+        report = counts.groupby(tanks.to_numpy(), sort=False).sum()
+        report = report.loc[sorted(report.index, key=lambda t: (t == ValidationService.MISSING_TANK, len(t), t))]
+
+        totals = {name: int(value) for name, value in report.sum().items()}
+        return ValidationResult(clean=clean, quarantine=quarantine, report=report, totals=totals)
+
+    @staticmethod
+    def validate_sheets(biometria_df: Optional[pd.DataFrame],
+                        racao_df: Optional[pd.DataFrame]) -> Dict[str, ValidationResult]:
+        """Valida as duas planilhas da carga"""
+        return {
+            "biometria": ValidationService.validate(biometria_df, "biometria"),
+            "racao": ValidationService.validate(racao_df, "racao"),
+        }
+
+    @staticmethod
+    def to_columns(results: Dict[str, ValidationResult]) -> Tuple[List[str], List[str], Dict[str, List[float]]]:
+        """Relatório no formato colunar do State: planilha e tanque de cada linha e as contagens
+
+        Inclui apenas os tanques com alguma linha marcada; as colunas são a união das
+        regras das duas planilhas (zero quando a regra não se aplica).
+        """
+        sheets, tanks, frames = [], [], []
+        for sheet, result in results.items():
+            if result.report is None:
+                continue
+            marked = result.report[result.report.drop(columns=["total", "quarentena"]).sum(axis=1) > 0]
+            sheets.extend([sheet] * len(marked))
+            tanks.extend(str(tank) for tank in marked.index)
+            frames.append(marked.reset_index(drop=True))
+
+        if not frames:
+            return [], [], {name: [] for name in ValidationService.REPORT_COLUMNS}
+
+        table = pd.concat(frames, ignore_index=True).reindex(columns=ValidationService.REPORT_COLUMNS).fillna(0)
+        return sheets, tanks, {name: table[name].astype(float).tolist() for name in table.columns}
+
+    @staticmethod
+    def summary(results: Dict[str, ValidationResult]) -> Dict[str, Dict[str, int]]:
+        """Totais de cada planilha (linhas, quarentena e contagem por regra), serializáveis em JSON"""
+        return {sheet: dict(result.totals) for sheet, result in results.items() if result.totals}
+
+    @staticmethod
+    def describe(totals: Dict[str, Dict[str, int]]) -> str:
+        """Resumo da validação para o dashboard (linhas em quarentena e duplicadas mantidas)"""
+        parts = []
+        for sheet, counts in totals.items():
+            text = (f"{ValidationService.SHEET_LABELS.get(sheet, sheet)}: {counts.get('quarentena', 0)} de "
+                    f"{counts.get('total', 0)} linhas em quarentena")
+            if not ValidationService.QUARANTINE_DUPLICATES.get(sheet) and counts.get("duplicada", 0):
+                text += f" ({counts['duplicada']} duplicadas mantidas)"
+            if counts.get(OutlierService.FLAG_COLUMN, 0):
+                text += f", {counts[OutlierService.FLAG_COLUMN]} medições atípicas marcadas"
+            parts.append(text)
+        return " | ".join(parts)
@@ -0,0 +1,329 @@
+import datetime as dt
+import hashlib
+import json
+import threading
+import zlib
+from io import StringIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import reflex as rx
+import sqlalchemy
+from sqlalchemy import func, insert, select
+
+from .cache_service import MetricsCache
+from .telemetry_service import TelemetryService
+
+
+class BlocoLinhas(rx.Model, table=True):
+    """Bloco de linhas de uma planilha, gravado uma única vez por conteúdo (hash)"""
+
+    __table_args__ = (sqlalchemy.Index("ix_bloco_linhas_hash", "hash", unique=True),)
+
+    hash: str
+    linhas: int
+    # CSV do bloco (com cabeçalho) comprimido com zlib
+    conteudo: bytes
+
+
+class VersaoDataset(rx.Model, table=True):
+    """Versão do dataset: a lista ordenada de blocos de cada planilha em uma carga"""
+
+    criada_em: dt.datetime
+    origem: str = "planilhas"
+    # Hash das listas de blocos: uma carga idêntica à última versão não gera versão nova
+    impressao: str
+    # Listas de hashes em JSON (null quando a planilha não veio na carga)
+    biometria_blocos: Optional[str] = None
+    racao_blocos: Optional[str] = None
+    biometria_linhas: int = 0
+    racao_linhas: int = 0
+    # Tipos das colunas em JSON ({coluna: dtype}), para a versão voltar com os tipos da carga
+    biometria_tipos: Optional[str] = None
+    racao_tipos: Optional[str] = None
+    # Blocos e linhas que não existiam em nenhuma versão anterior (o que a versão acrescentou ao banco)
+    blocos_novos: int = 0
+    linhas_novas: int = 0
+
+
+class VersionService:
+    """Histórico de versões do dataset com deduplicação de linhas por conteúdo
+
+    Cada planilha carregada é dividida em blocos de linhas com fronteiras definidas pelo
+    conteúdo: uma linha fecha um bloco quando bits do seu hash formam um padrão fixo
+    (um bloco a cada BLOCK_ROWS linhas, em média, entre MIN_BLOCK_ROWS e MAX_BLOCK_ROWS).
+    Como as fronteiras não dependem da posição, corrigir, inserir ou remover linhas
+    muda só os blocos vizinhos da alteração, e os demais continuam com o mesmo hash.
+
+    Cada bloco é gravado uma única vez; a versão guarda apenas a lista de hashes e os
+    tipos das colunas. O armazenamento cresce com as linhas alteradas, não com o tamanho
+    das cargas, e uma versão antiga é remontada a partir do banco, sem baixar as planilhas,
+    com os mesmos tipos (tanques "01" continuam texto).
+    """
+
+    # Tamanho médio (potência de 2), mínimo e máximo dos blocos, em linhas
+    BLOCK_ROWS = 256
+    MIN_BLOCK_ROWS = 64
+    MAX_BLOCK_ROWS = 1024
+
+    # Versões listadas no seletor do dashboard
+    HISTORY_LIMIT = 30
+
+    # Parâmetros por consulta IN (limite de variáveis do SQLite)
+    QUERY_CHUNK = 500
+
+    SHEETS = ("biometria", "racao")
+
+    _versions = MetricsCache(max_entries=4, name="versoes")
+    _schema_ready = False
+    _schema_lock = threading.Lock()
+
+    @staticmethod
+    def ensure_schema() -> None:
+        """Cria as tabelas na primeira utilização e migra as já existentes"""
+        if VersionService._schema_ready:
+            return
+        with VersionService._schema_lock:
+            if not VersionService._schema_ready:
+                rx.Model.create_all()
+                VersionService._add_type_columns()
+                VersionService._schema_ready = True
+
+    @staticmethod
+    def _add_type_columns() -> None:
+        """Acrescenta as colunas de tipos à tabela de versões criada antes delas (create_all não altera
+        tabelas existentes); as versões antigas ficam sem tipos e são remontadas com inferência"""
+        table = VersaoDataset.__table__
+        with rx.Model.get_db_engine().begin() as connection:
+            existing = {column["name"] for column in sqlalchemy.inspect(connection).get_columns(table.name)}
+            for column in ("biometria_tipos", "racao_tipos"):
+                if column not in existing:
+                    connection.execute(sqlalchemy.text(f"ALTER TABLE {table.name} ADD COLUMN {column} VARCHAR"))
+
+    @staticmethod
+    def column_types(df: Optional[pd.DataFrame]) -> Optional[str]:
+        """Tipos das colunas da planilha em JSON, na ordem das colunas"""
+        if df is None or df.empty:
+            return None
+        return json.dumps({str(column): str(dtype) for column, dtype in df.dtypes.items()})
+
+    @staticmethod
+    def block_bounds(row_hashes: np.ndarray) -> List[Tuple[int, int]]:
+        """Intervalos [início, fim) dos blocos, com fronteiras definidas pelo hash de cada linha"""
+        mask = np.uint64(VersionService.BLOCK_ROWS - 1)
+        # Bits altos do hash: independentes dos bits baixos usados pelas tabelas de hash do pandas
+        candidates = np.flatnonzero(((row_hashes >> np.uint64(40)) & mask) == mask) + 1
+
+        bounds = []
+        start = 0
+        for end in list(candidates) + [len(row_hashes)]:
+            while end - start > VersionService.MAX_BLOCK_ROWS:
+                bounds.append((start, start + VersionService.MAX_BLOCK_ROWS))
+                start += VersionService.MAX_BLOCK_ROWS
+            if end - start >= VersionService.MIN_BLOCK_ROWS or (end == len(row_hashes) and end > start):
+                bounds.append((start, int(end)))
+                start = int(end)
+        return bounds
+
+    @staticmethod
+    def split_blocks(df: pd.DataFrame) -> List[Tuple[str, int, int]]:
+        """Divide a planilha em blocos: (hash do conteúdo, início, fim)"""
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        header = "|".join(str(column) for column in df.columns).encode()
+
+        blocks = []
+        for start, end in VersionService.block_bounds(row_hashes):
+            digest = hashlib.blake2b(header, digest_size=16)
+            digest.update(row_hashes[start:end].tobytes())
+            blocks.append((digest.hexdigest(), start, end))
+        return blocks
+
+    @staticmethod
+    def serialize_blocks(df: pd.DataFrame, blocks: List[Tuple[str, int, int]]) -> Dict[str, bytes]:
+        """CSV comprimido de cada bloco
+
+        As linhas dos blocos são convertidas em uma única chamada a to_csv e cortadas por
+        linha; se algum valor tiver quebra de linha (o corte não bate), cada bloco é
+        convertido separadamente.
+        """
+        if not blocks:
+            return {}
+
+        positions = np.concatenate([np.arange(start, end) for _, start, end in blocks])
+        header, *lines = df.iloc[positions].to_csv(index=False, lineterminator="\n").split("\n")[:-1]
+        if len(lines) != len(positions):
+            return {
+                digest: zlib.compress(df.iloc[start:end].to_csv(index=False, lineterminator="\n").encode("utf-8"))
+                for digest, start, end in blocks
+            }
+
+        contents = {}
+        offset = 0
+        for digest, start, end in blocks:
+            rows = lines[offset:offset + end - start]
+            offset += end - start
+            contents[digest] = zlib.compress("\n".join([header, *rows, ""]).encode("utf-8"))
+        return contents
+
+    @staticmethod
+    def _existing_hashes(connection, hashes: List[str]) -> set:
+        table = BlocoLinhas.__table__
+        existing = set()
+        for i in range(0, len(hashes), VersionService.QUERY_CHUNK):
+            chunk = hashes[i:i + VersionService.QUERY_CHUNK]
+            existing.update(connection.execute(select(table.c.hash).where(table.c.hash.in_(chunk))).scalars())
+        return existing
+
+    @staticmethod
+    @TelemetryService.timed("versao_dataset")
+    def record(biometria_df: Optional[pd.DataFrame], racao_df: Optional[pd.DataFrame],
+               origem: str = "planilhas") -> Optional[Dict[str, Any]]:
+        """Grava a carga como nova versão, com os blocos ainda inexistentes no banco
+
+        Retorna o resumo da versão (id, nova, linhas, blocos e linhas novas) ou None se
+        não houver planilhas. Uma carga idêntica à última versão retorna essa versão.
+        """
+        frames = dict(zip(VersionService.SHEETS, (biometria_df, racao_df)))
+        if all(df is None or df.empty for df in frames.values()):
+            return None
+
+        VersionService.ensure_schema()
+        refs: Dict[str, Optional[List[str]]] = {}
+        blocks: Dict[str, List[Tuple[str, int, int]]] = {}
+        for sheet, df in frames.items():
+            if df is None or df.empty:
+                refs[sheet] = None
+                continue
+            blocks[sheet] = VersionService.split_blocks(df)
+            refs[sheet] = [digest for digest, _, _ in blocks[sheet]]
+
+        fingerprint = hashlib.blake2b(json.dumps(refs, sort_keys=True).encode(), digest_size=16).hexdigest()
+        versions, block_table = VersaoDataset.__table__, BlocoLinhas.__table__
+        engine = rx.Model.get_db_engine()
+
+        with engine.begin() as connection:
+            latest = connection.execute(
+                select(versions.c.id, versions.c.impressao).order_by(versions.c.id.desc()).limit(1)
+            ).first()
+            if latest is not None and latest.impressao == fingerprint:
+                return {"id": latest.id, "nova": False, "blocos_novos": 0, "linhas_novas": 0}
+
+            existing = VersionService._existing_hashes(
+                connection, list({digest for hashes in refs.values() if hashes for digest in hashes})
+            )
+            new_blocks = []
+            for sheet, sheet_blocks in blocks.items():
+                # Cada bloco novo uma única vez, mesmo que se repita na carga
+                pending = {digest: (digest, start, end) for digest, start, end in sheet_blocks
+                           if digest not in existing}
+                existing.update(pending)
+                contents = VersionService.serialize_blocks(frames[sheet], list(pending.values()))
+                new_blocks.extend(
+                    {"hash": digest, "linhas": end - start, "conteudo": contents[digest]}
+                    for digest, start, end in pending.values()
+                )
+            if new_blocks:
+                statement = insert(block_table)
+                # Outro worker pode ter gravado o mesmo bloco entre a consulta e a inserção
+                if engine.dialect.name == "sqlite":
+                    statement = statement.prefix_with("OR IGNORE")
+                connection.execute(statement, new_blocks)
+
+            summary = {
+                "blocos_novos": len(new_blocks),
+                "linhas_novas": sum(block["linhas"] for block in new_blocks),
+            }
+            version_id = connection.execute(insert(versions).values(
+                criada_em=dt.datetime.now(), origem=origem, impressao=fingerprint,
+                biometria_blocos=json.dumps(refs["biometria"]) if refs["biometria"] is not None else None,
+                racao_blocos=json.dumps(refs["racao"]) if refs["racao"] is not None else None,
+                biometria_linhas=len(biometria_df) if refs["biometria"] is not None else 0,
+                racao_linhas=len(racao_df) if refs["racao"] is not None else 0,
+                biometria_tipos=VersionService.column_types(biometria_df),
+                racao_tipos=VersionService.column_types(racao_df),
+                **summary
+            )).inserted_primary_key[0]
+
+        TelemetryService.rows("versao_dataset", summary["linhas_novas"])
+        return {"id": version_id, "nova": True, **summary}
+
+    @staticmethod
+    def history(limit: int = HISTORY_LIMIT) -> List[Dict[str, Any]]:
+        """Versões mais recentes primeiro: id, data, origem, linhas e linhas novas"""
+        VersionService.ensure_schema()
+        table = VersaoDataset.__table__
+        query = select(
+            table.c.id, table.c.criada_em, table.c.origem, table.c.biometria_linhas, table.c.racao_linhas,
+            table.c.blocos_novos, table.c.linhas_novas
+        ).order_by(table.c.id.desc()).limit(limit)
+
+        with rx.Model.get_db_engine().connect() as connection:
+            return [dict(row._mapping) for row in connection.execute(query)]
+
+    @staticmethod
+    def storage() -> Dict[str, int]:
+        """Tamanho do histórico: versões, blocos, linhas únicas e bytes comprimidos"""
+        VersionService.ensure_schema()
+        blocks, versions = BlocoLinhas.__table__, VersaoDataset.__table__
+        with rx.Model.get_db_engine().connect() as connection:
+            count, rows, size = connection.execute(
+                select(func.count(), func.sum(blocks.c.linhas), func.sum(func.length(blocks.c.conteudo)))
+            ).one()
+            version_count = connection.execute(select(func.count()).select_from(versions)).scalar_one()
+        return {"versoes": version_count, "blocos": count, "linhas": rows or 0, "bytes": size or 0}
+
+    @staticmethod
+    def _rebuild(hashes: Optional[List[str]], contents: Dict[str, bytes],
+                 types: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Remonta a planilha: os blocos compartilham o cabeçalho, então o CSV é lido de uma vez
+
+        Com os tipos gravados, cada coluna volta com o tipo da carga; as colunas de texto
+        são lidas como texto e só a célula vazia vira NaN (como "n/a" ou "01" vieram na
+        planilha, assim ficam). Versões sem tipos usam a inferência da planilha inteira.
+        """
+        if not hashes:
+            return None
+
+        parts = []
+        for i, digest in enumerate(hashes):
+            text = zlib.decompress(contents[digest]).decode("utf-8")
+            parts.append(text if i == 0 else text.split("\n", 1)[1])
+        text = StringIO("".join(parts))
+
+        if not types:
+            return pd.read_csv(text)
+        dtypes = {column: str if dtype == "object" else dtype for column, dtype in json.loads(types).items()}
+        return pd.read_csv(text, dtype=dtypes, keep_default_na=False, na_values=[""])
+
+    @staticmethod
+    def load(version_id: int) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """Planilhas de uma versão, remontadas a partir dos blocos gravados (mantidas em cache)"""
+        cached = VersionService._versions.get(version_id)
+        if cached is not None:
+            return cached
+
+        VersionService.ensure_schema()
+        versions, blocks = VersaoDataset.__table__, BlocoLinhas.__table__
+        with TelemetryService.span("versao_leitura"), rx.Model.get_db_engine().connect() as connection:
+            row = connection.execute(
+                select(versions.c.biometria_blocos, versions.c.racao_blocos, versions.c.biometria_tipos,
+                       versions.c.racao_tipos).where(versions.c.id == version_id)
+            ).first()
+            if row is None:
+                raise KeyError(f"Versão {version_id} não encontrada")
+
+            refs = [json.loads(value) if value else None for value in (row.biometria_blocos, row.racao_blocos)]
+            needed = sorted({digest for hashes in refs if hashes for digest in hashes})
+            contents: Dict[str, bytes] = {}
+            for i in range(0, len(needed), VersionService.QUERY_CHUNK):
+                chunk = needed[i:i + VersionService.QUERY_CHUNK]
+                contents.update(connection.execute(
+                    select(blocks.c.hash, blocks.c.conteudo).where(blocks.c.hash.in_(chunk))
+                ).all())
+
+            frames = (VersionService._rebuild(refs[0], contents, row.biometria_tipos),
+                      VersionService._rebuild(refs[1], contents, row.racao_tipos))
+
+        VersionService._versions.put(version_id, frames)
+        return frames
@@ -0,0 +1,211 @@
+"""Gerador determinístico de planilhas sintéticas de biometria e ração para os benchmarks.
+
+A mesma configuração (incluindo a semente) gera sempre os mesmos dados. É possível
+variar a quantidade de tanques, de dias, de peixes medidos por biometria, a mistura
+de formatos de data e a fração de valores sujos (datas inválidas, tanque ausente,
+medições não numéricas ou fora da faixa e linhas de ração repetidas).
+
+Com --check, as planilhas geradas passam pela validação da carga e o processo termina
+com código 1 se a quarentena não tiver exatamente as linhas sujas injetadas.
+
+Uso: python -m benchmarks.generator --tanks 40 --days 120 --out dados/ [--check]
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from UI_BIA.services.dataset_service import DatasetService
+from UI_BIA.services.validation_service import ValidationService
+
+# Mistura padrão: maioria no formato brasileiro, como nas planilhas reais
+DEFAULT_DATE_MIX = {"%d/%m/%Y": 0.7, "%Y-%m-%d": 0.2, "%d-%m-%Y": 0.1}
+
+
+@dataclass
+class SyntheticConfig:
+    """Parâmetros de uma geração; ``biometry_every`` é o intervalo em dias entre biometrias de um tanque"""
+
+    tanks: int = 20
+    days: int = 90
+    fish_per_biometry: int = 30
+    biometry_every: int = 7
+    date_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_DATE_MIX))
+    dirty_share: float = 0.02
+    start: date = date(2024, 1, 1)
+    seed: int = 42
+
+
+class SyntheticData:
+    """Planilhas no mesmo formato do Google Sheets (todas as colunas em texto, como no CSV exportado)"""
+
+    # Valores sujos injetados em cada tipo de coluna
+    DIRTY_DATES = ["", "31/02/2024", "sem data", "2024-13-01"]
+    DIRTY_NUMBERS = ["", "n/a", "-", "12,5,3", "abc"]
+
+    @staticmethod
+    def out_of_range(column: str) -> list:
+        """Valores fora da faixa aceita pela validação para a coluna: abaixo do mínimo e acima do máximo"""
+        low, high = ValidationService.RANGES[column]
+        return [f"{low:g}", f"{low - 3.5:g}", f"{high * 10:.0f}"]
+
+    @staticmethod
+    def dirty_values(sheet: str) -> Dict[str, list]:
+        """Valores sujos que podem ser injetados em cada coluna da planilha"""
+        if sheet == "biometria":
+            return {
+                "data": SyntheticData.DIRTY_DATES,
+                "tanque": [""],
+                "largura": SyntheticData.DIRTY_NUMBERS,
+                "altura": SyntheticData.out_of_range("altura"),
+            }
+        return {
+            "data": SyntheticData.DIRTY_DATES,
+            "peso": SyntheticData.DIRTY_NUMBERS + SyntheticData.out_of_range("peso"),
+        }
+
+    @staticmethod
+    def _dates(rng: np.random.Generator, days: np.ndarray, config: SyntheticConfig) -> np.ndarray:
+        """Datas dos dias (deslocamento a partir do início), cada uma em um formato sorteado da mistura"""
+        formats = [fmt for fmt in config.date_mix if fmt in DatasetService.DATE_FORMATS]
+        weights = np.array([config.date_mix[fmt] for fmt in formats], dtype=float)
+        choice = rng.choice(len(formats), size=len(days), p=weights / weights.sum())
+
+        # Formata cada par (dia, formato) distinto uma única vez
+        calendar = [config.start + timedelta(days=int(offset)) for offset in range(config.days)]
+        table = np.array([[day.strftime(fmt) for fmt in formats] for day in calendar], dtype=object)
+        return table[days, choice]
+
+    @staticmethod
+    def _dirty(rng: np.random.Generator, values: np.ndarray, share: float, candidates) -> np.ndarray:
+        """Substitui uma fração dos valores por valores sujos sorteados"""
+        if share <= 0:
+            return values
+        mask = rng.random(len(values)) < share
+        values = values.copy()
+        values[mask] = rng.choice(np.array(candidates, dtype=object), size=int(mask.sum()))
+        return values
+
+    @staticmethod
+    def biometria(config: SyntheticConfig) -> pd.DataFrame:
+        """Planilha de biometria: ``fish_per_biometry`` peixes por tanque a cada ``biometry_every`` dias"""
+        rng = np.random.default_rng([config.seed, 1])
+        tank_ids = np.arange(1, config.tanks + 1)
+        biometry_days = np.arange(0, config.days, max(config.biometry_every, 1))
+
+        tanks = np.repeat(np.tile(tank_ids, len(biometry_days)), config.fish_per_biometry)
+        days = np.repeat(np.repeat(biometry_days, config.tanks), config.fish_per_biometry)
+
+        # Crescimento linear com ritmo próprio por tanque, mais variação individual
+        growth = rng.uniform(0.05, 0.15, size=config.tanks + 1)[tanks]
+        largura = np.round(3.0 + growth * days + rng.normal(0, 0.4, size=len(days)).clip(-2, 2), 2)
+        altura = np.round(1.5 + growth * days / 2 + rng.normal(0, 0.2, size=len(days)).clip(-1, 1), 2)
+
+        share = config.dirty_share / 4
+        dirty = SyntheticData.dirty_values("biometria")
+        return pd.DataFrame({
+            "data": SyntheticData._dirty(rng, SyntheticData._dates(rng, days, config), share, dirty["data"]),
+            "tanque": SyntheticData._dirty(rng, tanks.astype(str).astype(object), share, dirty["tanque"]),
+            "largura": SyntheticData._dirty(rng, largura.astype(str).astype(object), share, dirty["largura"]),
+            "altura": SyntheticData._dirty(rng, altura.astype(str).astype(object), share, dirty["altura"]),
+        })
+
+    @staticmethod
+    def racao(config: SyntheticConfig) -> pd.DataFrame:
+        """Planilha de ração: um lançamento por tanque por dia, com alguns lançamentos repetidos"""
+        rng = np.random.default_rng([config.seed, 2])
+        tanks = np.tile(np.arange(1, config.tanks + 1), config.days)
+        days = np.repeat(np.arange(config.days), config.tanks)
+
+        peso = np.round(rng.uniform(0.5, 1.5, size=len(days)) * (50 + days * 2.5), 1)
+        dirty = SyntheticData.dirty_values("racao")
+        df = pd.DataFrame({
+            "data": SyntheticData._dirty(rng, SyntheticData._dates(rng, days, config), config.dirty_share / 3,
+                                         dirty["data"]),
+            "tanque": tanks.astype(str).astype(object),
+            "peso": SyntheticData._dirty(rng, peso.astype(str).astype(object), config.dirty_share / 3,
+                                         dirty["peso"]),
+        })
+
+        # Lançamentos digitados duas vezes (vão para a quarentena como duplicados)
+        repeated = rng.random(len(df)) < config.dirty_share / 3
+        if repeated.any():
+            df = pd.concat([df, df[repeated]]).sort_index(kind="stable").reset_index(drop=True)
+        return df
+
+    @staticmethod
+    def sheets(config: SyntheticConfig) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Biometria e ração da configuração"""
+        return SyntheticData.biometria(config), SyntheticData.racao(config)
+
+    @staticmethod
+    def injected_rows(df: pd.DataFrame, sheet: str) -> int:
+        """Linhas com algum valor sujo injetado (e, na ração, os lançamentos repetidos)
+
+        Os valores limpos gerados nunca coincidem com os sujos, então basta procurá-los.
+        """
+        dirty = pd.Series(False, index=df.index)
+        for column, values in SyntheticData.dirty_values(sheet).items():
+            dirty |= df[column].isin(values)
+        if ValidationService.QUARANTINE_DUPLICATES[sheet]:
+            dirty |= df.duplicated(keep="first")
+        return int(dirty.sum())
+
+    @staticmethod
+    def check_quarantine(config: SyntheticConfig) -> Dict[str, Tuple[int, int]]:
+        """Linhas sujas injetadas e linhas em quarentena na validação, por planilha"""
+        frames = dict(zip(("biometria", "racao"), SyntheticData.sheets(config)))
+        results = ValidationService.validate_sheets(frames["biometria"], frames["racao"])
+        return {
+            sheet: (SyntheticData.injected_rows(df, sheet), int(results[sheet].totals["quarentena"]))
+            for sheet, df in frames.items()
+        }
+
+    @staticmethod
+    def to_csv(df: pd.DataFrame) -> str:
+        """CSV igual ao da exportação do Sheets"""
+        return df.to_csv(index=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas de biometria e ração em CSV")
+    parser.add_argument("--tanks", type=int, default=SyntheticConfig.tanks)
+    parser.add_argument("--days", type=int, default=SyntheticConfig.days)
+    parser.add_argument("--fish", type=int, default=SyntheticConfig.fish_per_biometry,
+                        help="Peixes medidos por biometria")
+    parser.add_argument("--dirty", type=float, default=SyntheticConfig.dirty_share,
+                        help="Fração de valores sujos (0 a 1)")
+    parser.add_argument("--seed", type=int, default=SyntheticConfig.seed)
+    parser.add_argument("--out", default=".", help="Diretório de saída")
+    parser.add_argument("--check", action="store_true",
+                        help="Só confere se a validação põe em quarentena exatamente as linhas sujas")
+    args = parser.parse_args()
+
+    config = SyntheticConfig(tanks=args.tanks, days=args.days, fish_per_biometry=args.fish,
+                             dirty_share=args.dirty, seed=args.seed)
+
+    if args.check:
+        counts = SyntheticData.check_quarantine(config)
+        for sheet, (injected, quarantined) in counts.items():
+            print(f"{sheet}: {injected} linhas sujas injetadas, {quarantined} em quarentena")
+        if any(injected != quarantined for injected, quarantined in counts.values()):
+            sys.exit(1)
+        return
+
+    biometria_df, racao_df = SyntheticData.sheets(config)
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, df in (("biometria", biometria_df), ("racao", racao_df)):
+        path = os.path.join(args.out, f"{name}.csv")
+        df.to_csv(path, index=False)
+        print(f"{path}: {len(df)} linhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Tempo de importação do backend (cold start), medido com ``python -X importtime``.
+
+Cada rodada importa o módulo do app em um processo novo e lê o relatório do
+interpretador: tempo total da importação, tempo próprio de cada módulo agrupado por
+origem (projeto, reflex, pandas/numpy, banco, requests, demais) e os módulos do projeto
+mais caros. A referência é um app Reflex mínimo (um State e o rx.App), que mostra
+quanto do cold start vem do framework e quanto é do projeto.
+
+Como em benchmarks.run, o resultado pode ser gravado como linha de base e comparado
+com ela; o processo termina com código 1 se o total ou a parte do projeto piorarem
+além da tolerância.
+
+Uso: python -m benchmarks.import_time [--runs 5] [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.run import environment, load_baseline, save_json
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_baseline.json")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGET = "import UI_BIA.UI_BIA"
+REFERENCE = "import reflex as rx\nclass Referencia(rx.State):\n    valor: int = 0\napp = rx.App()\n"
+
+# Pacote de topo -> grupo do relatório
+GROUPS = {
+    "UI_BIA": "projeto",
+    "reflex": "reflex",
+    "pandas": "pandas/numpy", "numpy": "pandas/numpy",
+    "sqlalchemy": "banco", "sqlmodel": "banco", "alembic": "banco", "mako": "banco",
+    "requests": "requests", "urllib3": "requests", "charset_normalizer": "requests", "idna": "requests",
+    "certifi": "requests",
+}
+
+# Diferença absoluta abaixo da qual uma piora é ruído
+MIN_SECONDS = 0.02
+
+
+def import_profile(code: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """Executa o código em um processo novo; devolve o tempo de parede e (módulo, próprio, acumulado) em µs"""
+    began = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - began
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return wall, modules
+
+
+def summarize(wall: float, modules: List[Tuple[str, int, int]]) -> Dict:
+    """Total, grupos e módulos do projeto de uma rodada, em segundos"""
+    groups: Dict[str, int] = {}
+    project = []
+    for name, own, _ in modules:
+        group = GROUPS.get(name.split(".")[0], "outros")
+        groups[group] = groups.get(group, 0) + own
+        if group == "projeto":
+            project.append((name, own))
+
+    return {
+        "parede_s": wall,
+        "importacao_s": sum(own for _, own, _ in modules) / 1e6,
+        "grupos": {group: value / 1e6 for group, value in groups.items()},
+        "projeto": {name: own / 1e6 for name, own in project},
+    }
+
+
+def measure(code: str, runs: int) -> Dict:
+    """Mediana de ``runs`` processos novos (a primeira execução só aquece o cache de disco)"""
+    import_profile(code)
+    samples = [summarize(*import_profile(code)) for _ in range(runs)]
+
+    def median(values):
+        return round(statistics.median(values), 4)
+
+    groups = sorted({group for sample in samples for group in sample["grupos"]})
+    modules = sorted({name for sample in samples for name in sample["projeto"]})
+    return {
+        "parede_s": median([s["parede_s"] for s in samples]),
+        "importacao_s": median([s["importacao_s"] for s in samples]),
+        "grupos": {group: median([s["grupos"].get(group, 0.0) for s in samples]) for group in groups},
+        "projeto": dict(sorted(
+            ((name, median([s["projeto"].get(name, 0.0) for s in samples])) for name in modules),
+            key=lambda item: -item[1]
+        )),
+    }
+
+
+def report(target: Dict, reference: Dict) -> Dict:
+    """Resultado do app, da referência e a parte do cold start que cabe ao projeto"""
+    return {
+        "app": target,
+        "referencia": reference,
+        "excedente_s": round(target["importacao_s"] - reference["importacao_s"], 4),
+    }
+
+
+def print_report(result: Dict) -> None:
+    app, reference = result["app"], result["referencia"]
+    print(f"{'':<16} {'app':>10} {'referência':>12}")
+    print(f"{'parede':<16} {app['parede_s']:>9.3f}s {reference['parede_s']:>11.3f}s")
+    print(f"{'importação':<16} {app['importacao_s']:>9.3f}s {reference['importacao_s']:>11.3f}s")
+    for group in sorted(set(app["grupos"]) | set(reference["grupos"])):
+        print(f"  {group:<14} {app['grupos'].get(group, 0.0):>9.3f}s {reference['grupos'].get(group, 0.0):>11.3f}s")
+    print(f"excedente do projeto sobre a referência: {result['excedente_s']:.3f}s")
+    print("módulos do projeto mais caros (tempo próprio):")
+    for name, value in list(app["projeto"].items())[:10]:
+        print(f"  {name:<44} {value * 1000:>7.1f} ms")
+
+
+def compare(result: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Pioras do total e do tempo próprio do projeto além da tolerância"""
+    regressions = []
+    checks = (
+        ("importação total", result["app"]["importacao_s"], baseline["app"]["importacao_s"]),
+        ("módulos do projeto", result["app"]["grupos"].get("projeto", 0.0),
+         baseline["app"]["grupos"].get("projeto", 0.0)),
+    )
+    for label, after, before in checks:
+        if after > before * (1 + threshold) and after - before > MIN_SECONDS:
+            regressions.append(f"{label}: {before:.3f}s -> {after:.3f}s (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tempo de importação do backend (python -X importtime)")
+    parser.add_argument("--runs", type=int, default=5, help="Processos medidos (mediana)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Tolerância sobre a linha de base")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Arquivo da linha de base")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado como nova linha de base")
+    args = parser.parse_args()
+
+    runs = max(args.runs, 1)
+    result = report(measure(TARGET, runs), measure(REFERENCE, runs))
+    print_report(result)
+
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and not args.save_baseline:
+        before, after = baseline["resultado"]["app"]["importacao_s"], result["app"]["importacao_s"]
+        print(f"linha de base: importação {before:.3f}s -> {after:.3f}s ({(after / before - 1) * 100:+.0f}%)")
+
+    if args.save_baseline:
+        save_json(args.baseline, {"ambiente": environment(), "resultado": result})
+        print(f"Linha de base gravada em {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"Sem linha de base em {args.baseline}; use --save-baseline para criá-la")
+        return 0
+
+    regressions = compare(result, baseline["resultado"], args.threshold)
+    if regressions:
+        print(f"Regressões acima de {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Teste de carga: várias sessões simuladas do dashboard contra um backend, sem rede externa.
+
+Sobe o servidor local que imita o Google Sheets (tools.sheets_standin) com planilhas
+sintéticas (benchmarks.generator) e conduz N sessões do State pelo mesmo caminho de
+um usuário: carga das planilhas, abertura do dashboard e recálculos com períodos
+aleatórios, com pausas de "pensamento" entre as ações.
+
+As sessões rodam como tarefas de um único event loop, e os event handlers síncronos
+são chamados diretamente, como o Reflex faz em um worker: enquanto um handler roda,
+as demais sessões esperam. A latência de cada ação é medida a partir do instante em
+que ela deveria começar (fim da pausa), então inclui o tempo na fila do worker.
+
+O banco de persistência é um SQLite temporário (REFLEX_DB_URL), para não misturar os
+dados sintéticos com o reflex.db do projeto.
+
+Com --local, as planilhas são gravadas como arquivos CSV (a biometria em um diretório,
+um arquivo por dia) e lidas pela fonte local, sem o servidor.
+
+Uso: python -m benchmarks.load_test --sessions 20 --recalcs 5 --tanks 40 --days 180 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import SyntheticConfig, SyntheticData
+
+
+def rss_mb() -> float:
+    """Memória residente atual do processo (pico, se /proc não estiver disponível)"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50, p95, p99 e máximo, em milissegundos"""
+    if not values:
+        return {"n": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "n": len(values),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+
+class LoadTest:
+    """Sessões simuladas do dashboard e as medições de latência e memória"""
+
+    def __init__(self, config: SyntheticConfig, sessions: int, recalcs: int, think: float, ramp: float,
+                 seed: int):
+        self.config = config
+        self.sessions = sessions
+        self.recalcs = recalcs
+        self.think = think
+        self.ramp = ramp
+        self.seed = seed
+        self.latencies: Dict[str, List[float]] = {"carga": [], "dashboard": [], "recalculo": []}
+        self.errors: List[str] = []
+        self.session_bytes: List[int] = []
+        # Sessões mantidas vivas até o fim, para que o RSS final inclua os dados de todas
+        self.states: List = []
+
+    def new_state(self, token: str):
+        """State de uma sessão, dentro de um estado raiz próprio (com o token da sessão no router)"""
+        import reflex as rx
+        from UI_BIA.UI_BIA import State
+
+        root = rx.State(_reflex_internal_init=True)
+        root.router = dataclasses.replace(
+            root.router, session=dataclasses.replace(root.router.session, client_token=token)
+        )
+        return root.substates[State.get_name()]
+
+    def random_period(self, rng: random.Random) -> tuple:
+        """Período aleatório dentro da série gerada (de uma semana até a série inteira)"""
+        length = rng.randint(min(7, self.config.days), self.config.days)
+        offset = rng.randint(0, self.config.days - length)
+        start = self.config.start + timedelta(days=offset)
+        end = start + timedelta(days=length - 1)
+        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+    async def act(self, name: str, delay: float, action: Callable[[], object], state) -> None:
+        """Espera a pausa e executa a ação; a latência conta a partir do fim previsto da pausa"""
+        due = time.perf_counter() + delay
+        await asyncio.sleep(delay)
+        try:
+            action()
+        except Exception as e:
+            self.errors.append(f"{name}: {e}")
+        else:
+            if state.load_message.startswith("Erro"):
+                self.errors.append(f"{name}: {state.load_message}")
+        self.latencies[name].append(time.perf_counter() - due)
+
+    async def session(self, index: int) -> None:
+        rng = random.Random(self.seed * 1_000 + index)
+        state = self.new_state(f"carga-{index}")
+
+        await self.act("carga", rng.uniform(0, self.ramp), state.load_sheets_data, state)
+        await self.act("dashboard", rng.expovariate(1 / self.think), state.toggle_dashboard, state)
+
+        for _ in range(self.recalcs):
+            start_date, end_date = self.random_period(rng)
+
+            def recalculate():
+                state.start_date, state.end_date = start_date, end_date
+                state.recalculate_metrics()
+
+            await self.act("recalculo", rng.expovariate(1 / self.think), recalculate, state)
+
+        # Dados mantidos pela sessão (no modo compartilhado ficam no dataset mapeado, fora da sessão)
+        frames = [state._biometria_df, state._racao_df, state._biometria_typed, state._racao_typed]
+        self.session_bytes.append(sum(int(df.memory_usage(deep=True).sum()) for df in frames if df is not None))
+        self.states.append(state)
+
+    async def run(self) -> Dict:
+        rss_before = rss_mb()
+        began = time.perf_counter()
+        await asyncio.gather(*(self.session(i) for i in range(self.sessions)))
+        elapsed = time.perf_counter() - began
+        rss_after = rss_mb()
+
+        actions = sum(len(values) for values in self.latencies.values())
+        return {
+            "sessoes": self.sessions,
+            "acoes": actions,
+            "duracao_s": round(elapsed, 2),
+            "vazao_acoes_s": round(actions / elapsed, 2) if elapsed else 0.0,
+            "latencia": {
+                **{name: percentiles(values) for name, values in self.latencies.items()},
+                "todas": percentiles([value for values in self.latencies.values() for value in values]),
+            },
+            "memoria": {
+                "rss_inicial_mb": round(rss_before, 1),
+                "rss_final_mb": round(rss_after, 1),
+                "rss_por_sessao_mb": round((rss_after - rss_before) / max(self.sessions, 1), 2),
+                "dados_por_sessao_mb": round(statistics.mean(self.session_bytes) / 1_048_576, 2)
+                if self.session_bytes else 0.0,
+            },
+            "erros": len(self.errors),
+        }
+
+
+def write_local_files(workdir: str, biometria_df: pd.DataFrame, racao_df: pd.DataFrame) -> Tuple[str, str]:
+    """Grava as planilhas como uma fonte local: diretório com um CSV por dia de biometria e um CSV de ração"""
+    directory = os.path.join(workdir, "biometria")
+    os.makedirs(directory, exist_ok=True)
+    for i, (_, rows) in enumerate(biometria_df.groupby("data", sort=False, dropna=False)):
+        rows.to_csv(os.path.join(directory, f"{i:05d}.csv"), index=False)
+
+    racao_path = os.path.join(workdir, "racao.csv")
+    racao_df.to_csv(racao_path, index=False)
+    return directory, racao_path
+
+
+def print_report(report: Dict) -> None:
+    print(f"{report['sessoes']} sessões, {report['acoes']} ações em {report['duracao_s']} s "
+          f"({report['vazao_acoes_s']} ações/s)")
+    print(f"{'ação':<12} {'n':>5} {'p50':>10} {'p95':>10} {'p99':>10} {'máx':>10}")
+    for name, stats in report["latencia"].items():
+        if not stats.get("n"):
+            continue
+        print(f"{name:<12} {stats['n']:>5} {stats['p50_ms']:>8.1f}ms {stats['p95_ms']:>8.1f}ms "
+              f"{stats['p99_ms']:>8.1f}ms {stats['max_ms']:>8.1f}ms")
+    memory = report["memoria"]
+    print(f"memória: RSS {memory['rss_inicial_mb']} -> {memory['rss_final_mb']} MB "
+          f"({memory['rss_por_sessao_mb']} MB/sessão), dados da sessão {memory['dados_por_sessao_mb']} MB")
+    if report["erros"]:
+        print(f"{report['erros']} ações com erro")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simuladas do dashboard")
+    parser.add_argument("--sessions", type=int, default=10, help="Sessões simultâneas")
+    parser.add_argument("--recalcs", type=int, default=5, help="Recálculos com período aleatório por sessão")
+    parser.add_argument("--think", type=float, default=0.5, help="Pausa média entre ações, em segundos")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Intervalo em que as sessões começam, em segundos")
+    parser.add_argument("--tanks", type=int, default=20)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--fish", type=int, default=30, help="Peixes medidos por biometria")
+    parser.add_argument("--dirty", type=float, default=0.02, help="Fração de valores sujos")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso do servidor de planilhas, em segundos")
+    parser.add_argument("--local", action="store_true", help="Lê as planilhas de arquivos CSV locais, sem o servidor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ui_bia_carga_")
+    os.environ.setdefault("REFLEX_DB_URL", f"sqlite:///{os.path.join(workdir, 'carga.db')}")
+
+    # Importa o app antes da medição, para que o RSS inicial já inclua os módulos carregados
+    import UI_BIA.UI_BIA  # noqa: F401
+    from tools.sheets_standin import SheetsStandIn
+
+    config = SyntheticConfig(tanks=args.tanks, days=args.days, fish_per_biometry=args.fish,
+                             dirty_share=args.dirty, seed=args.seed)
+    biometria_df, racao_df = SyntheticData.sheets(config)
+    print(f"Planilhas sintéticas: biometria {len(biometria_df)} linhas, ração {len(racao_df)} linhas")
+
+    with contextlib.ExitStack() as stack:
+        standin = None
+        if args.local:
+            biometria_url, racao_url = write_local_files(workdir, biometria_df, racao_df)
+        else:
+            standin = stack.enter_context(
+                SheetsStandIn({"biometria": biometria_df, "racao": racao_df}, latency=args.latency)
+            )
+            biometria_url, racao_url = standin.url("biometria"), standin.url("racao")
+
+        sources = os.path.join(workdir, "fontes.json")
+        with open(sources, "w", encoding="utf-8") as file:
+            json.dump([{"farm": "carga", "biometria_url": biometria_url, "racao_url": racao_url}], file)
+        os.environ["UI_BIA_SOURCES"] = sources
+
+        test = LoadTest(config, args.sessions, args.recalcs, args.think, args.ramp, args.seed)
+        report = asyncio.run(test.run())
+        report["planilhas"] = {"biometria": len(biometria_df), "racao": len(racao_df),
+                               "origem": "local" if args.local else "servidor",
+                               "requisicoes": len(standin.requests) if standin is not None else 0,
+                               "latencia_s": args.latency}
+
+    print_report(report)
+    for error in test.errors[:5]:
+        print(f"  {error}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    return 1 if report["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Benchmarks do pipeline de métricas: leitura do CSV, validação, filtro por período e cálculos.
+
+Cada etapa é medida em vários tamanhos de planilha sintética (benchmarks.generator):
+tempo (melhor de N repetições) e pico de memória (tracemalloc, em uma execução à parte,
+para não distorcer o tempo). O tamanho "tanques_10k" mede só a projeção de crescimento
+(ForecastService), que ajusta todos os tanques de uma vez; as demais etapas percorrem os
+tanques um a um e ficam nos outros tamanhos. O resultado é comparado com a linha de base
+salva em benchmarks/baseline.json; etapas acima do limite de tolerância são marcadas como
+regressão e o processo termina com código 1.
+
+A linha de base depende da máquina: gere-a de novo (--save-baseline) no ambiente
+em que a comparação vai rodar.
+
+Uso: python -m benchmarks.run [--sizes pequeno,medio,tanques_10k] [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from UI_BIA.services.dataset_service import DatasetService
+from UI_BIA.services.forecast_service import ForecastService
+from UI_BIA.services.metrics_service import MetricsService
+from UI_BIA.services.sheets_service import SheetsService
+from UI_BIA.services.validation_service import ValidationService
+from benchmarks.generator import SyntheticConfig, SyntheticData
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Tamanhos do benchmark (linhas de biometria ≈ tanques × biometrias × peixes)
+SIZES = {
+    "pequeno": SyntheticConfig(tanks=10, days=60, fish_per_biometry=20),
+    "medio": SyntheticConfig(tanks=40, days=180, fish_per_biometry=30),
+    "grande": SyntheticConfig(tanks=100, days=365, fish_per_biometry=50),
+    "tanques_10k": SyntheticConfig(tanks=10_000, days=90, fish_per_biometry=3),
+}
+DEFAULT_SIZES = ["pequeno", "medio", "tanques_10k"]
+
+# Área média alvo da projeção (as áreas sintéticas passam de ~5 a ~70 em 90 dias)
+FORECAST_TARGET_AREA = 100.0
+
+# Diferenças absolutas abaixo destes valores são ruído e nunca contam como regressão
+MIN_SECONDS = 0.005
+MIN_MEGABYTES = 0.5
+
+
+def _period(config: SyntheticConfig) -> tuple:
+    """Período do meio da série (metade dos dias), no formato do seletor de datas do dashboard"""
+    start = config.start + timedelta(days=config.days // 4)
+    end = config.start + timedelta(days=config.days * 3 // 4)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def build_cases(config: SyntheticConfig) -> Dict[str, Callable[[], object]]:
+    """Etapas medidas para um tamanho, cada uma já com os dados de entrada prontos"""
+    biometria_raw, racao_raw = SyntheticData.sheets(config)
+    biometria_csv = SyntheticData.to_csv(biometria_raw)
+    racao_csv = SyntheticData.to_csv(racao_raw)
+
+    # As métricas recebem as linhas limpas da validação, como no dashboard
+    biometria_df = ValidationService.validate(biometria_raw, "biometria").clean
+    racao_df = ValidationService.validate(racao_raw, "racao").clean
+    start_date, end_date = _period(config)
+
+    return {
+        "leitura_csv": lambda: (SheetsService.parse_csv(biometria_csv), SheetsService.parse_csv(racao_csv)),
+        "validacao": lambda: ValidationService.validate_sheets(biometria_raw, racao_raw),
+        "filter_data_by_date": lambda: MetricsService.filter_data_by_date(biometria_df, start_date, end_date),
+        "calculate_biometry_metrics": lambda: MetricsService.calculate_biometry_metrics(
+            biometria_df, start_date, end_date),
+        "calculate_feed_metrics": lambda: MetricsService.calculate_feed_metrics(racao_df, start_date, end_date),
+        "calculate_temporal_correlation": lambda: MetricsService.calculate_temporal_correlation(
+            biometria_df, racao_df, start_date, end_date),
+    }
+
+
+def build_forecast_cases(config: SyntheticConfig) -> Dict[str, Callable[[], object]]:
+    """Projeção de crescimento de todos os tanques e a conversão para as colunas do State"""
+    biometria_df = ValidationService.validate(SyntheticData.biometria(config), "biometria").clean
+    biometria_typed = DatasetService.prepare_biometry(biometria_df)
+    result = ForecastService.project(biometria_typed, FORECAST_TARGET_AREA)
+
+    return {
+        "forecast_project": lambda: ForecastService.project(biometria_typed, FORECAST_TARGET_AREA),
+        "forecast_to_columns": lambda: ForecastService.to_columns(result),
+    }
+
+
+# Etapas medidas em cada tamanho (build_cases nos que não aparecem aqui)
+CASE_BUILDERS = {"tanques_10k": build_forecast_cases}
+
+
+def measure(func: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """Melhor tempo e mediana de ``repeats`` execuções e pico de memória de uma execução extra"""
+    timings = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - began)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "tempo_s": round(min(timings), 6),
+        "tempo_mediano_s": round(statistics.median(timings), 6),
+        "memoria_mb": round(peak / 1_048_576, 3),
+    }
+
+
+def run_suite(sizes: List[str], repeats: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Mede todas as etapas em cada tamanho"""
+    results = {}
+    for size in sizes:
+        config = SIZES[size]
+        cases = CASE_BUILDERS.get(size, build_cases)(config)
+        results[size] = {}
+        for name, func in cases.items():
+            results[size][name] = measure(func, repeats)
+            print(f"{size:<8} {name:<32} {results[size][name]['tempo_s'] * 1000:>10.1f} ms "
+                  f"{results[size][name]['memoria_mb']:>9.1f} MB")
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Etapas mais lentas ou que usam mais memória que a linha de base além da tolerância"""
+    regressions = []
+    for size, cases in results.items():
+        for name, current in cases.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                continue
+            checks = (("tempo_s", MIN_SECONDS, "tempo"), ("memoria_mb", MIN_MEGABYTES, "memória"))
+            for field, floor, label in checks:
+                before, after = reference[field], current[field]
+                if after > before * (1 + threshold) and after - before > floor:
+                    change = (after / before - 1) * 100 if before else float("inf")
+                    regressions.append(f"{size}/{name}: {label} {before:g} -> {after:g} (+{change:.0f}%)")
+    return regressions
+
+
+def environment() -> Dict[str, str]:
+    """Ambiente da medição, guardado junto da linha de base"""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.machine(),
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_json(path: str, document: Dict) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file, ensure_ascii=False, indent=2)
+        file.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do cálculo de métricas")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help=f"Tamanhos separados por vírgula ({', '.join(SIZES)})")
+    parser.add_argument("--repeats", type=int, default=3, help="Repetições de cada etapa")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Tolerância sobre a linha de base (0.25 = 25%% mais lento)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Arquivo da linha de base")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado como nova linha de base")
+    parser.add_argument("--output", default="", help="Grava o resultado desta execução em JSON")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Tamanhos desconhecidos: {', '.join(unknown)}")
+
+    results = run_suite(sizes, max(args.repeats, 1))
+    document = {"ambiente": environment(), "resultados": results}
+    if args.output:
+        save_json(args.output, document)
+
+    if args.save_baseline:
+        # Mantém os tamanhos que não foram medidos nesta execução
+        previous = load_baseline(args.baseline) or {}
+        document["resultados"] = {**previous.get("resultados", {}), **results}
+        save_json(args.baseline, document)
+        print(f"Linha de base gravada em {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"Sem linha de base em {args.baseline}; use --save-baseline para criá-la")
+        return 0
+
+    regressions = compare(results, baseline.get("resultados", {}), args.threshold)
+    if regressions:
+        print(f"Regressões acima de {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print(f"Sem regressões acima de {args.threshold:.0%} em relação à linha de base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Verificação offline da fonte local: só os arquivos alterados são lidos de novo.
+
+Grava um diretório temporário de CSVs (como as exportações diárias de uma pasta compartilhada),
+carrega a fonte, altera um arquivo e confere que a nova carga lê apenas esse arquivo e
+que o resultado é igual ao de uma leitura completa do diretório.
+
+Uso: python -m tools.check_local_source
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from typing import List
+
+import pandas as pd
+
+from benchmarks.generator import SyntheticConfig, SyntheticData
+from UI_BIA.services.local_source_service import LocalSourceService
+
+FILES = 6
+
+
+def write_files(directory: str) -> List[str]:
+    """Divide a biometria sintética em FILES arquivos CSV consecutivos"""
+    biometria, _ = SyntheticData.sheets(SyntheticConfig(tanks=4, days=FILES * 7, fish_per_biometry=5))
+    paths = []
+    size = -(-len(biometria) // FILES)
+    for i, start in enumerate(range(0, len(biometria), size)):
+        rows = biometria.iloc[start:start + size]
+        path = os.path.join(directory, f"biometria_{i:02d}.csv")
+        rows.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parsed: List[str] = []
+    lock = threading.Lock()
+    read_file = LocalSourceService.read_file
+
+    def counting_read(path: str) -> pd.DataFrame:
+        with lock:
+            parsed.append(path)
+        return read_file(path)
+
+    # Conta as leituras no pool de threads (o pool de processos não enxerga a troca)
+    LocalSourceService.POOL = "thread"
+    LocalSourceService.read_file = staticmethod(counting_read)
+
+    errors = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(directory)
+
+        first = LocalSourceService.load(directory)
+        if sorted(parsed) != sorted(paths):
+            errors.append(f"primeira carga leu {len(parsed)} de {len(paths)} arquivos")
+
+        parsed.clear()
+        LocalSourceService.load(directory)
+        if parsed:
+            errors.append(f"carga sem alterações leu {len(parsed)} arquivos")
+
+        # Acrescenta uma linha a um arquivo (mtime e tamanho mudam)
+        changed = paths[2]
+        with open(changed, "a", encoding="utf-8") as csv_file:
+            csv_file.write("01/01/2024,1,5.0,2.5\n")
+        stat = os.stat(changed)
+        os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        parsed.clear()
+        second = LocalSourceService.load(directory)
+        if parsed != [changed]:
+            errors.append(f"carga após alterar um arquivo leu {[os.path.basename(p) for p in parsed]}")
+
+        expected = pd.concat([read_file(path) for path in paths], ignore_index=True)
+        if second is None or len(second) != len(first) + 1 or not second.equals(expected):
+            errors.append("resultado diferente da leitura completa do diretório")
+
+    for error in errors:
+        print(f"FALHA {error}")
+    if errors:
+        sys.exit(1)
+    print("fonte local ok (só o arquivo alterado foi lido de novo)")
+
+
+if __name__ == "__main__":
+    main()
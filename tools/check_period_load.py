@@ -0,0 +1,80 @@
+"""Verificação offline da carga por período (SheetsService.load_sheet_range) contra o SheetsStandIn.
+
+Sobe o servidor local com uma planilha sintética de rótulos "de usuário" (maiúsculas e
+uma coluna a mais que as métricas não usam) e confere, pela consulta gviz e pelo
+caminho alternativo da exportação completa, que voltam só as linhas do período e só
+as colunas pedidas, com os nomes padronizados.
+
+Uso: python -m tools.check_period_load
+"""
+
+import sys
+from typing import List
+
+import pandas as pd
+
+from benchmarks.generator import SyntheticConfig, SyntheticData
+from tools.sheets_standin import SheetsStandIn
+from UI_BIA.services.dataset_service import DatasetService
+from UI_BIA.services.sheets_service import SheetsService
+
+START_DATE = "2024-02-01"
+END_DATE = "2024-02-29"
+
+
+def sheet() -> pd.DataFrame:
+    """Biometria sintética sem valores sujos, com cabeçalhos como os digitados na planilha"""
+    df = SyntheticData.biometria(SyntheticConfig(tanks=6, days=90, fish_per_biometry=5, dirty_share=0.0))
+    df = df.rename(columns={"data": "Data", "tanque": "Tanque", "largura": "Largura", "altura": "Altura"})
+    df.insert(2, "Observação", "ok")
+    return df
+
+
+def expected(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas do período calculadas diretamente sobre a planilha, nas colunas padronizadas"""
+    dates = DatasetService.parse_dates(df["Data"])
+    rows = df[(dates >= pd.Timestamp(START_DATE)) & (dates <= pd.Timestamp(END_DATE))]
+    rows = rows[["Data", "Tanque", "Largura", "Altura"]]
+    rows.columns = SheetsService.BIOMETRIA_COLUMNS
+    return rows.reset_index(drop=True)
+
+
+def check(fail_queries: bool) -> List[str]:
+    """Carrega o período pelo caminho indicado e devolve as divergências encontradas"""
+    df = sheet()
+    errors = []
+    with SheetsStandIn({"bio": df}, fail_queries=fail_queries) as standin:
+        result = SheetsService.load_sheet_range(
+            standin.url("bio"), START_DATE, END_DATE, SheetsService.BIOMETRIA_COLUMNS
+        )
+        requests = list(standin.requests)
+
+    path = "exportação completa" if fail_queries else "consulta gviz"
+    if result is None:
+        return [f"{path}: nenhuma planilha carregada"]
+
+    reference = expected(df)
+    if list(result.columns) != SheetsService.BIOMETRIA_COLUMNS:
+        errors.append(f"{path}: colunas {list(result.columns)}")
+    if len(result) != len(reference):
+        errors.append(f"{path}: {len(result)} linhas, esperadas {len(reference)}")
+    elif not result.reset_index(drop=True).astype(str).equals(reference.astype(str)):
+        errors.append(f"{path}: linhas diferentes das do período")
+
+    exported = any("/export" in request for request in requests)
+    if exported != fail_queries:
+        errors.append(f"{path}: exportação completa {'não ' if fail_queries else ''}foi usada")
+    return errors
+
+
+def main() -> None:
+    errors = check(fail_queries=False) + check(fail_queries=True)
+    for error in errors:
+        print(f"FALHA {error}")
+    if errors:
+        sys.exit(1)
+    print("carga por período ok (consulta gviz e exportação completa)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Verificação offline do histórico de versões: load(record(df)) devolve as mesmas planilhas.
+
+Usa um SQLite temporário (REFLEX_DB_URL) e planilhas sintéticas lidas de CSV como nas
+cargas reais: com inferência de tipos (exportação do Sheets) e com todas as colunas em
+texto (fontes locais, com tanques "01", "02"...). Confere valores, colunas e tipos,
+inclusive de uma segunda versão com algumas linhas alteradas.
+
+Uso: python -m tools.check_versions
+"""
+
+import os
+import sys
+import tempfile
+from io import StringIO
+from typing import List
+
+_workdir = tempfile.TemporaryDirectory()
+os.environ["REFLEX_DB_URL"] = f"sqlite:///{os.path.join(_workdir.name, 'versoes.db')}"
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.generator import SyntheticConfig, SyntheticData  # noqa: E402
+from UI_BIA.services.version_service import VersionService  # noqa: E402
+
+
+def sheets(text_only: bool):
+    """Biometria e ração como chegam na carga: CSV lido com inferência ou tudo como texto"""
+    frames = []
+    for df in SyntheticData.sheets(SyntheticConfig(tanks=12, days=60, fish_per_biometry=10)):
+        df = df.assign(tanque=df["tanque"].str.zfill(2)) if text_only else df
+        frames.append(pd.read_csv(StringIO(SyntheticData.to_csv(df)), dtype=str if text_only else None))
+    return frames
+
+
+def check(label: str, biometria: pd.DataFrame, racao: pd.DataFrame) -> List[str]:
+    """Grava a versão, remonta a partir do banco e devolve as divergências encontradas"""
+    version = VersionService.record(biometria, racao, origem=label)
+    VersionService._versions.clear()
+    loaded = VersionService.load(version["id"])
+
+    errors = []
+    for sheet, original, rebuilt in zip(VersionService.SHEETS, (biometria, racao), loaded):
+        try:
+            pd.testing.assert_frame_equal(rebuilt, original.reset_index(drop=True))
+        except AssertionError as e:
+            errors.append(f"{label}/{sheet}: {str(e).splitlines()[0]}")
+    return errors
+
+
+def main() -> None:
+    errors = []
+    for text_only in (False, True):
+        label = "texto" if text_only else "inferencia"
+        biometria, racao = sheets(text_only)
+        errors += check(label, biometria, racao)
+
+        # Segunda versão: algumas linhas corrigidas (só os blocos vizinhos mudam)
+        edited = biometria.copy()
+        edited.loc[edited.index[::97], "largura"] = "7.5" if edited["largura"].dtype == object else 7.5
+        errors += check(f"{label}_editada", edited, racao)
+
+    for error in errors:
+        print(f"FALHA {error}")
+    _workdir.cleanup()
+    if errors:
+        sys.exit(1)
+    print("versões ok (load(record(df)) igual a df, com tipos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Servidor local que imita o Google Sheets para desenvolvimento e testes offline.
+
+Implementa apenas o que o SheetsService usa:
+
+* ``/spreadsheets/d/<id>/export?format=csv`` — exportação completa
+* ``/spreadsheets/d/<id>/gviz/tq?tqx=out:csv&tq=<consulta>`` — subconjunto da
+  linguagem de consulta: ``SELECT * | SELECT A, B, ...``, ``WHERE`` com
+  comparações ``<col> >= date 'aaaa-mm-dd'`` unidas por ``AND`` e ``LIMIT n``
+
+Uso: python -m tools.sheets_standin biometria=biometria.csv racao=racao.csv --port 8765
+"""
+
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from UI_BIA.services.dataset_service import DatasetService
+from UI_BIA.services.sheets_service import SheetsService
+
+QUERY_PATTERN = re.compile(
+    r"^\s*SELECT\s+(?P<columns>\*|[A-Z]+(?:\s*,\s*[A-Z]+)*)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?\s*$",
+    re.IGNORECASE
+)
+CONDITION_PATTERN = re.compile(r"^\s*([A-Z]+)\s*(>=|<=|>|<|=)\s*date\s*'(\d{4}-\d{2}-\d{2})'\s*$", re.IGNORECASE)
+
+
+class QueryError(ValueError):
+    """Consulta fora do subconjunto suportado ou inválida para os dados"""
+
+
+class SheetsStandIn:
+    """Servidor HTTP local com planilhas em memória, latência configurável e registro das requisições
+
+    Para exercitar as novas tentativas e o hedge do SheetsService: ``fail_next`` responde
+    503 às próximas N requisições e ``slow_every`` atrasa uma a cada N requisições em
+    mais ``slow_latency`` segundos (cauda de latência).
+    """
+
+    def __init__(self, sheets: Dict[str, pd.DataFrame], latency: float = 0.0, fail_queries: bool = False,
+                 host: str = "127.0.0.1", port: int = 0, fail_next: int = 0, slow_every: int = 0,
+                 slow_latency: float = 0.0):
+        self.sheets = sheets
+        self.latency = latency
+        self.fail_queries = fail_queries
+        self.fail_next = fail_next
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.requests: List[str] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, sheet_id: str) -> str:
+        """URL da planilha no mesmo formato das URLs do Google Sheets"""
+        return f"{self.base_url}/spreadsheets/d/{sheet_id}"
+
+    def start(self) -> "SheetsStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "SheetsStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def run_query(self, df: pd.DataFrame, query: str) -> pd.DataFrame:
+        """Executa o subconjunto suportado da linguagem de consulta sobre o DataFrame"""
+        match = QUERY_PATTERN.match(query)
+        if not match:
+            raise QueryError(f"Consulta não suportada: {query}")
+
+        letters = [SheetsService.column_letter(i) for i in range(len(df.columns))]
+        by_letter = dict(zip(letters, df.columns))
+
+        result = df
+        if match.group("where"):
+            mask = pd.Series(True, index=df.index)
+            for condition in re.split(r"\s+AND\s+", match.group("where"), flags=re.IGNORECASE):
+                parsed = CONDITION_PATTERN.match(condition)
+                if not parsed or parsed.group(1).upper() not in by_letter:
+                    raise QueryError(f"Condição não suportada: {condition}")
+
+                # Assim como no Sheets, a comparação com date exige uma coluna de datas
+                dates = DatasetService.parse_dates(df[by_letter[parsed.group(1).upper()]])
+                if dates.isna().all():
+                    raise QueryError("A coluna comparada não contém datas")
+
+                value = pd.Timestamp(parsed.group(3))
+                operator = parsed.group(2)
+                mask &= {
+                    ">=": dates >= value, "<=": dates <= value, ">": dates > value,
+                    "<": dates < value, "=": dates == value
+                }[operator]
+            result = result[mask]
+
+        if match.group("columns") != "*":
+            selected = [c.strip().upper() for c in match.group("columns").split(",")]
+            if any(letter not in by_letter for letter in selected):
+                raise QueryError("Coluna inexistente na consulta")
+            result = result[[by_letter[letter] for letter in selected]]
+
+        if match.group("limit") is not None:
+            result = result.head(int(match.group("limit")))
+
+        return result
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: str, content_type: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with standin._lock:
+                    standin.requests.append(self.path)
+                    failing = standin.fail_next > 0
+                    if failing:
+                        standin.fail_next -= 1
+                    slow = standin.slow_every > 0 and len(standin.requests) % standin.slow_every == 0
+                if standin.latency or slow:
+                    time.sleep(standin.latency + (standin.slow_latency if slow else 0.0))
+                if failing:
+                    self._send(503, "<html>Service Unavailable</html>", "text/html")
+                    return
+
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip("/").split("/")
+                params = parse_qs(parsed.query)
+
+                if len(parts) < 4 or parts[:2] != ["spreadsheets", "d"] or parts[2] not in standin.sheets:
+                    self._send(404, "<html>Not Found</html>", "text/html")
+                    return
+
+                df = standin.sheets[parts[2]]
+
+                if parts[3] == "export":
+                    self._send(200, df.to_csv(index=False), "text/csv")
+                    return
+
+                if parts[3:5] == ["gviz", "tq"]:
+                    if standin.fail_queries:
+                        self._send(400, "<html>Query error</html>", "text/html")
+                        return
+                    try:
+                        result = standin.run_query(df, params.get("tq", ["SELECT *"])[0])
+                    except QueryError as e:
+                        self._send(400, f"<html>{e}</html>", "text/html")
+                        return
+                    self._send(200, result.to_csv(index=False), "text/csv")
+                    return
+
+                self._send(404, "<html>Not Found</html>", "text/html")
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local que imita o Google Sheets")
+    parser.add_argument("sheets", nargs="+", help="Planilhas no formato id=arquivo.csv")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso por requisição, em segundos")
+    parser.add_argument("--slow-every", type=int, default=0, help="Atrasa uma a cada N requisições")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="Atraso extra dessas requisições")
+    args = parser.parse_args()
+
+    sheets = {}
+    for item in args.sheets:
+        sheet_id, path = item.split("=", 1)
+        sheets[sheet_id] = pd.read_csv(path, dtype=str)
+
+    standin = SheetsStandIn(sheets, latency=args.latency, port=args.port, slow_every=args.slow_every,
+                            slow_latency=args.slow_latency)
+    for sheet_id in sheets:
+        print(f"{sheet_id}: {standin.url(sheet_id)}")
+
+    try:
+        standin._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin._server.server_close()
+
+
+if __name__ == "__main__":
+    main()